@@ -10,6 +10,8 @@
  * @mx:tags tool
  * @mx:partOf mx-os
  */
+import { queryIndex } from '../../scripts/query-index.js';
+
 // Helper functions first (before main decorate function)
 
 function getMonthName(monthIndex) {
@@ -64,21 +66,16 @@ function generateContent(blogItems) {
 // Main decorate function
 export default async function decorate(block) {
   const blogListElement = block;
-  const url = '/query-index.json';
   const currentPath = window.location.pathname; // Get the current document's path
 
   try {
-    const response = await fetch(url);
-    const data = await response.json();
-
-    // Filter the blog items based on the presence of "/blogs/ddt/a-developer" in the path
-    // and exclude the current document
-    const filteredBlogItems = data.data.filter(
-      (item) => item.path.includes('developer-guide') && item.path !== currentPath,
-    );
-
-    // Sort the filtered blog items by title
-    const sortedBlogItems = filteredBlogItems.sort((a, b) => a.title.localeCompare(b.title));
+    // Blog items with "developer-guide" in the path, excluding the current document,
+    // sorted by title
+    const sortedBlogItems = await queryIndex('/query-index.json', {
+      pathIncludes: 'developer-guide',
+      exclude: currentPath,
+      sort: 'title',
+    });
 
     // generate the content
     const content = generateContent(sortedBlogItems);
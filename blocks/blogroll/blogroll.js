@@ -10,24 +10,17 @@
  * @mx:tags tool
  * @mx:partOf mx-os
  */
+import { loadQueryIndex } from '../../scripts/query-index.js';
+
 // Function to format the date
 function formatDate(timestamp) {
   const date = new Date(parseInt(timestamp, 10) * 1000);
   return date.toLocaleDateString('en-GB');
 }
 
-// Function to extract series name and part number
-function extractSeriesInfo(title, path) {
-  const match = title.match(/^(.*?)\s*-?\s*Part\s*(\d+)$/i);
-  const basePath = path.split('/').slice(0, -1).join('/');
-  return {
-    name: match ? match[1].trim() : title,
-    part: match ? parseInt(match[2], 10) : null,
-    basePath,
-  };
-}
 // Function to group and sort blog posts based on configuration
-function groupAndSortPosts(posts, config) {
+function groupAndSortPosts(index, config) {
+  const posts = index.rows;
   // Destructure configuration, providing default empty arrays if undefined
   const { acceptList = [], pathFilters = [], currentDirFilter = null } = config || {};
   // console.log('groupAndSortPosts - config:', config);
@@ -40,15 +33,8 @@ function groupAndSortPosts(posts, config) {
   // *** Priority 1: Handle currentDirFilter (path=*) if it exists ***
   if (currentDirFilter) {
     // console.log('Applying current directory filter (path=*):', currentDirFilter);
-    filteredPosts = posts.filter((post) => {
-      // Check if post.path is a string and starts with the current directory path
-      const match = typeof post.path === 'string'
-        && post.path.startsWith(currentDirFilter);
-      if (match) {
-      //   console.log(`Current directory match found: "${currentDirFilter}"`);
-      }
-      return match;
-    });
+    // The shared index keeps rows by directory, so this is a lookup not a scan
+    filteredPosts = index.byPrefix(currentDirFilter);
     // console.log(`Found ${filteredPosts.length} posts matching current directory filter`);
     usedPathFilter = true; // Mark that a path-based filter was used
 
@@ -122,11 +108,8 @@ function groupAndSortPosts(posts, config) {
 
   // Group the remaining filtered posts
   filteredPosts.forEach((post) => {
-    // Ensure title and path are strings before processing
-    const title = typeof post.title === 'string' ? post.title : '';
-    const path = typeof post.path === 'string' ? post.path : '';
-    const { name, part, basePath } = extractSeriesInfo(title, path);
-    const key = `${basePath}/${name}`; // Use base path and extracted name as the key
+    // Series name, part and base path are worked out once per page by the index
+    const { key, part } = index.seriesOf(post);
     if (!seriesMap.has(key)) {
       seriesMap.set(key, []);
     }
@@ -364,15 +347,11 @@ export default async function decorate(block) {
   block.textContent = 'Loading blog posts...';
 
   try {
-    const response = await fetch('/query-index.json');
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
-    const json = await response.json();
-    const blogPosts = json.data;
+    const index = await loadQueryIndex('/query-index.json');
+    const blogPosts = index.rows;
     // console.log('Fetched blog posts:', blogPosts);
 
-    const groupedPosts = groupAndSortPosts(blogPosts, config);
+    const groupedPosts = groupAndSortPosts(index, config);
     // console.log('Grouped posts:', groupedPosts);
     // console.log('Grouped posts type:', typeof groupedPosts);
     // console.log('Grouped posts length:', groupedPosts.length);
@@ -10,6 +10,8 @@
  * @mx:tags tool
  * @mx:partOf mx-os
  */
+import { loadQueryIndex } from '../../scripts/query-index.js';
+
 export default function decorate(block) {
   const dashboardContainer = block.querySelector('.dashboard-container') || block;
   const jsonUrl = '/query-index.json';
@@ -329,11 +331,10 @@ export default function decorate(block) {
     sortedHeader.classList.add(ascending ? 'asc' : 'desc');
   }
 
-  // Fetch JSON data and create dashboard
-  fetch(jsonUrl)
-    .then((response) => response.json())
-    .then((jsonData) => {
-      data = jsonData.data;
+  // Load the shared query index and create dashboard
+  loadQueryIndex(jsonUrl)
+    .then((index) => {
+      data = index.rows;
       const dashboardElement = createDashboard(data);
       dashboardContainer.appendChild(dashboardElement);
       addEventListeners();
@@ -0,0 +1,34 @@
+/**
+
+* IPynb Cell Parser Worker
+* Parses notebook markdown cells off the main thread. Receives
+* { id, sources, repoUrl, branch } and replies { id, html, stats } or
+* { id, error }.
+ * @file cell-parser-worker.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, performance
+ * @mx:partOf mx-os
+
+ */
+
+import { parseMarkdownCells } from './cell-parser.js';
+
+// eslint-disable-next-line no-restricted-globals
+self.addEventListener('message', async ({ data }) => {
+  const {
+    id, sources, repoUrl, branch,
+  } = data;
+  try {
+    const reply = await parseMarkdownCells(sources, { repoUrl, branch });
+    // eslint-disable-next-line no-restricted-globals
+    self.postMessage({ id, ...reply });
+  } catch (error) {
+    // eslint-disable-next-line no-restricted-globals
+    self.postMessage({ id, error: error.message });
+  }
+});
@@ -0,0 +1,219 @@
+/**
+
+* IPynb Cell Parser
+* Parses notebook markdown cells in one batch and caches the HTML by a hash
+* of the cell content: in memory for the life of the page (or worker) and in
+* IndexedDB for later visits. The hash also covers the repository, branch and
+* parser source, so a cell is parsed again when any of them changes.
+* A hash of the whole batch maps to its cell hashes, so an unchanged notebook
+* costs one digest instead of one per cell; an edited notebook re-parses only
+* the cells that changed.
+* Runs in the parser worker, or on the main thread where workers are missing.
+ * @file cell-parser.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, performance
+ * @mx:partOf mx-os
+
+ */
+
+import { parseMarkdown, parseCellMarkdown } from './markdown-parser.js';
+
+export const CELL_PARSER_CONFIG = {
+  DB_NAME: 'ipynb-viewer-cells',
+  DB_VERSION: 1,
+  STORE_NAME: 'cells',
+  MAX_AGE_MS: 30 * 24 * 60 * 60 * 1000, // Stored HTML older than this is pruned
+};
+
+// Parsed HTML for this page or worker, keyed by cell hash
+const parsedCells = new Map();
+// Cell hashes of each batch seen, keyed by batch hash
+const parsedBatches = new Map();
+
+let databasePromise = null;
+let parserKeyPromise = null;
+let pruned = false;
+
+async function sha1(text) {
+  const digest = await globalThis.crypto.subtle.digest('SHA-1', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Hash of the parser source, so a deployed parser change never serves
+ * HTML stored by the previous version.
+ */
+function getParserKey() {
+  if (!parserKeyPromise) {
+    parserKeyPromise = sha1(`${parseMarkdown}\n${parseCellMarkdown}`);
+  }
+  return parserKeyPromise;
+}
+
+/**
+ * Cache key for one cell, or null where Web Crypto is unavailable
+ * (insecure origins), in which case nothing is cached.
+ * @param {string} markdownText - Joined cell source
+ * @param {string|null} repoUrl - Repository URL used for .md links
+ * @param {string} branch - GitHub branch used for .md links
+ * @returns {Promise<string|null>}
+ */
+export async function hashCell(markdownText, repoUrl, branch) {
+  if (!globalThis.crypto?.subtle) return null;
+  const parserKey = await getParserKey();
+  return sha1(`${parserKey}\n${repoUrl || ''}\n${branch}\n${markdownText}`);
+}
+
+/**
+ * Open the IndexedDB store, or resolve null where IndexedDB is missing
+ * or refused (private browsing, blocked storage).
+ */
+function openDatabase() {
+  if (!databasePromise) {
+    databasePromise = new Promise((resolve) => {
+      if (!globalThis.indexedDB) {
+        resolve(null);
+        return;
+      }
+      try {
+        const request = globalThis.indexedDB.open(CELL_PARSER_CONFIG.DB_NAME, CELL_PARSER_CONFIG.DB_VERSION);
+        request.onupgradeneeded = () => {
+          const store = request.result.createObjectStore(CELL_PARSER_CONFIG.STORE_NAME, { keyPath: 'hash' });
+          store.createIndex('storedAt', 'storedAt');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+        request.onblocked = () => resolve(null);
+      } catch (error) {
+        resolve(null);
+      }
+    });
+  }
+  return databasePromise;
+}
+
+/**
+ * Read stored records for a set of hashes in one transaction. Cell records
+ * hold { html }, batch records hold { cells } (the batch's cell hashes).
+ * @param {Array<string>} hashes
+ * @returns {Promise<Map<string, object>>} hash -> record for the hashes found
+ */
+async function readStored(hashes) {
+  const found = new Map();
+  const db = hashes.length > 0 ? await openDatabase() : null;
+  if (!db) return found;
+  return new Promise((resolve) => {
+    try {
+      const transaction = db.transaction(CELL_PARSER_CONFIG.STORE_NAME, 'readonly');
+      const store = transaction.objectStore(CELL_PARSER_CONFIG.STORE_NAME);
+      hashes.forEach((hash) => {
+        const request = store.get(hash);
+        request.onsuccess = () => {
+          if (request.result) found.set(hash, request.result);
+        };
+      });
+      transaction.oncomplete = () => resolve(found);
+      transaction.onerror = () => resolve(found);
+      transaction.onabort = () => resolve(found);
+    } catch (error) {
+      resolve(found);
+    }
+  });
+}
+
+/**
+ * Store cell and batch records and, once per session, drop entries older
+ * than MAX_AGE_MS so edited notebooks do not grow the store forever.
+ * @param {Array<object>} records - { hash, html } or { hash, cells }
+ */
+async function writeStored(records) {
+  const db = await openDatabase();
+  if (!db) return;
+  try {
+    const transaction = db.transaction(CELL_PARSER_CONFIG.STORE_NAME, 'readwrite');
+    const store = transaction.objectStore(CELL_PARSER_CONFIG.STORE_NAME);
+    const storedAt = Date.now();
+    records.forEach((record) => store.put({ ...record, storedAt }));
+    if (!pruned) {
+      pruned = true;
+      const expired = globalThis.IDBKeyRange.upperBound(storedAt - CELL_PARSER_CONFIG.MAX_AGE_MS);
+      const cursorRequest = store.index('storedAt').openCursor(expired);
+      cursorRequest.onsuccess = () => {
+        const cursor = cursorRequest.result;
+        if (!cursor) return;
+        cursor.delete();
+        cursor.continue();
+      };
+    }
+  } catch (error) {
+    // Quota or a closed connection - the next visit simply parses again
+  }
+}
+
+/**
+ * Parse a batch of markdown cells, reusing cached HTML where the content
+ * has been seen before.
+ * @param {Array<string>} sources - Joined markdown source of each cell
+ * @param {object} [options]
+ * @param {string|null} [options.repoUrl] - Repository URL for .md links
+ * @param {string} [options.branch='main'] - GitHub branch for .md links
+ * @returns {Promise<{html: Array<string>, stats: object}>} html in the order
+ *   of sources; stats counts memory hits, stored hits and parsed cells and
+ *   the time spent parsing
+ */
+export async function parseMarkdownCells(sources, options = {}) {
+  const { repoUrl = null, branch = 'main' } = options;
+  const stats = {
+    memory: 0, stored: 0, parsed: 0, parseMs: 0,
+  };
+
+  // An unchanged batch skips hashing each cell
+  const batchHash = await hashCell(`batch\n${sources.join('\u0000')}`, repoUrl, branch);
+  let hashes = batchHash ? parsedBatches.get(batchHash) : null;
+  const records = [];
+  if (batchHash && !hashes) {
+    hashes = (await readStored([batchHash])).get(batchHash)?.cells || null;
+    if (hashes) parsedBatches.set(batchHash, hashes);
+  }
+  if (!hashes) {
+    hashes = await Promise.all(sources.map((source) => hashCell(source, repoUrl, branch)));
+    if (batchHash) {
+      parsedBatches.set(batchHash, hashes);
+      records.push({ hash: batchHash, cells: hashes });
+    }
+  }
+
+  const html = hashes.map((hash) => (hash && parsedCells.has(hash) ? parsedCells.get(hash) : null));
+  stats.memory = html.filter((item) => item !== null).length;
+
+  const unseen = [...new Set(hashes.filter((hash, i) => hash && html[i] === null))];
+  const stored = await readStored(unseen);
+  stored.forEach((record, hash) => parsedCells.set(hash, record.html));
+
+  const start = performance.now();
+  sources.forEach((source, i) => {
+    if (html[i] !== null) return;
+    const hash = hashes[i];
+    if (hash && parsedCells.has(hash)) {
+      html[i] = parsedCells.get(hash);
+      if (stored.has(hash)) stats.stored += 1;
+      else stats.memory += 1; // Repeated cell parsed earlier in this batch
+      return;
+    }
+    html[i] = parseCellMarkdown(source, repoUrl, branch);
+    stats.parsed += 1;
+    if (hash) {
+      parsedCells.set(hash, html[i]);
+      records.push({ hash, html: html[i] });
+    }
+  });
+  stats.parseMs = performance.now() - start;
+
+  if (records.length > 0) writeStored(records);
+  return { html, stats };
+}
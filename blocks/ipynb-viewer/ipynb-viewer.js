@@ -23,6 +23,9 @@
 // IMPORTS
 // ============================================================================
 import { createUnifiedOverlay } from './overlay/unified-overlay.js';
+import { parseMarkdown, parseCellMarkdown } from './markdown-parser.js';
+import { parseMarkdownCells } from './cell-parser.js';
+import { outlineNotebookCells, createPageGroups } from './notebook-outline.js';
 
 // ============================================================================
 // GLOBAL CONSTANTS - Developer-facing error messages (easily searchable)
@@ -52,6 +55,9 @@ const DEFAULT_CONFIG = {
   // Code Cells
   maxCodeGroupSize: 3, // Maximum number of consecutive code cells to group in paged mode
 
+  // Markdown Parsing
+  workerParseMinChars: 16000, // From this much markdown (about 2 ms of parsing), parse in a worker
+
   // SVG Inlining
   svgFetchTimeout: 10000, // SVG fetch timeout in milliseconds (10 seconds)
   svgPathPattern: /\/illustrations\/[^/]+\.svg$/i, // Pattern to match SVG illustration paths
@@ -176,430 +182,6 @@ function generateSlug(text) {
 
 /**
 
-* Parse markdown text to HTML (enhanced implementation)
-* @param {string} markdown - Markdown text
-* @param {string} [repoUrl] - Optional repository URL for converting .md links
-* @param {string} [branch='main'] - GitHub branch to use for .md links
-* @param {string} [currentFilePath] - Optional current file path for resolving relative links
-* @returns {string} HTML string
- */
-function parseMarkdown(markdown, repoUrl = null, branch = 'main', currentFilePath = null) {
-  let html = markdown;
-
-  // Filter out LaTeX commands and attributes (lines starting with \ or containing {.attribute})
-  // These are LaTeX formatting commands like \newpage, \pagebreak, \addtocontents, etc.
-  // and Pandoc/LaTeX class attributes like {.unnumbered .unlisted}
-  // that should be ignored in markdown rendering
-  html = html.split('\n')
-    .filter((line) => {
-      const trimmed = line.trim();
-      // Remove lines that start with a LaTeX command (backslash followed by letters)
-      if (/^\\[a-zA-Z]+/.test(trimmed)) {
-        return false;
-      }
-      // Remove lines that are ONLY LaTeX/Pandoc class attributes like {.unnumbered .unlisted}
-      if (/^\{\.[a-zA-Z.\s]+\}$/.test(trimmed)) {
-        return false;
-      }
-      return true;
-    })
-    .join('\n');
-
-  // Code blocks (triple backticks) - MUST be processed first before other replacements
-  const codeBlockPlaceholders = [];
-  html = html.replace(/```(\w+)?\n?([\s\S]*?)```/g, (match, lang, code) => {
-    const placeholder = `__CODEBLOCK_${codeBlockPlaceholders.length}__`;
-    // Preserve formatting: escape HTML but keep newlines and indentation
-    const escapedCode = code
-      .replace(/</g, '&lt;')
-      .replace(/>/g, '&gt;');
-    codeBlockPlaceholders.push(`<pre><code class="language-${lang || 'plaintext'}">${escapedCode}</code></pre>`);
-    return placeholder;
-  });
-
-  // Extract inline code and protect it with placeholders
-  const inlineCodePlaceholders = [];
-  html = html.replace(/`([^`]+)`/g, (match, code) => {
-    const placeholder =`__INLINECODE_${inlineCodePlaceholders.length}__`;
-    inlineCodePlaceholders.push(code);
-    return placeholder;
-  });
-
-  // Handle escaped HTML characters (e.g., \<img>, \:// in documentation examples)
-  // These should be rendered as literal text, not actual HTML
-  html = html.replace(/\\</g, '&lt;');
-  html = html.replace(/\\>/g, '&gt;');
-  html = html.replace(/\\:/g, ':');
-
-  // Convert angle-bracket enclosed URLs to markdown link format
-  // Must happen BEFORE HTML escaping (line 69) to preserve angle brackets
-  // Example: <https://github.com> becomes [https://github.com](https://github.com)
-  html = html.replace(/<(https?:\/\/[^>]+)>/g, (match, url) => `[${url}](${url})`);
-
-  // Escape all remaining HTML tags (not in code blocks or inline code)
-  // This prevents inline HTML from being rendered, matching GitHub's behavior
-  html = html.replace(/</g, '&lt;');
-  html = html.replace(/>/g, '&gt;');
-
-  // Tables - must be before line breaks
-  const lines = html.split('\n');
-  const processedLines = [];
-  let inTable = false;
-  let tableRows = [];
-  let tableRowCount = 0;
-
-  // Helper function to create a table row (defined outside loop to avoid closure issues)
-  const createTableRow = (tableCells, isFirstRow) => {
-    const tag = isFirstRow ? 'th' : 'td';
-    return `<tr>${tableCells.map((cell) =>`<${tag}>${cell.trim()}</${tag}>`).join('')}</tr>`;
-  };
-
-  lines.forEach((line) => {
-    // Check if line is a table row
-    if (line.trim().startsWith('|') && line.trim().endsWith('|')) {
-      // Skip separator rows (|---|---|) - must include | in character class
-      if (/^\|[\s\-:|]+\|$/.test(line.trim())) {
-        return; // Skip this iteration (equivalent to continue)
-      }
-
-      if (!inTable) {
-        inTable = true;
-        tableRows = [];
-        tableRowCount = 0;
-      }
-
-      const tableCells = line.split('|').filter((cell) => cell.trim());
-      const row = createTableRow(tableCells, tableRowCount === 0);
-      tableRows.push(row);
-      tableRowCount += 1;
-    } else {
-      // Not a table row
-      if (inTable) {
-        // End of table, flush accumulated rows
-        processedLines.push(`<table>${tableRows.join('')}</table>`);
-        tableRows = [];
-        tableRowCount = 0;
-        inTable = false;
-      }
-      processedLines.push(line);
-    }
-  });
-
-  // Flush any remaining table
-  if (inTable && tableRows.length > 0) {
-    processedLines.push(`<table>${tableRows.join('')}</table>`);
-  }
-
-  html = processedLines.join('\n');
-
-  // Headers (process in order from most specific to least)
-  // Add IDs to h2 headers for navigation
-  html = html.replace(/^###### (._$)/gim, '<h6>$1</h6>');
-  html = html.replace(/^##### (._$)/gim, '<h5>$1</h5>');
-  html = html.replace(/^#### (._$)/gim, '<h4>$1</h4>');
-  html = html.replace(/^### (._$)/gim, '<h3>$1</h3>');
-  html = html.replace(/^## (.*$)/gim, (match, text) => {
-    // Generate ID from text (lowercase, replace spaces with hyphens, remove special chars)
-    const id = text
-      .toLowerCase()
-      .replace(/[^\w\s-]/g, '') // Remove special characters except word chars, spaces, hyphens
-      .replace(/\s+/g, '-') // Replace spaces with hyphens
-      .replace(/-+/g, '-') // Replace multiple hyphens with single hyphen
-      .replace(/^-+|-+$/g, '') // Remove leading and trailing hyphens
-      .trim();
-
-    return `<h2 id="${id}">${text}</h2>`;
-  });
-  html = html.replace(/^# (.*$)/gim, '<h1>$1</h1>');
-
-  // Horizontal rules (must be before bold/italic to avoid conflicts)
-  // Matches: ---, *_*, or ___ (3 or more, with optional spaces)
-  html = html.replace(/^(?:[-*_]\s_){3,}$/gim, '<hr>');
-
-  // Images - process BEFORE links since images use ![alt](url) syntax
-  html = html.replace(/!\[([^\]]_)\]\(([^)]+)\)/g, (_match, alt, url) => {
-    // Auto-convert PNG illustrations to SVG (pattern: illustrations/_.png → illustrations/_.svg)
-    let processedUrl = url;
-    if (url.match(/illustrations\/._\.png$/i)) {
-      processedUrl = url.replace(/\.png$/i, '.svg');
-    }
-
-    // Resolve image URLs to GitHub raw content if repo available and path is relative
-    if (repoUrl && !processedUrl.startsWith('http://') && !processedUrl.startsWith('https://')) {
-      let imagePath = processedUrl;
-
-      // Resolve relative paths based on current file location
-      if (currentFilePath && !processedUrl.startsWith('/')) {
-        // Extract directory from current file
-        const currentDir = currentFilePath.substring(0, currentFilePath.lastIndexOf('/'));
-        const parts = currentDir ? currentDir.split('/') : [];
-        const urlParts = processedUrl.replace(/^\.\//, '').split('/');
-
-        // Process path parts
-        urlParts.forEach((part) => {
-          if (part === '..') {
-            if (parts.length > 0) parts.pop();
-          } else if (part !== '.' && part !== '') {
-            parts.push(part);
-          }
-        });
-
-        imagePath = parts.join('/');
-      } else if (processedUrl.startsWith('/')) {
-        // Absolute path from repo root
-        imagePath = processedUrl.replace(/^\//, '');
-      }
-
-      // Convert to raw GitHub URL
-      const rawUrl = `${repoUrl.replace('github.com', 'raw.githubusercontent.com')}/${branch}/${imagePath}`;
-      return `<img src="${rawUrl}" alt="${alt}" class="ipynb-markdown-image" loading="lazy">`;
-    }
-
-    // Return inline image with alt text (for absolute URLs or when no repo)
-    return `<img src="${processedUrl}" alt="${alt}" class="ipynb-markdown-image" loading="lazy">`;
-  });
-
-  // Links - convert .md files to repo URLs if repo is available
-  // Process AFTER images (images also use bracket syntax but with ! prefix)
-  html = html.replace(/\[([^\]]+)\]\(([^)]+)\)/g, (match, text, url) => {
-    // Auto-convert PNG illustrations to SVG (pattern: illustrations/_.png → illustrations/_.svg)
-    let processedUrl = url;
-    if (url.match(/illustrations\/.*\.png$/i)) {
-      processedUrl = url.replace(/\.png$/i, '.svg');
-    }
-
-    // Check if it's a .md file and we have a repo URL
-    if (repoUrl && processedUrl.endsWith('.md') && !processedUrl.startsWith('http://') && !processedUrl.startsWith('https://')) {
-      let cleanPath = processedUrl;
-
-      // Resolve relative paths based on current file location
-      if (currentFilePath && !processedUrl.startsWith('/') && !processedUrl.startsWith('http')) {
-        // This is a relative path - resolve it based on current file's directory
-
-        // Extract the directory path from the current file (remove filename)
-        const currentDir = currentFilePath.substring(0, currentFilePath.lastIndexOf('/'));
-
-        // Combine current directory with relative path
-        const parts = currentDir ? currentDir.split('/') : [];
-        const urlParts = processedUrl.replace(/^\.\//, '').split('/'); // Remove leading ./ if present
-
-        // Process each part of the URL
-        urlParts.forEach((part) => {
-          if (part === '..') {
-            // Go up one directory
-            if (parts.length > 0) {
-              parts.pop();
-            }
-          } else if (part !== '.' && part !== '') {
-            // Add directory or filename
-            parts.push(part);
-          }
-        });
-
-        cleanPath = parts.join('/');
-      } else if (processedUrl.startsWith('/')) {
-        // Absolute path from repo root - remove leading /
-        cleanPath = processedUrl.replace(/^\//, '');
-      } else {
-        // No currentFilePath or already absolute URL
-        cleanPath = processedUrl.replace(/^\.?\//, '');
-        if ((processedUrl.startsWith('../') || processedUrl.includes('/../')) && !currentFilePath) {
-        }
-      }
-
-      // Build full repo URL using the specified branch
-      const fullUrl = `${repoUrl}/blob/${branch}/${cleanPath}`;
-      // Mark GitHub markdown links with special class for overlay handling
-      // Use href="#" to prevent browser prefetching, store actual URL in data attribute
-      return `<a href="#" class="ipynb-github-md-link" data-md-url="${fullUrl}" data-md-path="${cleanPath}" data-repo="${repoUrl}" data-branch="${branch}">${text}</a>`;
-    }
-
-    // External links (http/https) - clickable links that open in new tab
-    if (processedUrl.startsWith('http://') || processedUrl.startsWith('https://')) {
-      return `<a href="${processedUrl}" class="ipynb-external-link" title="Open in new tab: ${processedUrl}" target="_blank" rel="noopener noreferrer">${text}</a>`;
-    }
-
-    // Hash links - keep as-is for internal navigation
-    if (processedUrl.startsWith('#')) {
-      return `<a href="${processedUrl}">${text}</a>`;
-    }
-
-    // Other file types (.html, .htm, images, etc.) - display as non-clickable text
-    // Show the filename/path for documentation purposes (show converted URL)
-    return `<span class="ipynb-non-md-link" title="${processedUrl}">${text} <code>(${processedUrl})</code></span>`;
-  });
-
-  // Lists - process line by line with nested list support (BEFORE bold/italic)
-  const linesWithLists = html.split('\n');
-  const processedWithLists = [];
-  const listStack = []; // Track nested list state: [{type: 'ol'|'ul', indent: number}]
-  let lastIndent = -1;
-
-  linesWithLists.forEach((line) => {
-    // Match list items with indentation
-    const ulMatch = line.match(/^[\s*](-*) (.+)$/);
-    const olMatch = line.match(/^(\s*)\d+\. (.+)$/);
-
-    if (ulMatch || olMatch) {
-      const isUl = !!ulMatch;
-      const indent = (ulMatch ? ulMatch[1] : olMatch[1]).length;
-      const content = ulMatch ? ulMatch[2] : olMatch[2];
-      const listType = isUl ? 'ul' : 'ol';
-
-      // Handle nesting based on indentation
-      if (indent > lastIndent) {
-        // Starting a new nested list
-        if (listStack.length > 0) {
-          // Close the previous <li> and open nested list inside it
-          const lastItem = processedWithLists[processedWithLists.length - 1];
-          if (lastItem && lastItem.endsWith('</li>')) {
-            // Remove the closing </li> tag
-            processedWithLists[processedWithLists.length - 1] = lastItem.slice(0, -5);
-          }
-        }
-        processedWithLists.push(`<${listType}>`);
-        listStack.push({ type: listType, indent });
-      } else if (indent < lastIndent) {
-        // Closing nested lists
-        while (listStack.length > 0 && listStack[listStack.length - 1].indent > indent) {
-          const closed = listStack.pop();
-          processedWithLists.push(`</${closed.type}>`);
-          // Close the parent <li> that contained the nested list
-          if (listStack.length > 0) {
-            processedWithLists.push('</li>');
-          }
-        }
-
-        // Check if we need to start a new list at this level
-        if (listStack.length === 0 || listStack[listStack.length - 1].type !== listType) {
-          if (listStack.length > 0) {
-            // Close existing list at this level
-            const closed = listStack.pop();
-            processedWithLists.push(`</${closed.type}>`);
-          }
-          processedWithLists.push(`<${listType}>`);
-          listStack.push({ type: listType, indent });
-        }
-      } else if (listStack.length > 0 && listStack[listStack.length - 1].type !== listType) {
-        // Same indent but different list type - close and reopen
-        const closed = listStack.pop();
-        processedWithLists.push(`</${closed.type}>`);
-        processedWithLists.push(`<${listType}>`);
-        listStack.push({ type: listType, indent });
-      } else if (listStack.length === 0) {
-        // First list item
-        processedWithLists.push(`<${listType}>`);
-        listStack.push({ type: listType, indent });
-      }
-
-      processedWithLists.push(`<li>${content}</li>`);
-      lastIndent = indent;
-    } else {
-      // Non-list line - close all open lists
-      while (listStack.length > 0) {
-        const closed = listStack.pop();
-        processedWithLists.push(`</${closed.type}>`);
-      }
-      processedWithLists.push(line);
-      lastIndent = -1;
-    }
-  });
-
-  // Close any remaining open lists
-  while (listStack.length > 0) {
-    const closed = listStack.pop();
-    processedWithLists.push(`</${closed.type}>`);
-  }
-
-  html = processedWithLists.join('\n');
-
-  // Bold (process after lists to allow bold text in list items)
-  html = html.replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>');
-
-  // Italic (process after bold)
-  html = html.replace(/\*(.+?)\*/g, '<em>$1</em>');
-
-  // Blockquotes - process line by line (must match raw > character, not &gt;)
-  const linesWithBlockquotes = html.split('\n');
-  const processedWithBlockquotes = [];
-  let inBlockquote = false;
-
-  linesWithBlockquotes.forEach((line) => {
-    // Match lines starting with > (raw character, before any HTML encoding)
-    const blockquoteMatch = line.match(/^>\s?(.*)$/);
-
-    if (blockquoteMatch) {
-      if (!inBlockquote) {
-        processedWithBlockquotes.push('<blockquote>');
-        inBlockquote = true;
-      }
-      // Add the line content (without the > prefix)
-      processedWithBlockquotes.push(blockquoteMatch[1]);
-    } else {
-      // Close blockquote if we were in one
-      if (inBlockquote) {
-        processedWithBlockquotes.push('</blockquote>');
-        inBlockquote = false;
-      }
-      processedWithBlockquotes.push(line);
-    }
-  });
-
-  // Close any remaining open blockquote
-  if (inBlockquote) processedWithBlockquotes.push('</blockquote>');
-
-  html = processedWithBlockquotes.join('\n');
-
-  // Line breaks - wrap paragraphs properly
-  // Split by double newlines to identify paragraphs
-  const paragraphs = html.split(/\n\n+/);
-
-  // Wrap each paragraph in <p> tags, unless it's already a block element
-  // CRITICAL FIX: Add __CODEBLOCK_ pattern to prevent wrapping placeholders in <p> tags
-  const blockElementPattern = /^<(h[1-6]|table|ul|ol|blockquote|pre|hr)|__CODEBLOCK_/;
-  const preBlockPattern = /^<pre/; // Separate pattern for code blocks that need newlines preserved
-
-  html = paragraphs
-    .map((para) => {
-      const trimmed = para.trim();
-      if (!trimmed) return ''; // Skip empty paragraphs
-      if (blockElementPattern.test(trimmed)) {
-        // Block element detected
-        if (preBlockPattern.test(trimmed)) {
-          // Code blocks - preserve all newlines
-          return trimmed;
-        }
-        // Other block elements - convert newlines to spaces
-        return trimmed.replace(/\n/g, ' ');
-      }
-      // Regular paragraph - wrap in <p> and convert single newlines to spaces
-      return `<p>${trimmed.replace(/\n/g, ' ')}</p>`;
-    })
-    .filter((p) => p) // Remove empty strings
-    .join('\n\n'); // Use double newline for better spacing between blocks
-
-  // Restore code blocks (MOVED to after paragraph processing to prevent splitting by newlines)
-  codeBlockPlaceholders.forEach((codeBlock, index) => {
-    html = html.replace(`__CODEBLOCK_${index}__`, codeBlock);
-  });
-
-  // Restore inline code (now as <code> elements with content)
-  // Escape HTML entities to display code literally (e.g., `<div>` shows as <div>, not rendered)
-  inlineCodePlaceholders.forEach((code, index) => {
-    const escapedCode = code
-      .replace(/&/g, '&amp;') // Must be first - escape existing ampersands
-      .replace(/</g, '&lt;') // Escape less-than
-      .replace(/>/g, '&gt;') // Escape greater-than
-      .replace(/"/g, '&quot;') // Escape double quotes
-      .replace(/'/g, '&#39;'); // Escape single quotes
-    html = html.replace(`__INLINECODE_${index}__`, `<code>${escapedCode}</code>`);
-  });
-
-  return html;
-}
-
-/**
-
 * Display splash screen image that auto-dismisses after duration
 * @param {string} imageUrl - URL of splash screen image
 * @param {number} minDuration - Display duration in milliseconds (default 3000, should match config.defaultSplashDuration)
@@ -928,6 +510,52 @@ function sanitizeSVG(svgText, altText) {
 
 /**
 
+* Fetch, sanitize and cache one SVG illustration
+* @param {string} src - URL of the SVG file
+* @param {string} alt - Alt text to add as title
+* @param {number} timeout - Fetch timeout in ms
+* @returns {Promise<string|null>} Sanitized SVG string, or null to keep the img tag
+ */
+async function loadIllustration(src, alt, timeout) {
+  // Check cache first
+  if (SVG_INLINE_CACHE.has(src)) {
+    return SVG_INLINE_CACHE.get(src);
+  }
+
+  const svgText = await fetchSVGContent(src, timeout);
+  if (!svgText) {
+    return null;
+  }
+
+  const sanitizedSVG = sanitizeSVG(svgText, alt);
+  if (sanitizedSVG) {
+    SVG_INLINE_CACHE.set(src, sanitizedSVG);
+  }
+  return sanitizedSVG;
+}
+
+/**
+
+* Replace an img element with an inline SVG string
+* @param {HTMLImageElement} img - Image to replace
+* @param {string|null} svg - Sanitized SVG, or null to keep the image
+ */
+function replaceWithSVG(img, svg) {
+  // If svg is null, keep the original img tag (fallback)
+  if (!svg || !img.parentNode) return;
+
+  // Create a temporary container to parse the SVG string
+  const tempDiv = img.ownerDocument.createElement('div');
+  tempDiv.innerHTML = svg;
+  const svgElement = tempDiv.querySelector('svg');
+
+  if (svgElement) {
+    img.parentNode.replaceChild(svgElement, img);
+  }
+}
+
+/**
+
 * Inline SVG illustrations in HTML
 * @param {string} htmlString - HTML string with img tags
 * @param {Object} options - SVG inlining options
@@ -940,65 +568,29 @@ async function inlineSVGIllustrations(htmlString, options = {}) {
   const pattern = options.pattern || /\/illustrations\/[^/]+\.svg$/i;
   const timeout = options.timeout || 10000;
 
+  // Nothing to inline - skip the parse and serialize round trip
+  if (!htmlString.includes('<img')) {
+    return htmlString;
+  }
+
   try {
     // Parse HTML to find img tags
     const parser = new DOMParser();
     const doc = parser.parseFromString(htmlString, 'text/html');
-    const images = doc.querySelectorAll('img');
 
     // Find illustration SVGs to inline
-    const svgsToInline = [];
-    images.forEach((img) => {
-      const src = img.getAttribute('src');
-      if (src && pattern.test(src)) {
-        svgsToInline.push({ img, src, alt: img.getAttribute('alt') || '' });
-      }
-    });
+    const images = Array.from(doc.querySelectorAll('img'))
+      .filter((img) => pattern.test(img.getAttribute('src') || ''));
 
-    if (svgsToInline.length === 0) {
+    if (images.length === 0) {
       return htmlString; // No SVGs to inline
     }
 
-    // Fetch all SVGs in parallel
-    const fetchPromises = svgsToInline.map(async ({ img, src, alt }) => {
-      // Check cache first
-      if (SVG_INLINE_CACHE.has(src)) {
-        return { img, svg: SVG_INLINE_CACHE.get(src), src };
-      }
-
-      // Fetch and sanitize
-      const svgText = await fetchSVGContent(src, timeout);
-      if (!svgText) {
-        return { img, svg: null, src }; // Keep as img tag
-      }
-
-      const sanitizedSVG = sanitizeSVG(svgText, alt);
-      if (!sanitizedSVG) {
-        return { img, svg: null, src }; // Keep as img tag
-      }
-
-      // Cache the result
-      SVG_INLINE_CACHE.set(src, sanitizedSVG);
-
-      return { img, svg: sanitizedSVG, src };
-    });
-
-    const results = await Promise.all(fetchPromises);
-
-    // Replace img tags with inline SVGs
-    results.forEach(({ img, svg }) => {
-      if (svg) {
-        // Create a temporary container to parse the SVG string
-        const tempDiv = doc.createElement('div');
-        tempDiv.innerHTML = svg;
-        const svgElement = tempDiv.querySelector('svg');
-
-        if (svgElement) {
-          img.parentNode.replaceChild(svgElement, img);
-        }
-      }
-      // If svg is null, keep the original img tag (fallback)
-    });
+    // Fetch all SVGs in parallel and replace img tags with inline SVGs
+    await Promise.all(images.map(async (img) => {
+      const svg = await loadIllustration(img.getAttribute('src'), img.getAttribute('alt') || '', timeout);
+      replaceWithSVG(img, svg);
+    }));
 
     // Serialize back to HTML string
     return doc.body.innerHTML;
@@ -1009,6 +601,29 @@ async function inlineSVGIllustrations(htmlString, options = {}) {
 
 /**
 
+* Inline SVG illustrations in a rendered cell, in place
+* Used when a page group is about to be shown, so illustrations are only
+* fetched for pages the reader reaches.
+* @param {HTMLElement} cellDiv - Markdown cell element
+* @param {Object} [config] - Configuration object (svgPathPattern, svgFetchTimeout)
+* @returns {Promise<void>}
+ */
+async function inlineCellIllustrations(cellDiv, config = DEFAULT_CONFIG) {
+  const images = Array.from(cellDiv.querySelectorAll('img'))
+    .filter((img) => config.svgPathPattern.test(img.getAttribute('src') || ''));
+
+  await Promise.all(images.map(async (img) => {
+    try {
+      const svg = await loadIllustration(img.getAttribute('src'), img.getAttribute('alt') || '', config.svgFetchTimeout);
+      replaceWithSVG(img, svg);
+    } catch (error) {
+      // Keep the img tag
+    }
+  }));
+}
+
+/**
+
 * Detect cell type based on content patterns
 * @param {string} content - Cell content
 * @param {number} index - Cell index
@@ -1152,9 +767,11 @@ function styleActionCards(contentElement) {
 * @param {string} [branch='main'] - GitHub branch to use for .md links
 * @param {Array} [parentHistory=null] - Optional parent overlay's history array
 * @param {Object} [config=null] - Configuration object (injected dependency)
-* @returns {Promise<HTMLElement>} Cell element
+* @param {string} [parsedHtml=null] - HTML already parsed by parseNotebookMarkdown
+* @returns {Promise<HTMLElement>} Cell element (SVG illustrations are inlined
+*   later by inlineCellIllustrations)
  */
-async function createMarkdownCell(cell, index, repoUrl = null, autoWrap = false, branch = 'main', parentHistory = null, config = null) {
+async function createMarkdownCell(cell, index, repoUrl = null, autoWrap = false, branch = 'main', parentHistory = null, config = null, parsedHtml = null) {
   const cellDiv = document.createElement('div');
   cellDiv.className = 'ipynb-cell ipynb-markdown-cell';
   cellDiv.dataset.cellIndex = index;
@@ -1163,16 +780,9 @@ async function createMarkdownCell(cell, index, repoUrl = null, autoWrap = false,
   content.className = 'ipynb-cell-content';
 
   // Join source lines and parse markdown
+  // parseCellMarkdown also strips "Part X:" / "Chapter X:" from headings in the viewer pane
   const markdownText = Array.isArray(cell.source) ? cell.source.join('') : cell.source;
-  let html = parseMarkdown(markdownText, repoUrl, branch);
-
-  // Strip "Part X:" prefix from Part/Chapter headings in viewer pane
-  // Pattern: "Part 1:", "Chapter 2:", etc.
-  // Note: H2 tags have id attributes, so we need to match those
-  html = html.replace(/<h2([^>]_)>(Part|Chapter)\s+\d+:\s_(.+?)<\/h2>/gi, '<h2$1>$3</h2>');
-
-  // Inline SVG illustrations
-  html = await inlineSVGIllustrations(html);
+  let html = parsedHtml ?? parseCellMarkdown(markdownText, repoUrl, branch);
 
   // Auto-wrap with styling classes if in notebook mode
   if (autoWrap) {
@@ -1375,82 +985,118 @@ async function loadNotebook(notebookPath) {
 
 /**
 
-* Check if a markdown cell should be grouped with the next code cell
-* @param {HTMLElement} cell - Current cell
-* @param {HTMLElement} nextCell - Next cell
-* @returns {boolean} True if cells should be grouped
+* Describe already-built cell elements in the shape of outlineNotebookCells
+* @param {Array<HTMLElement>} cells - Cell elements
+* @returns {Array<Object>} { index, type, text, heading, element } per cell
  */
-function shouldGroupWithNext(cell, nextCell) {
-  if (!cell || !nextCell) return false;
-  if (!cell.classList.contains('ipynb-markdown-cell')) return false;
-  if (!nextCell.classList.contains('ipynb-code-cell')) return false;
-
-  // Get markdown content
-  const content = cell.textContent.trim();
-
-  // Patterns that suggest the markdown is describing the following code
-  const groupingPatterns = [
-    /:\s*$/, // Ends with colon
-    /below/i, // Contains "below"
-    /following/i, // Contains "following"
-    /try running/i, // Contains "try running"
-    /click run/i, // Contains "click run"
-    /run the cell/i, // Contains "run the cell"
-    /let's test/i, // Contains "let's test"
-    /let's try/i, // Contains "let's try"
-    /example:/i, // Contains "example:"
-    /here's how/i, // Contains "here's how"
-  ];
+function outlineCellElements(cells) {
+  return cells.map((cell) => {
+    const isMarkdown = cell.classList.contains('ipynb-markdown-cell');
+    return {
+      index: parseInt(cell.dataset.cellIndex, 10),
+      type: isMarkdown ? 'markdown' : 'code',
+      text: cell.textContent.trim(),
+      heading: isMarkdown ? extractHeading(cell) : null,
+      element: cell,
+    };
+  });
+}
+
+/**
 
-  return groupingPatterns.some((pattern) => pattern.test(content));
+* Parse every markdown cell of a notebook
+* HTML is cached by cell-content hash for this and later visits, so a
+* repeat visit hashes the notebook once instead of parsing it. Notebooks
+* with at least config.workerParseMinChars of markdown are parsed by
+* cell-parser-worker.js; smaller ones, where parsing costs less than
+* starting a worker, on the main thread. The main thread is also the
+* fallback when module workers are unavailable or the worker fails.
+* @param {Array<object>} cells - Notebook cells
+* @param {string|null} repoUrl - Repository URL for .md links
+* @param {string} branch - GitHub branch for .md links
+* @param {Object} config - Configuration object
+* @returns {Promise<Map<number, string>>} Cell index -> parsed HTML
+ */
+async function parseNotebookMarkdown(cells, repoUrl, branch, config = DEFAULT_CONFIG) {
+  const indexes = [];
+  const sources = [];
+  cells.forEach((cell, index) => {
+    if (cell.cell_type !== 'markdown') return;
+    indexes.push(index);
+    sources.push(Array.isArray(cell.source) ? cell.source.join('') : cell.source);
+  });
+
+  const parseInWorker = () => new Promise((resolve, reject) => {
+    const worker = new Worker(new URL('./cell-parser-worker.js', import.meta.url), { type: 'module' });
+    const finish = (callback) => (value) => {
+      worker.terminate();
+      callback(value);
+    };
+    worker.addEventListener('message', finish(({ data }) => {
+      if (data.error) reject(new Error(data.error));
+      else resolve(data);
+    }));
+    worker.addEventListener('error', finish(reject));
+    worker.postMessage({
+      id: 1, sources, repoUrl, branch,
+    });
+  });
+
+  const markdownSize = sources.reduce((total, source) => total + source.length, 0);
+  let reply = null;
+  if (markdownSize >= config.workerParseMinChars) {
+    try {
+      reply = await parseInWorker();
+    } catch (error) {
+      // No module workers, or the worker failed - parse on the main thread
+    }
+  }
+  if (!reply) reply = await parseMarkdownCells(sources, { repoUrl, branch });
+  return new Map(indexes.map((cellIndex, i) => [cellIndex, reply.html[i]]));
 }
 
 /**
 
-* Create page groups from cells for smart pagination
-* @param {Array<HTMLElement>} cells - Array of cell elements
-* @returns {Array<Object>} Array of page objects with grouped cells
+* Create the lazy renderer for page groups
+* The first call for a page builds its cell elements, inlines their SVG
+* illustrations and, once the page is ready, starts on the page after it,
+* so the next page is usually ready before the reader asks.
+* @param {Array<Object>} pages - Page groups from createPageGroups
+* @param {Function} createCell - async (outlineEntry) => cell element
+* @param {Object} config - Configuration object
+* @returns {Function} async (pageIndex) => resolves once the page is ready to show
  */
-function createPageGroups(cells, maxCodeGroupSize = 3) {
-  const pages = [];
-  const MAX_CODE_GROUP_SIZE = maxCodeGroupSize; // Maximum number of consecutive code cells to group
-  let i = 0;
-
-  while (i < cells.length) {
-    const cell = cells[i];
-    const nextCell = cells[i + 1];
-
-    if (shouldGroupWithNext(cell, nextCell)) {
-      // Group markdown + code together
-      const groupedCells = [cell, nextCell];
-      let j = i + 2;
-
-      // Check for additional consecutive code cells (up to MAX_CODE_GROUP_SIZE total)
-      while (
-        j < cells.length
-        && cells[j].classList.contains('ipynb-code-cell')
-        && groupedCells.filter((c) => c.classList.contains('ipynb-code-cell')).length < MAX_CODE_GROUP_SIZE
-      ) {
-        groupedCells.push(cells[j]);
-        j += 1;
-      }
+function createPageRenderer(pages, createCell, config) {
+  const rendered = new Map();
+
+  async function buildPage(page) {
+    const cells = [];
+    // Cells are built in order so autorun code runs in notebook order
+    for (let i = 0; i < page.outline.length; i += 1) {
+      // eslint-disable-next-line no-await-in-loop
+      cells.push(await createCell(page.outline[i]));
+    }
+    page.cells = cells;
 
-      pages.push({
-        type: 'grouped',
-        cells: groupedCells,
-      });
-      i = j; // Skip all grouped cells
-    } else {
-      // Single cell page
-      pages.push({
-        type: 'single',
-        cells: [cell],
-      });
-      i += 1;
+    await Promise.all(cells
+      .filter((cell) => cell.classList.contains('ipynb-markdown-cell'))
+      .map((cell) => inlineCellIllustrations(cell, config)));
+  }
+
+  function renderPage(pageIndex) {
+    if (pageIndex < 0 || pageIndex >= pages.length) return Promise.resolve();
+    if (!rendered.has(pageIndex)) {
+      rendered.set(pageIndex, buildPage(pages[pageIndex]));
     }
+    return rendered.get(pageIndex);
   }
 
-  return pages;
+  return async (pageIndex) => {
+    const page = renderPage(pageIndex);
+    // Render just ahead of navigation, after this page is on screen
+    page.then(() => setTimeout(() => renderPage(pageIndex + 1), 0));
+    await page;
+  };
 }
 
 /**
@@ -1697,6 +1343,25 @@ function extractMarkdownPaths(cellsContainer) {
 
 /**
 
+* Extract all markdown file paths from parsed cell HTML, without building DOM
+* @param {Array<string>} htmlStrings - HTML from parseNotebookMarkdown
+* @returns {Array<string>} Array of unique .md file paths
+ */
+function extractMarkdownPathsFromHtml(htmlStrings) {
+  const paths = new Set();
+  const mdLinkPattern = /class="ipynb-github-md-link" data-md-url="([^"]*)"/g;
+
+  htmlStrings.forEach((html) => {
+    Array.from(html.matchAll(mdLinkPattern), ([, mdUrl]) => mdUrl.match(/\/blob\/[^/]+\/(.+)$/))
+      .filter(Boolean)
+      .forEach((pathMatch) => paths.add(pathMatch[1]));
+  });
+
+  return Array.from(paths).sort();
+}
+
+/**
+
 * Extract markdown paths from a specific element (for dynamic scanning)
 * @param {HTMLElement} element - Element to scan for markdown links
 * @returns {Array<string>} Array of markdown file paths
@@ -1976,15 +1641,46 @@ async function buildHelpTreeNode(config = DEFAULT_CONFIG) {
 
 /**
 
+* Add the "Repository" root node for markdown files linked from the notebook
+* Goes straight after the "Notebook" node; does nothing without paths or
+* when the node already exists.
+* @param {Array} tree - Navigation tree array
+* @param {Array<string>} markdownPaths - Repository .md paths
+* @param {object} config - Configuration object with tree labels
+ */
+function addRepositoryNode(tree, markdownPaths, config = DEFAULT_CONFIG) {
+  if (markdownPaths.length === 0 || tree.some((node) => node.id === 'repository')) return;
+
+  const repoNode = {
+    id: 'repository',
+    label: config.treeLabels.repository,
+    type: 'root',
+    path: null,
+    cellIndex: null,
+    children: [],
+    expanded: true, // Open by default
+    level: 0,
+  };
+
+  // Build file tree with help.md prioritized (always look for it)
+  const helpPath = 'docs/help.md';
+  repoNode.children = buildFileTree(markdownPaths, helpPath, config);
+
+  const notebookIndex = tree.findIndex((node) => node.id === 'notebook');
+  tree.splice(notebookIndex + 1, 0, repoNode);
+}
+
+/**
+
 * Build navigation tree from notebook cells and repository files
-* @param {Array<HTMLElement>} cells - Array of cell elements
-* @param {HTMLElement} cellsContainer - Container for extracting markdown paths
+* @param {Array<Object>} cells - Cell outline entries (outlineNotebookCells)
+* @param {Array<string>} markdownPaths - Repository .md paths linked from the cells
 * @param {string} _helpRepoUrl - DEPRECATED: No longer used, kept for API compatibility
 * @param {object} notebookData - Raw notebook data with cells array
 * @param {object} config - Configuration object with tree labels
 * @returns {Promise<Array>} Root tree nodes (async to support help loading)
  */
-async function buildNavigationTree(cells, cellsContainer, _helpRepoUrl, notebookData = null, config = DEFAULT_CONFIG) {
+async function buildNavigationTree(cells, markdownPaths, _helpRepoUrl, notebookData = null, config = DEFAULT_CONFIG) {
   const tree = [];
   const labels = config.treeLabels;
 
@@ -2058,8 +1754,9 @@ async function buildNavigationTree(cells, cellsContainer, _helpRepoUrl, notebook
   let frontmatterNode = null;
   let summaryNode = null;
 
-  cells.forEach((cell, index) => {
-    if (cell.classList.contains('ipynb-markdown-cell')) {
+  cells.forEach((cell) => {
+    const { index } = cell;
+    if (cell.type === 'markdown') {
       // CRITICAL FIX: Extract heading from raw markdown source instead of rendered HTML
       // The rendered HTML has already had "Part X:" stripped by createMarkdownCell (line 711)
       let heading = null;
@@ -2071,8 +1768,8 @@ async function buildNavigationTree(cells, cellsContainer, _helpRepoUrl, notebook
           headingText = heading.text.trim();
         }
       } else {
-        // Fallback to rendered HTML if raw data not available
-        heading = extractHeading(cell);
+        // Fallback to the outline heading if raw data not available
+        ({ heading } = cell);
         if (heading) {
           headingText = heading.text.trim();
         }
@@ -2212,28 +1909,8 @@ async function buildNavigationTree(cells, cellsContainer, _helpRepoUrl, notebook
 
   tree.push(notebookNode);
 
-  // 3. Extract markdown paths from cells
-  const markdownPaths = extractMarkdownPaths(cellsContainer);
-
   // 4. Create "Repository" root node if we have markdown files
-  if (markdownPaths.length > 0) {
-    const repoNode = {
-      id: 'repository',
-      label: labels.repository,
-      type: 'root',
-      path: null,
-      cellIndex: null,
-      children: [],
-      expanded: true, // Open by default
-      level: 0,
-    };
-
-    // Build file tree with help.md prioritized (always look for it)
-    const helpPath = 'docs/help.md';
-    repoNode.children = buildFileTree(markdownPaths, helpPath, config);
-
-    tree.push(repoNode);
-  }
+  addRepositoryNode(tree, markdownPaths, config);
 
   // 5. Add "Help" root node if help documentation can be loaded
   const helpNode = await buildHelpTreeNode(config);
@@ -2537,16 +2214,20 @@ async function createPagedOverlay(container, cellsContainer, autorun = false, is
   const existingOverlays = document.querySelectorAll('.ipynb-paged-overlay');
   existingOverlays.forEach((overlay) => overlay.remove());
 
-  // Create page groups (smart grouping)
+  // Create page groups (smart grouping); this overlay shows the cells already built
   const { maxCodeGroupSize } = config;
-  const pages = createPageGroups(cells, maxCodeGroupSize);
+  const outline = outlineCellElements(cells);
+  const pages = createPageGroups(outline, maxCodeGroupSize);
+  pages.forEach((page) => {
+    page.cells = page.outline.map(({ element }) => element);
+  });
   const totalPages = pages.length;
 
   // Create instance-specific navigation history (rooted in this overlay)
   const navigationHistory = [];
 
   // Build navigation tree (Phase 1 - Testing)
-  const navigationTree = await buildNavigationTree(cells, cellsContainer, null, notebook, config);
+  const navigationTree = await buildNavigationTree(outline, extractMarkdownPaths(cellsContainer), null, notebook, config);
 
   // TEST: Log tree structure to console
   navigationTree.forEach((root) => {
@@ -4813,46 +4494,42 @@ export default async function decorate(block) {
       navigationTree: true, // Marker to indicate this came from a notebook
     } : null;
 
-    // Process cells sequentially to ensure proper rendering order
-    for (let index = 0; index < notebook.cells.length; index += 1) {
-      const cell = notebook.cells[index];
-      let cellElement;
+    // Page grouping, titles and the navigation tree work from the cell source
+    const outline = outlineNotebookCells(notebook.cells);
 
-      if (cell.cell_type === 'markdown') {
-        // eslint-disable-next-line no-await-in-loop
-        cellElement = await createMarkdownCell(cell, index, repoUrl, isNotebook, githubBranch, splashContext, config);
-      } else if (cell.cell_type === 'code') {
-        cellElement = createCodeCell(cell, index, shouldAutorun, config);
-
-        // Add click handler for run button (if not autorun)
-        if (!shouldAutorun) {
-          const runButton = cellElement.querySelector('.ipynb-run-button');
-          if (runButton) {
-            runButton.addEventListener('click', () => {
-              executeCodeCell(cellElement);
-            });
-          }
-        } else if (!isPaged && !isNotebook) {
-          // In autorun mode, execute immediately in default view
-          // eslint-disable-next-line no-await-in-loop
-          await executeCodeCell(cellElement);
-        }
+    // Parsed HTML once the whole notebook has been parsed; until then each
+    // markdown cell is parsed on the main thread as its page is built
+    let parsedMarkdown = new Map();
+
+    // Build the element for one outline entry
+    const createCell = async (entry) => {
+      const cell = notebook.cells[entry.index];
+      if (entry.type === 'markdown') {
+        return createMarkdownCell(cell, entry.index, repoUrl, isNotebook, githubBranch, splashContext, config, parsedMarkdown.get(entry.index));
       }
 
-      if (cellElement) {
-        cellsContainer.appendChild(cellElement);
+      const cellElement = createCodeCell(cell, entry.index, shouldAutorun, config);
+
+      // Add click handler for run button (if not autorun)
+      if (!shouldAutorun) {
+        const runButton = cellElement.querySelector('.ipynb-run-button');
+        if (runButton) {
+          runButton.addEventListener('click', () => {
+            executeCodeCell(cellElement);
+          });
+        }
+      } else if (!isPaged && !isNotebook) {
+        // In autorun mode, execute immediately in default view
+        await executeCodeCell(cellElement);
       }
-    }
+      return cellElement;
+    };
 
     // Assemble container
     container.appendChild(header);
 
     // Handle paged, autorun, notebook, and index variations
     if (isPaged || isNotebook || isIndex) {
-      // Hide cells initially in paged mode
-      cellsContainer.style.display = 'none';
-      container.appendChild(cellsContainer);
-
       // Create overlay with autorun support and notebook mode flag
       // Extract title from metadata, or find first heading in notebook cells, or use default
       let notebookTitle = notebook.metadata?.title;
@@ -4877,12 +4554,11 @@ export default async function decorate(block) {
         }
       }
 
-      // Create pages from cells
-      const cells = Array.from(cellsContainer.querySelectorAll('.ipynb-cell'));
-      const pages = createPageGroups(cells, config.maxCodeGroupSize);
+      // Create pages from the outline; cell DOM is built per page as it is opened
+      const pages = createPageGroups(outline, config.maxCodeGroupSize);
 
-      // Build navigation tree
-      const navigationTree = await buildNavigationTree(cells, cellsContainer, null, notebook, config);
+      // Build navigation tree; repository links are added once the markdown is parsed
+      const navigationTree = await buildNavigationTree(outline, [], null, notebook, config);
 
       // Tree state
       const treeState = {
@@ -4902,8 +4578,22 @@ export default async function decorate(block) {
         branch: githubBranch || 'main',
         notebookTitle,
         renderNavigationTree, // Use existing function from main file
+        preparePage: createPageRenderer(pages, createCell, config),
       });
 
+      // Parse the rest of the notebook after this task, for the pages not
+      // built yet and the repository links in the navigation tree. If it
+      // fails, pages keep parsing their own cells as they are built.
+      setTimeout(async () => {
+        try {
+          parsedMarkdown = await parseNotebookMarkdown(notebook.cells, repoUrl, githubBranch, config);
+          addRepositoryNode(navigationTree, extractMarkdownPathsFromHtml(Array.from(parsedMarkdown.values())), config);
+        } catch (error) {
+          // eslint-disable-next-line no-console
+          console.error('ipynb-viewer: background markdown parse failed', error);
+        }
+      }, 0);
+
       // Clear any hash from URL on initial page load (hard refresh)
       // Hash navigation is only for in-session navigation, not initial load
       if (window.location.hash) {
@@ -4939,8 +4629,19 @@ export default async function decorate(block) {
         container.appendChild(buttonContainer);
       }
     } else {
-      // Default mode: show all cells
+      // Default mode: every cell is shown, so parse the whole notebook first
+      parsedMarkdown = await parseNotebookMarkdown(notebook.cells, repoUrl, githubBranch, config);
+
+      // Process cells sequentially to ensure proper rendering order
+      for (let i = 0; i < outline.length; i += 1) {
+        // eslint-disable-next-line no-await-in-loop
+        cellsContainer.appendChild(await createCell(outline[i]));
+      }
+
+      // Show all cells, inlining illustrations as they arrive
       container.appendChild(cellsContainer);
+      cellsContainer.querySelectorAll('.ipynb-markdown-cell')
+        .forEach((cell) => inlineCellIllustrations(cell, config));
     }
 
     block.appendChild(container);
@@ -0,0 +1,456 @@
+/**
+
+* IPynb Markdown Parser
+* Converts notebook markdown cells to HTML. Kept free of DOM access so the
+* same parser runs on the main thread and in the cell parser worker.
+ * @file markdown-parser.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool
+ * @mx:partOf mx-os
+
+ */
+
+/**
+
+* Parse markdown text to HTML (enhanced implementation)
+* @param {string} markdown - Markdown text
+* @param {string} [repoUrl] - Optional repository URL for converting .md links
+* @param {string} [branch='main'] - GitHub branch to use for .md links
+* @param {string} [currentFilePath] - Optional current file path for resolving relative links
+* @returns {string} HTML string
+ */
+export function parseMarkdown(markdown, repoUrl = null, branch = 'main', currentFilePath = null) {
+  let html = markdown;
+
+  // Filter out LaTeX commands and attributes (lines starting with \ or containing {.attribute})
+  // These are LaTeX formatting commands like \newpage, \pagebreak, \addtocontents, etc.
+  // and Pandoc/LaTeX class attributes like {.unnumbered .unlisted}
+  // that should be ignored in markdown rendering
+  html = html.split('\n')
+    .filter((line) => {
+      const trimmed = line.trim();
+      // Remove lines that start with a LaTeX command (backslash followed by letters)
+      if (/^\\[a-zA-Z]+/.test(trimmed)) {
+        return false;
+      }
+      // Remove lines that are ONLY LaTeX/Pandoc class attributes like {.unnumbered .unlisted}
+      if (/^\{\.[a-zA-Z.\s]+\}$/.test(trimmed)) {
+        return false;
+      }
+      return true;
+    })
+    .join('\n');
+
+  // Code blocks (triple backticks) - MUST be processed first before other replacements
+  const codeBlockPlaceholders = [];
+  html = html.replace(/```(\w+)?\n?([\s\S]*?)```/g, (match, lang, code) => {
+    const placeholder = `__CODEBLOCK_${codeBlockPlaceholders.length}__`;
+    // Preserve formatting: escape HTML but keep newlines and indentation
+    const escapedCode = code
+      .replace(/</g, '&lt;')
+      .replace(/>/g, '&gt;');
+    codeBlockPlaceholders.push(`<pre><code class="language-${lang || 'plaintext'}">${escapedCode}</code></pre>`);
+    return placeholder;
+  });
+
+  // Extract inline code and protect it with placeholders
+  const inlineCodePlaceholders = [];
+  html = html.replace(/`([^`]+)`/g, (match, code) => {
+    const placeholder =`__INLINECODE_${inlineCodePlaceholders.length}__`;
+    inlineCodePlaceholders.push(code);
+    return placeholder;
+  });
+
+  // Handle escaped HTML characters (e.g., \<img>, \:// in documentation examples)
+  // These should be rendered as literal text, not actual HTML
+  html = html.replace(/\\</g, '&lt;');
+  html = html.replace(/\\>/g, '&gt;');
+  html = html.replace(/\\:/g, ':');
+
+  // Convert angle-bracket enclosed URLs to markdown link format
+  // Must happen BEFORE HTML escaping (line 69) to preserve angle brackets
+  // Example: <https://github.com> becomes [https://github.com](https://github.com)
+  html = html.replace(/<(https?:\/\/[^>]+)>/g, (match, url) => `[${url}](${url})`);
+
+  // Escape all remaining HTML tags (not in code blocks or inline code)
+  // This prevents inline HTML from being rendered, matching GitHub's behavior
+  html = html.replace(/</g, '&lt;');
+  html = html.replace(/>/g, '&gt;');
+
+  // Tables - must be before line breaks
+  const lines = html.split('\n');
+  const processedLines = [];
+  let inTable = false;
+  let tableRows = [];
+  let tableRowCount = 0;
+
+  // Helper function to create a table row (defined outside loop to avoid closure issues)
+  const createTableRow = (tableCells, isFirstRow) => {
+    const tag = isFirstRow ? 'th' : 'td';
+    return `<tr>${tableCells.map((cell) =>`<${tag}>${cell.trim()}</${tag}>`).join('')}</tr>`;
+  };
+
+  lines.forEach((line) => {
+    // Check if line is a table row
+    if (line.trim().startsWith('|') && line.trim().endsWith('|')) {
+      // Skip separator rows (|---|---|) - must include | in character class
+      if (/^\|[\s\-:|]+\|$/.test(line.trim())) {
+        return; // Skip this iteration (equivalent to continue)
+      }
+
+      if (!inTable) {
+        inTable = true;
+        tableRows = [];
+        tableRowCount = 0;
+      }
+
+      const tableCells = line.split('|').filter((cell) => cell.trim());
+      const row = createTableRow(tableCells, tableRowCount === 0);
+      tableRows.push(row);
+      tableRowCount += 1;
+    } else {
+      // Not a table row
+      if (inTable) {
+        // End of table, flush accumulated rows
+        processedLines.push(`<table>${tableRows.join('')}</table>`);
+        tableRows = [];
+        tableRowCount = 0;
+        inTable = false;
+      }
+      processedLines.push(line);
+    }
+  });
+
+  // Flush any remaining table
+  if (inTable && tableRows.length > 0) {
+    processedLines.push(`<table>${tableRows.join('')}</table>`);
+  }
+
+  html = processedLines.join('\n');
+
+  // Headers (process in order from most specific to least)
+  // Add IDs to h2 headers for navigation
+  html = html.replace(/^###### (._$)/gim, '<h6>$1</h6>');
+  html = html.replace(/^##### (._$)/gim, '<h5>$1</h5>');
+  html = html.replace(/^#### (._$)/gim, '<h4>$1</h4>');
+  html = html.replace(/^### (._$)/gim, '<h3>$1</h3>');
+  html = html.replace(/^## (.*$)/gim, (match, text) => {
+    // Generate ID from text (lowercase, replace spaces with hyphens, remove special chars)
+    const id = text
+      .toLowerCase()
+      .replace(/[^\w\s-]/g, '') // Remove special characters except word chars, spaces, hyphens
+      .replace(/\s+/g, '-') // Replace spaces with hyphens
+      .replace(/-+/g, '-') // Replace multiple hyphens with single hyphen
+      .replace(/^-+|-+$/g, '') // Remove leading and trailing hyphens
+      .trim();
+
+    return `<h2 id="${id}">${text}</h2>`;
+  });
+  html = html.replace(/^# (.*$)/gim, '<h1>$1</h1>');
+
+  // Horizontal rules (must be before bold/italic to avoid conflicts)
+  // Matches: ---, *_*, or ___ (3 or more, with optional spaces)
+  html = html.replace(/^(?:[-*_]\s_){3,}$/gim, '<hr>');
+
+  // Images - process BEFORE links since images use ![alt](url) syntax
+  html = html.replace(/!\[([^\]]_)\]\(([^)]+)\)/g, (_match, alt, url) => {
+    // Auto-convert PNG illustrations to SVG (pattern: illustrations/_.png → illustrations/_.svg)
+    let processedUrl = url;
+    if (url.match(/illustrations\/._\.png$/i)) {
+      processedUrl = url.replace(/\.png$/i, '.svg');
+    }
+
+    // Resolve image URLs to GitHub raw content if repo available and path is relative
+    if (repoUrl && !processedUrl.startsWith('http://') && !processedUrl.startsWith('https://')) {
+      let imagePath = processedUrl;
+
+      // Resolve relative paths based on current file location
+      if (currentFilePath && !processedUrl.startsWith('/')) {
+        // Extract directory from current file
+        const currentDir = currentFilePath.substring(0, currentFilePath.lastIndexOf('/'));
+        const parts = currentDir ? currentDir.split('/') : [];
+        const urlParts = processedUrl.replace(/^\.\//, '').split('/');
+
+        // Process path parts
+        urlParts.forEach((part) => {
+          if (part === '..') {
+            if (parts.length > 0) parts.pop();
+          } else if (part !== '.' && part !== '') {
+            parts.push(part);
+          }
+        });
+
+        imagePath = parts.join('/');
+      } else if (processedUrl.startsWith('/')) {
+        // Absolute path from repo root
+        imagePath = processedUrl.replace(/^\//, '');
+      }
+
+      // Convert to raw GitHub URL
+      const rawUrl = `${repoUrl.replace('github.com', 'raw.githubusercontent.com')}/${branch}/${imagePath}`;
+      return `<img src="${rawUrl}" alt="${alt}" class="ipynb-markdown-image" loading="lazy">`;
+    }
+
+    // Return inline image with alt text (for absolute URLs or when no repo)
+    return `<img src="${processedUrl}" alt="${alt}" class="ipynb-markdown-image" loading="lazy">`;
+  });
+
+  // Links - convert .md files to repo URLs if repo is available
+  // Process AFTER images (images also use bracket syntax but with ! prefix)
+  html = html.replace(/\[([^\]]+)\]\(([^)]+)\)/g, (match, text, url) => {
+    // Auto-convert PNG illustrations to SVG (pattern: illustrations/_.png → illustrations/_.svg)
+    let processedUrl = url;
+    if (url.match(/illustrations\/.*\.png$/i)) {
+      processedUrl = url.replace(/\.png$/i, '.svg');
+    }
+
+    // Check if it's a .md file and we have a repo URL
+    if (repoUrl && processedUrl.endsWith('.md') && !processedUrl.startsWith('http://') && !processedUrl.startsWith('https://')) {
+      let cleanPath = processedUrl;
+
+      // Resolve relative paths based on current file location
+      if (currentFilePath && !processedUrl.startsWith('/') && !processedUrl.startsWith('http')) {
+        // This is a relative path - resolve it based on current file's directory
+
+        // Extract the directory path from the current file (remove filename)
+        const currentDir = currentFilePath.substring(0, currentFilePath.lastIndexOf('/'));
+
+        // Combine current directory with relative path
+        const parts = currentDir ? currentDir.split('/') : [];
+        const urlParts = processedUrl.replace(/^\.\//, '').split('/'); // Remove leading ./ if present
+
+        // Process each part of the URL
+        urlParts.forEach((part) => {
+          if (part === '..') {
+            // Go up one directory
+            if (parts.length > 0) {
+              parts.pop();
+            }
+          } else if (part !== '.' && part !== '') {
+            // Add directory or filename
+            parts.push(part);
+          }
+        });
+
+        cleanPath = parts.join('/');
+      } else if (processedUrl.startsWith('/')) {
+        // Absolute path from repo root - remove leading /
+        cleanPath = processedUrl.replace(/^\//, '');
+      } else {
+        // No currentFilePath or already absolute URL
+        cleanPath = processedUrl.replace(/^\.?\//, '');
+        if ((processedUrl.startsWith('../') || processedUrl.includes('/../')) && !currentFilePath) {
+        }
+      }
+
+      // Build full repo URL using the specified branch
+      const fullUrl = `${repoUrl}/blob/${branch}/${cleanPath}`;
+      // Mark GitHub markdown links with special class for overlay handling
+      // Use href="#" to prevent browser prefetching, store actual URL in data attribute
+      return `<a href="#" class="ipynb-github-md-link" data-md-url="${fullUrl}" data-md-path="${cleanPath}" data-repo="${repoUrl}" data-branch="${branch}">${text}</a>`;
+    }
+
+    // External links (http/https) - clickable links that open in new tab
+    if (processedUrl.startsWith('http://') || processedUrl.startsWith('https://')) {
+      return `<a href="${processedUrl}" class="ipynb-external-link" title="Open in new tab: ${processedUrl}" target="_blank" rel="noopener noreferrer">${text}</a>`;
+    }
+
+    // Hash links - keep as-is for internal navigation
+    if (processedUrl.startsWith('#')) {
+      return `<a href="${processedUrl}">${text}</a>`;
+    }
+
+    // Other file types (.html, .htm, images, etc.) - display as non-clickable text
+    // Show the filename/path for documentation purposes (show converted URL)
+    return `<span class="ipynb-non-md-link" title="${processedUrl}">${text} <code>(${processedUrl})</code></span>`;
+  });
+
+  // Lists - process line by line with nested list support (BEFORE bold/italic)
+  const linesWithLists = html.split('\n');
+  const processedWithLists = [];
+  const listStack = []; // Track nested list state: [{type: 'ol'|'ul', indent: number}]
+  let lastIndent = -1;
+
+  linesWithLists.forEach((line) => {
+    // Match list items with indentation
+    const ulMatch = line.match(/^[\s*](-*) (.+)$/);
+    const olMatch = line.match(/^(\s*)\d+\. (.+)$/);
+
+    if (ulMatch || olMatch) {
+      const isUl = !!ulMatch;
+      const indent = (ulMatch ? ulMatch[1] : olMatch[1]).length;
+      const content = ulMatch ? ulMatch[2] : olMatch[2];
+      const listType = isUl ? 'ul' : 'ol';
+
+      // Handle nesting based on indentation
+      if (indent > lastIndent) {
+        // Starting a new nested list
+        if (listStack.length > 0) {
+          // Close the previous <li> and open nested list inside it
+          const lastItem = processedWithLists[processedWithLists.length - 1];
+          if (lastItem && lastItem.endsWith('</li>')) {
+            // Remove the closing </li> tag
+            processedWithLists[processedWithLists.length - 1] = lastItem.slice(0, -5);
+          }
+        }
+        processedWithLists.push(`<${listType}>`);
+        listStack.push({ type: listType, indent });
+      } else if (indent < lastIndent) {
+        // Closing nested lists
+        while (listStack.length > 0 && listStack[listStack.length - 1].indent > indent) {
+          const closed = listStack.pop();
+          processedWithLists.push(`</${closed.type}>`);
+          // Close the parent <li> that contained the nested list
+          if (listStack.length > 0) {
+            processedWithLists.push('</li>');
+          }
+        }
+
+        // Check if we need to start a new list at this level
+        if (listStack.length === 0 || listStack[listStack.length - 1].type !== listType) {
+          if (listStack.length > 0) {
+            // Close existing list at this level
+            const closed = listStack.pop();
+            processedWithLists.push(`</${closed.type}>`);
+          }
+          processedWithLists.push(`<${listType}>`);
+          listStack.push({ type: listType, indent });
+        }
+      } else if (listStack.length > 0 && listStack[listStack.length - 1].type !== listType) {
+        // Same indent but different list type - close and reopen
+        const closed = listStack.pop();
+        processedWithLists.push(`</${closed.type}>`);
+        processedWithLists.push(`<${listType}>`);
+        listStack.push({ type: listType, indent });
+      } else if (listStack.length === 0) {
+        // First list item
+        processedWithLists.push(`<${listType}>`);
+        listStack.push({ type: listType, indent });
+      }
+
+      processedWithLists.push(`<li>${content}</li>`);
+      lastIndent = indent;
+    } else {
+      // Non-list line - close all open lists
+      while (listStack.length > 0) {
+        const closed = listStack.pop();
+        processedWithLists.push(`</${closed.type}>`);
+      }
+      processedWithLists.push(line);
+      lastIndent = -1;
+    }
+  });
+
+  // Close any remaining open lists
+  while (listStack.length > 0) {
+    const closed = listStack.pop();
+    processedWithLists.push(`</${closed.type}>`);
+  }
+
+  html = processedWithLists.join('\n');
+
+  // Bold (process after lists to allow bold text in list items)
+  html = html.replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>');
+
+  // Italic (process after bold)
+  html = html.replace(/\*(.+?)\*/g, '<em>$1</em>');
+
+  // Blockquotes - process line by line (must match raw > character, not &gt;)
+  const linesWithBlockquotes = html.split('\n');
+  const processedWithBlockquotes = [];
+  let inBlockquote = false;
+
+  linesWithBlockquotes.forEach((line) => {
+    // Match lines starting with > (raw character, before any HTML encoding)
+    const blockquoteMatch = line.match(/^>\s?(.*)$/);
+
+    if (blockquoteMatch) {
+      if (!inBlockquote) {
+        processedWithBlockquotes.push('<blockquote>');
+        inBlockquote = true;
+      }
+      // Add the line content (without the > prefix)
+      processedWithBlockquotes.push(blockquoteMatch[1]);
+    } else {
+      // Close blockquote if we were in one
+      if (inBlockquote) {
+        processedWithBlockquotes.push('</blockquote>');
+        inBlockquote = false;
+      }
+      processedWithBlockquotes.push(line);
+    }
+  });
+
+  // Close any remaining open blockquote
+  if (inBlockquote) processedWithBlockquotes.push('</blockquote>');
+
+  html = processedWithBlockquotes.join('\n');
+
+  // Line breaks - wrap paragraphs properly
+  // Split by double newlines to identify paragraphs
+  const paragraphs = html.split(/\n\n+/);
+
+  // Wrap each paragraph in <p> tags, unless it's already a block element
+  // CRITICAL FIX: Add __CODEBLOCK_ pattern to prevent wrapping placeholders in <p> tags
+  const blockElementPattern = /^<(h[1-6]|table|ul|ol|blockquote|pre|hr)|__CODEBLOCK_/;
+  const preBlockPattern = /^<pre/; // Separate pattern for code blocks that need newlines preserved
+
+  html = paragraphs
+    .map((para) => {
+      const trimmed = para.trim();
+      if (!trimmed) return ''; // Skip empty paragraphs
+      if (blockElementPattern.test(trimmed)) {
+        // Block element detected
+        if (preBlockPattern.test(trimmed)) {
+          // Code blocks - preserve all newlines
+          return trimmed;
+        }
+        // Other block elements - convert newlines to spaces
+        return trimmed.replace(/\n/g, ' ');
+      }
+      // Regular paragraph - wrap in <p> and convert single newlines to spaces
+      return `<p>${trimmed.replace(/\n/g, ' ')}</p>`;
+    })
+    .filter((p) => p) // Remove empty strings
+    .join('\n\n'); // Use double newline for better spacing between blocks
+
+  // Restore code blocks (MOVED to after paragraph processing to prevent splitting by newlines)
+  codeBlockPlaceholders.forEach((codeBlock, index) => {
+    html = html.replace(`__CODEBLOCK_${index}__`, codeBlock);
+  });
+
+  // Restore inline code (now as <code> elements with content)
+  // Escape HTML entities to display code literally (e.g., `<div>` shows as <div>, not rendered)
+  inlineCodePlaceholders.forEach((code, index) => {
+    const escapedCode = code
+      .replace(/&/g, '&amp;') // Must be first - escape existing ampersands
+      .replace(/</g, '&lt;') // Escape less-than
+      .replace(/>/g, '&gt;') // Escape greater-than
+      .replace(/"/g, '&quot;') // Escape double quotes
+      .replace(/'/g, '&#39;'); // Escape single quotes
+    html = html.replace(`__INLINECODE_${index}__`, `<code>${escapedCode}</code>`);
+  });
+
+  return html;
+}
+
+/**
+
+* Parse a notebook markdown cell to the HTML the viewer shows
+* Strips the "Part X:" / "Chapter X:" prefix from headings in the viewer pane;
+* the navigation tree reads the prefix from the raw cell source instead.
+* @param {string} markdownText - Joined cell source
+* @param {string} [repoUrl] - Optional repository URL for converting .md links
+* @param {string} [branch='main'] - GitHub branch to use for .md links
+* @returns {string} HTML string
+ */
+export function parseCellMarkdown(markdownText, repoUrl = null, branch = 'main') {
+  const html = parseMarkdown(markdownText, repoUrl, branch);
+  // Note: H2 tags have id attributes, so we need to match those
+  return html.replace(/<h2([^>]_)>(Part|Chapter)\s+\d+:\s_(.+?)<\/h2>/gi, '<h2$1>$3</h2>');
+}
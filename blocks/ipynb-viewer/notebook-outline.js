@@ -0,0 +1,162 @@
+/**
+
+* IPynb Notebook Outline
+* Describes notebook cells from their source and groups them into pages,
+* without parsing markdown or building DOM. Kept free of DOM access so the
+* first page can be chosen before any cell is rendered, and so
+* scripts/bench-ipynb-viewer.js can time it under Node.
+ * @file notebook-outline.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, performance
+ * @mx:partOf mx-os
+
+ */
+
+/**
+
+* Approximate the text a markdown cell shows, without parsing or rendering it
+* Drops image syntax, link targets and emphasis/code markers; everything
+* else, inline HTML included, is shown as written by the parser.
+* @param {string} markdownText - Joined cell source
+* @returns {string} Plain text, trimmed
+ */
+function getMarkdownText(markdownText) {
+  return markdownText
+    .replace(/!\[[^\]]*\]\([^)]*\)/g, '')
+    .replace(/\[([^\]]*)\]\([^)]*\)/g, '$1')
+    .replace(/[*`]/g, '')
+    .trim();
+}
+
+/**
+
+* Find the first h1-h3 heading of a markdown cell from its source
+* Lines inside code fences are skipped.
+* @param {string} markdownText - Joined cell source
+* @returns {Object|null} Heading object with text and level, or null
+ */
+function getMarkdownHeading(markdownText) {
+  const match = markdownText
+    .replace(/^```[\s\S]*?^```/gm, '')
+    .match(/^(#{1,3})\s+(.+)$/m);
+  if (!match) return null;
+
+  return {
+    text: getMarkdownText(match[2]),
+    level: match[1].length,
+  };
+}
+
+/**
+
+* Describe the markdown and code cells of a notebook from their source
+* Page grouping, page titles and the navigation tree read this outline, so
+* cell DOM is only built for the pages a reader opens.
+* @param {Array<object>} cells - Notebook cells
+* @returns {Array<Object>} { index, type, source, text, heading } per cell
+ */
+export function outlineNotebookCells(cells) {
+  const outline = [];
+  cells.forEach((cell, index) => {
+    if (cell.cell_type !== 'markdown' && cell.cell_type !== 'code') return;
+    const source = Array.isArray(cell.source) ? cell.source.join('') : cell.source;
+    const isMarkdown = cell.cell_type === 'markdown';
+    outline.push({
+      index,
+      type: cell.cell_type,
+      source,
+      text: isMarkdown ? getMarkdownText(source) : source,
+      heading: isMarkdown ? getMarkdownHeading(source) : null,
+    });
+  });
+  return outline;
+}
+
+/**
+
+* Check if a markdown cell should be grouped with the next code cell
+* @param {Object} cell - Current cell outline entry
+* @param {Object} nextCell - Next cell outline entry
+* @returns {boolean} True if cells should be grouped
+ */
+function shouldGroupWithNext(cell, nextCell) {
+  if (!cell || !nextCell) return false;
+  if (cell.type !== 'markdown') return false;
+  if (nextCell.type !== 'code') return false;
+
+  // Get markdown content
+  const content = cell.text;
+
+  // Patterns that suggest the markdown is describing the following code
+  const groupingPatterns = [
+    /:\s*$/, // Ends with colon
+    /below/i, // Contains "below"
+    /following/i, // Contains "following"
+    /try running/i, // Contains "try running"
+    /click run/i, // Contains "click run"
+    /run the cell/i, // Contains "run the cell"
+    /let's test/i, // Contains "let's test"
+    /let's try/i, // Contains "let's try"
+    /example:/i, // Contains "example:"
+    /here's how/i, // Contains "here's how"
+  ];
+
+  return groupingPatterns.some((pattern) => pattern.test(content));
+}
+
+/**
+
+* Create page groups from cells for smart pagination
+* Pages hold the outline entries they cover; page.cells starts empty and is
+* filled with cell elements by createPageRenderer.
+* @param {Array<Object>} cells - Cell outline entries
+* @returns {Array<Object>} Array of page objects ({ type, outline, cells })
+ */
+export function createPageGroups(cells, maxCodeGroupSize = 3) {
+  const pages = [];
+  const MAX_CODE_GROUP_SIZE = maxCodeGroupSize; // Maximum number of consecutive code cells to group
+  let i = 0;
+
+  while (i < cells.length) {
+    const cell = cells[i];
+    const nextCell = cells[i + 1];
+
+    if (shouldGroupWithNext(cell, nextCell)) {
+      // Group markdown + code together
+      const groupedCells = [cell, nextCell];
+      let j = i + 2;
+
+      // Check for additional consecutive code cells (up to MAX_CODE_GROUP_SIZE total)
+      while (
+        j < cells.length
+        && cells[j].type === 'code'
+        && groupedCells.filter((c) => c.type === 'code').length < MAX_CODE_GROUP_SIZE
+      ) {
+        groupedCells.push(cells[j]);
+        j += 1;
+      }
+
+      pages.push({
+        type: 'grouped',
+        outline: groupedCells,
+        cells: [],
+      });
+      i = j; // Skip all grouped cells
+    } else {
+      // Single cell page
+      pages.push({
+        type: 'single',
+        outline: [cell],
+        cells: [],
+      });
+      i += 1;
+    }
+  }
+
+  return pages;
+}
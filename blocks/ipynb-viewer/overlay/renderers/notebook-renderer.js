@@ -21,6 +21,7 @@ export function renderNotebookContent(contentArea, {
   config,
   onPageChange,
   onCellExecute,
+  preparePage = null,
 }) {
   contentArea.innerHTML = '';
   // Keep existing class name - don't override
@@ -37,6 +38,13 @@ export function renderNotebookContent(contentArea, {
     if (pageIndex < 0 || pageIndex >= totalPages) return;
     currentPageIndex = pageIndex;
 
+    // Let the block finish rendering this page group (and start the next)
+    if (preparePage) {
+      await preparePage(pageIndex);
+      // A later navigation won while this page was rendering
+      if (currentPageIndex !== pageIndex) return;
+    }
+
     cellsContainer.innerHTML = '';
 
     const page = pages[currentPageIndex];
@@ -65,25 +73,19 @@ export function renderNotebookContent(contentArea, {
     getTotalPages: () => totalPages,
     destroy: () => {},
     navigateToCell: async (cellIndex) => {
-      const pageIndex = pages.findIndex((page) => page.cells.some(
-        (cell) => parseInt(cell.dataset.cellIndex, 10) === cellIndex,
+      const pageIndex = pages.findIndex((page) => page.outline.some(
+        (cell) => cell.index === cellIndex,
       ));
       if (pageIndex !== -1) { await updatePage(pageIndex); return true; }
       return false;
     },
     navigateToHeading: async (slug) => {
       const pageIndex = pages.findIndex((page) => {
-        const firstCell = page.cells[0];
-        if (firstCell && firstCell.classList.contains('ipynb-markdown-cell')) {
-          const content = firstCell.querySelector('.ipynb-cell-content');
-          if (content) {
-            const heading = content.querySelector('h1, h2, h3');
-            if (heading) {
-              const headingSlug = heading.textContent.toLowerCase().trim()
-                .replace(/[^\w\s-]/g, '').replace(/\s+/g, '-').replace(/-+/g, '-').replace(/^-+|-+$/g, '');
-              return headingSlug === slug;
-            }
-          }
+        const heading = page.outline[0]?.heading;
+        if (heading) {
+          const headingSlug = heading.text.toLowerCase().trim()
+            .replace(/[^\w\s-]/g, '').replace(/\s+/g, '-').replace(/-+/g, '-').replace(/^-+|-+$/g, '');
+          return headingSlug === slug;
         }
         return false;
       });
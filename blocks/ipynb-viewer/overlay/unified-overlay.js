@@ -30,6 +30,7 @@ export function createUnifiedOverlay({
   branch,
   notebookTitle,
   renderNavigationTree,
+  preparePage = null,
 }) {
   // Remove any existing overlays
   document.querySelectorAll('.ipynb-unified-overlay').forEach((el) => el.remove());
@@ -126,17 +127,15 @@ export function createUnifiedOverlay({
       let pageTitle = notebookTitle;
       let firstCellIndex = null;
 
-      if (page && page.cells && page.cells[0]) {
-        const firstCell = page.cells[0];
+      // Pages carry an outline of their cells; the cell DOM is built only when shown
+      if (page && page.outline && page.outline[0]) {
+        const firstCell = page.outline[0];
 
         // Get cell index for tree highlighting
-        firstCellIndex = parseInt(firstCell.dataset.cellIndex, 10);
+        firstCellIndex = firstCell.index;
 
-        if (firstCell.classList.contains('ipynb-markdown-cell')) {
-          const heading = firstCell.querySelector('.ipynb-cell-content h1, .ipynb-cell-content h2, .ipynb-cell-content h3');
-          if (heading) {
-            pageTitle = heading.textContent.trim();
-          }
+        if (firstCell.heading) {
+          pageTitle = firstCell.heading.text;
         }
       }
       toolbar.updateTitle(pageTitle);
@@ -152,22 +151,20 @@ export function createUnifiedOverlay({
         currentPage: currentView.data.pageIndex,
         navigationState,
         config,
+        preparePage,
         onPageChange: (pageIndex) => {
           // Update toolbar title to match current page heading
           const page = pages[pageIndex];
           let firstCellIndex = null;
 
-          if (page && page.cells && page.cells[0]) {
-            const firstCell = page.cells[0];
+          if (page && page.outline && page.outline[0]) {
+            const firstCell = page.outline[0];
 
             // Get cell index for tree highlighting
-            firstCellIndex = parseInt(firstCell.dataset.cellIndex, 10);
+            firstCellIndex = firstCell.index;
 
-            if (firstCell.classList.contains('ipynb-markdown-cell')) {
-              const heading = firstCell.querySelector('.ipynb-cell-content h1, .ipynb-cell-content h2, .ipynb-cell-content h3');
-              if (heading) {
-                toolbar.updateTitle(heading.textContent.trim());
-              }
+            if (firstCell.heading) {
+              toolbar.updateTitle(firstCell.heading.text);
             }
           }
 
@@ -189,12 +186,9 @@ export function createUnifiedOverlay({
       });
 
       const tocItems = pages.map((page, index) => {
-        const firstCell = page.cells[0];
+        const firstCell = page.outline[0];
         let title = `Page ${index + 1}`;
-        if (firstCell?.classList.contains('ipynb-markdown-cell')) {
-          const heading = firstCell.querySelector('.ipynb-cell-content h1, .ipynb-cell-content h2, .ipynb-cell-content h3');
-          if (heading) title = heading.textContent.trim();
-        }
+        if (firstCell?.heading) title = firstCell.heading.text;
         return {
           level: 2,
           text: title,
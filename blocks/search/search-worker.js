@@ -0,0 +1,53 @@
+/**
+ * @file search-worker.js
+ * @description Runs search block queries against the sharded search index
+ * off the main thread. Receives { id, manifestUrl, terms, offset } and
+ * replies { id, results, total, sourceLastModified }, { id, stale } or
+ * { id, error }.
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, search
+ * @mx:partOf mx-os
+ */
+import { createSearchIndex } from '../../scripts/search-index.js';
+
+const indexes = new Map();
+let latestId = 0;
+
+async function loadJson(url) {
+  const response = await fetch(url);
+  if (!response.ok) throw new Error(`Failed to load ${url}: ${response.status}`);
+  return response.json();
+}
+
+function getIndex(manifestUrl) {
+  if (!indexes.has(manifestUrl)) {
+    indexes.set(manifestUrl, createSearchIndex(manifestUrl, loadJson));
+  }
+  return indexes.get(manifestUrl);
+}
+
+// eslint-disable-next-line no-restricted-globals
+self.addEventListener('message', async ({ data }) => {
+  const {
+    id, manifestUrl, terms, offset,
+  } = data;
+  latestId = id;
+  try {
+    const reply = await getIndex(manifestUrl).search(terms, {
+      offset,
+      isStale: () => id !== latestId,
+    });
+    // eslint-disable-next-line no-restricted-globals
+    self.postMessage({ id, ...reply });
+  } catch (error) {
+    // A manifest that failed to load is dropped so the next query retries
+    indexes.delete(manifestUrl);
+    // eslint-disable-next-line no-restricted-globals
+    self.postMessage({ id, error: error.message });
+  }
+});
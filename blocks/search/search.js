@@ -15,6 +15,8 @@ import {
   decorateIcons,
   fetchPlaceholders,
 } from '../../scripts/aem.js';
+import { loadQueryIndex } from '../../scripts/query-index.js';
+import { createSearchIndex, rowsLastModified } from '../../scripts/search-index.js';
 
 const searchParams = new URLSearchParams(window.location.search);
 
@@ -40,13 +42,13 @@ function highlightTextElements(terms, elements) {
 
     const matches = [];
     const { textContent } = element;
+    const lowerText = textContent.toLowerCase();
     terms.forEach((term) => {
-      let start = 0;
-      let offset = textContent.toLowerCase().indexOf(term.toLowerCase(), start);
+      const lowerTerm = term.toLowerCase();
+      let offset = lowerText.indexOf(lowerTerm);
       while (offset >= 0) {
         matches.push({ offset, term: textContent.substring(offset, offset + term.length) });
-        start = offset + term.length;
-        offset = textContent.toLowerCase().indexOf(term.toLowerCase(), start);
+        offset = lowerText.indexOf(lowerTerm, offset + term.length);
       }
     });
 
@@ -78,21 +80,112 @@ function highlightTextElements(terms, elements) {
 }
 
 export async function fetchData(source) {
-  const response = await fetch(source);
-  if (!response.ok) {
+  // Shared with the other blocks and loaded once per page, so typing does
+  // not refetch the index on every keystroke
+  try {
+    const index = await loadQueryIndex(source);
+    return index.rows;
+  } catch (error) {
     // eslint-disable-next-line no-console
-    console.error('error loading API response', response);
+    console.error('error loading API response', source, error);
     return null;
   }
+}
 
-  const json = await response.json();
-  if (!json) {
-    // eslint-disable-next-line no-console
-    console.error('empty API response', source);
-    return null;
+// When each query index last changed, looked up once per page however
+// many search blocks share it
+const sourceLastModified = new Map();
+
+/**
+ * When the query index last changed: its Last-Modified header from a HEAD
+ * request, or the newest of its (shared, cached) rows when the header is
+ * missing. Compared with the search index manifest's sourceLastModified,
+ * which comes back with the first results, to spot pages published after
+ * the index was built.
+ * @param {string} source - query index the manifest was built from
+ * @returns {Promise<number>} milliseconds, 0 when unknown
+ */
+function queryIndexLastModified(source) {
+  if (!sourceLastModified.has(source)) {
+    sourceLastModified.set(source, fetch(source, { method: 'HEAD' })
+      .then((response) => Date.parse(response.ok ? response.headers.get('Last-Modified') : ''))
+      .catch(() => NaN)
+      .then(async (lastModified) => {
+        if (lastModified) return lastModified;
+        const data = await fetchData(source);
+        return data ? rowsLastModified(data) : 0;
+      }));
+  }
+  return sourceLastModified.get(source);
+}
+
+/**
+ * Query the sharded search index in a Web Worker, or on the main thread
+ * where module workers are not available. Resolves a page of results as
+ * { results, total, sourceLastModified }.
+ */
+function createIndexSearch(manifestUrl) {
+  const pending = new Map();
+  let nextId = 0;
+  let worker = null;
+  let local = null;
+
+  function searchLocally(terms, offset) {
+    if (!local) {
+      local = createSearchIndex(manifestUrl, async (url) => {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`Failed to load ${url}: ${response.status}`);
+        return response.json();
+      });
+    }
+    return local.search(terms, { offset });
+  }
+
+  function stopWorker() {
+    if (worker) worker.terminate();
+    worker = null;
+    // Anything the worker had not answered is retried on the main thread
+    pending.forEach(({
+      terms, offset, resolve, reject,
+    }) => searchLocally(terms, offset).then(resolve, reject));
+    pending.clear();
+  }
+
+  function startWorker() {
+    try {
+      worker = new Worker(new URL('./search-worker.js', import.meta.url), { type: 'module' });
+      worker.addEventListener('message', ({ data }) => {
+        const request = pending.get(data.id);
+        if (!request) return;
+        pending.delete(data.id);
+        if (data.error) request.reject(new Error(data.error));
+        else request.resolve(data);
+      });
+      worker.addEventListener('error', stopWorker);
+    } catch (error) {
+      worker = null;
+    }
   }
 
-  return json.data;
+  // The worker starts with the first query, not when the block decorates
+  let started = false;
+  return (terms, offset = 0) => {
+    if (!started) {
+      started = true;
+      startWorker();
+    }
+    if (!worker) return searchLocally(terms, offset);
+    nextId += 1;
+    const id = nextId;
+    return new Promise((resolve, reject) => {
+      pending.set(id, {
+        terms, offset, resolve, reject,
+      });
+      worker.postMessage({
+        id, manifestUrl, terms, offset,
+      });
+    });
+  };
 }
 
 function renderResult(result, searchTerms, titleTag) {
@@ -160,6 +253,33 @@ async function renderResults(block, config, filteredData, searchTerms) {
   }
 }
 
+/**
+ * Offer the next page of index results below the current ones.
+ */
+function renderMoreButton(block, config, searchTerms, shown, total) {
+  const searchResults = block.querySelector('.search-results');
+  const item = document.createElement('li');
+  item.className = 'search-results-more';
+  const button = document.createElement('button');
+  button.type = 'button';
+  button.textContent = config.placeholders.searchShowMore || 'Show more results';
+  item.append(button);
+  searchResults.append(item);
+
+  button.addEventListener('click', async () => {
+    const queryNumber = config.latestQuery;
+    button.disabled = true;
+    const { results } = await config.indexSearch(searchTerms, shown);
+    if (queryNumber !== config.latestQuery) return;
+    item.remove();
+    const headingTag = searchResults.dataset.h;
+    results.forEach((result) => searchResults.append(renderResult(result, searchTerms, headingTag)));
+    if (shown + results.length < total) {
+      renderMoreButton(block, config, searchTerms, shown + results.length, total);
+    }
+  });
+}
+
 function compareFound(hit1, hit2) {
   return hit1.minIdx - hit2.minIdx;
 }
@@ -209,15 +329,47 @@ async function handleSearch(e, block, config) {
     window.history.replaceState({}, '', url.toString());
   }
 
+  config.latestQuery = (config.latestQuery || 0) + 1;
+  const queryNumber = config.latestQuery;
+
   if (searchValue.length < 3) {
     clearSearch(block);
     return;
   }
   const searchTerms = searchValue.toLowerCase().split(/\s+/).filter((term) => !!term);
 
-  const data = await fetchData(config.source);
-  const filteredData = filterData(searchTerms, data);
+  let filteredData;
+  let total = 0;
+  if (config.indexSearch) {
+    try {
+      const [page, lastModified] = await Promise.all([
+        config.indexSearch(searchTerms),
+        queryIndexLastModified(config.source),
+      ]);
+      if (page.sourceLastModified && lastModified <= page.sourceLastModified) {
+        ({ results: filteredData, total } = page);
+      } else {
+        // eslint-disable-next-line no-console
+        console.warn('search index is older than the query index, falling back to query index');
+        config.indexSearch = null;
+      }
+    } catch (error) {
+      // No usable sharded index; scan the query index from now on
+      // eslint-disable-next-line no-console
+      console.warn('search index unavailable, falling back to query index', error);
+      config.indexSearch = null;
+    }
+  }
+  if (!config.indexSearch) {
+    const data = await fetchData(config.source);
+    filteredData = filterData(searchTerms, data);
+  }
+  // A later keystroke has already started its own search
+  if (queryNumber !== config.latestQuery) return;
   await renderResults(block, config, filteredData, searchTerms);
+  if (config.indexSearch && total > filteredData.length) {
+    renderMoreButton(block, config, searchTerms, filteredData.length, total);
+  }
 }
 
 function searchResultsContainer(block) {
@@ -264,10 +416,23 @@ function searchBox(block, config) {
 
 export default async function decorate(block) {
   const placeholders = await fetchPlaceholders();
-  const source = block.querySelector('a[href]') ? block.querySelector('a[href]').href : '/query-index.json';
+  const link = block.querySelector('a[href]');
+  // A link to a search index manifest (built by scripts/build-search-index.js)
+  // uses that index; a link to a query index, or no link, keeps the linear
+  // scan, so sites without an index never request one
+  let source = '/query-index.json';
+  let manifestUrl = null;
+  if (link && new URL(link.href).pathname.endsWith('/manifest.json')) {
+    manifestUrl = link.href;
+  } else if (link) {
+    source = link.href;
+  }
+  const indexSearch = manifestUrl ? createIndexSearch(manifestUrl) : null;
   block.innerHTML = '';
   block.append(
-    searchBox(block, { source, placeholders }),
+    searchBox(block, {
+      source, placeholders, indexSearch,
+    }),
     searchResultsContainer(block),
   );
 
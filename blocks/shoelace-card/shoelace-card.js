@@ -2832,16 +2832,15 @@ function po(e) {
 function ht(e) {
   return !e || e.length < 3 ? !1 : e.startsWith('/') || e.includes('.json') || e.includes('/');
 }
+// HAND-PATCHED: the query-index fetch below goes through the shared loader
+// in scripts/query-index.js (one request per page, IndexedDB cache).
+// Re-apply this import and the loadQueryIndex call after regenerating the bundle.
+import { loadQueryIndex } from '../../scripts/query-index.js';
+
 async function mo(e, t = 2) {
   for (let o = 1; o <= t; o++) {
     try {
-      const r = await fetch(e, {
-        mode: 'cors',
-        headers: { Accept: 'application/json' },
-        signal: AbortSignal.timeout(8e3),
-      });
-      if (!r.ok) throw new Error(`HTTP ${r.status}: ${r.statusText}`);
-      const l = (await r.json()).data || [];
+      const l = (await loadQueryIndex(e)).rows;
       if (!Array.isArray(l)) throw new Error('Invalid data format: expected array');
       return l;
     } catch (r) {
@@ -10,6 +10,8 @@
  * @mx:tags tool
  * @mx:partOf mx-os
  */
+import { loadQueryIndex } from '../../scripts/query-index.js';
+
 export default async function decorate(block) {
   const supportsWebP = window.createImageBitmap && window.createImageBitmap.toString().includes('native code');
 
@@ -27,11 +29,12 @@ export default async function decorate(block) {
   }
 
   async function fetchSlides() {
-    const response = await fetch('/slides/query-index.json');
-    const json = await response.json();
+    const index = await loadQueryIndex('/slides/query-index.json');
 
     const slides = [];
-    for (const slide of json.data) {
+    // Index rows are shared with other blocks, so each slide gets its own copy
+    for (const row of index.rows) {
+      const slide = { ...row };
       if (window.innerWidth > 799) {
         slide.html = await fetchSlideHtml(slide.path);
       } else {
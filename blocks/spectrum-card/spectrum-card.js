@@ -2327,20 +2327,18 @@ const E = {
     baseUrl: '',
   // Uses proxy in development, relative paths in production
   });
+// HAND-PATCHED: the query-index fetch below goes through the shared loader
+// in scripts/query-index.js (one request per page, IndexedDB cache).
+// Re-apply this import and the loadQueryIndex call after regenerating the bundle.
+import { loadQueryIndex } from '../../scripts/query-index.js';
+
 async function oo(s) {
   try {
     const { baseUrl: t } = ue(); const
       e =`${t}${s}`;
     console.debug('[spectrum-card] fetching data from:', e);
-    const o = await fetch(e, {
-      mode: 'cors',
-      headers: {
-        Accept: 'application/json',
-      },
-    });
-    if (!o.ok) throw new Error(`Failed to fetch card data: ${o.status}`);
-    const r = await o.json();
-    return console.debug('[spectrum-card] fetched data:', r), r.data || [];
+    const r = await loadQueryIndex(e);
+    return console.debug('[spectrum-card] fetched data:', r.rows), r.rows;
   } catch (t) {
     return console.error('[spectrum-card] fetch error:', t), [];
   }
@@ -0,0 +1,516 @@
+/**
+
+* Benchmarks for Cloudflare Worker hot-path functions
+*
+* Compares the single-pass streaming HTML transform against the buffered
+* chain of pure string functions it replaced, the compiled routing table
+* against the per-request redirect and language-config lookups, the
+* compiled agent and referer classifiers against the include/RegExp scans
+* they replaced, and the aliveness scheduler against a simulated registry
+* served over local HTTP. The per-request functions run over a corpus of
+* real User-Agent, Referer and Accept-Language headers and request paths.
+* Run with: npm run bench
+ * @file cloudflare-worker.bench.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags test, performance
+ * @mx:partOf mx-os
+
+ */
+
+/*eslint-disable import/no-unresolved*/
+import { bench, describe } from 'vitest';
+import { readFileSync } from 'fs';
+import { createServer } from 'http';
+import { createHash } from 'crypto';
+import {
+  replacePicturePlaceholder,
+  injectJsonLd,
+  injectSpeculationRules,
+  removeNonSocialMetadata,
+  removeHtmlComments,
+  createHtmlStreamTransformer,
+  transformHtml,
+  findLanguageSite,
+  shouldLanguageRedirect,
+  parseAcceptLanguage,
+  detectLanguage,
+  compileLanguageConfig,
+  resolveLanguageRedirect,
+  resolveMxPathRedirect,
+  categoriseAgent,
+  categoriseReferer,
+  isAiAgent,
+  shouldSkipAiCapture,
+  buildAiVisitRow,
+} from './cloudflare-worker.js';
+import { runAlivenessChecks } from './reginald/lib/aliveness.js';
+
+const HOSTNAME = 'allabout.network';
+
+// The buffered chain handleRequest ran before the streaming engine
+const applyHtmlChain = (html) => {
+  let result = replacePicturePlaceholder(html);
+  result = injectJsonLd(result, HOSTNAME);
+  result = injectSpeculationRules(result);
+  result = removeNonSocialMetadata(result);
+  return removeHtmlComments(result);
+};
+
+// Origin bodies arrive in chunks of roughly this size
+const CHUNK_SIZE = 16 * 1024;
+
+const streamInChunks = (html) => {
+  const transformer = createHtmlStreamTransformer(HOSTNAME);
+  let out = '';
+  for (let i = 0; i < html.length; i += CHUNK_SIZE) {
+    out += transformer.push(html.slice(i, i + CHUNK_SIZE));
+  }
+  return out + transformer.flush();
+};
+
+// Real pages: the worker's deployment test page as authored and as rendered
+const testPage = readFileSync(new URL('../test.html', import.meta.url), 'utf8');
+const renderedPage = readFileSync(new URL('../test-rendered.html', import.meta.url), 'utf8');
+
+// Large page: an EDS-shaped document with a long, comment-heavy body
+const section = `
+    <div class="section">
+      <!-- section metadata kept in the authoring source -->
+      <div class="columns">
+        <div>
+          <div><p>Paragraph copy that carries on for a while to simulate real article text, with <a href="/blogs/ddt/ai/">links</a> and <strong>emphasis</strong>.</p></div>
+          <div>Picture Here</div>
+        </div>
+      </div>
+      <meta name="longdescription" content="stray body metadata">
+    </div>`;
+const largePage = testPage.replace('</body>', `<main>${section.repeat(400)}</main></body>`);
+
+const pages = [
+  ['test.html', testPage],
+  ['test-rendered.html', renderedPage],
+  [`large page (${Math.round(largePage.length / 1024)} KB)`, largePage],
+];
+
+for (const [name, page] of pages) {
+  describe(`HTML transforms — ${name}`, () => {
+    bench('buffered five-pass chain', () => {
+      applyHtmlChain(page);
+    });
+
+    bench('single-pass transformHtml', () => {
+      transformHtml(page, HOSTNAME);
+    });
+
+    bench('single-pass stream (16 KB chunks)', () => {
+      streamInChunks(page);
+    });
+  });
+}
+
+// Routing: a language config with many sites, and a mix of request paths
+const languageConfig = {
+  sites: Array.from({ length: 200 }, (_, i) => ({
+    pathPrefix: `/demo/site-${i}`,
+    languages: ['en', 'es', 'de', 'fr'],
+    default: 'en',
+    redirectPaths: ['/', '/index.html'],
+    excludePaths: ['/assets/'],
+  })),
+};
+const languageConfigText = JSON.stringify(languageConfig);
+const routingRequests = [
+  ['/demo/site-150/', 'es-ES,es;q=0.9,en;q=0.8'],
+  ['/demo/site-150/es/page.html', 'es'],
+  ['/demo/site-7/index.html', 'de'],
+  ['/blogs/ddt/ai/', 'en-GB,en;q=0.9'],
+  ['/mx/the-books/handbook.html', ''],
+  ['/mx/online-material/appendices/appendix-b.html', ''],
+  ['/mx/unknown/page.html', ''],
+  ['/', 'en'],
+];
+
+// What handleRequest did per request before routes were compiled per isolate
+const legacyMxRedirect = (remaining) => {
+  const mxRedirects = {
+    '': '/',
+    'index.html': '/learn/mx-principles.html',
+    'coming-soon.html': '/books/',
+    'coming-soon.cog.html': '/books/',
+    'mx-principles-menu.html': '/learn/mx-principles.html',
+    'principles-changed-how-i-build.html': '/blog/principles-changed-how-i-build.html',
+    'mx-introduction-chapter.pdf': '/books/mx-introduction-chapter.pdf',
+    'the-books/index.html': '/books/',
+    'the-books/introduction.html': '/books/introduction.html',
+    'the-books/handbook.html': '/books/handbook.html',
+    'the-books/protocols.html': '/books/protocols.html',
+    'the-books/the-author.html': '/books/the-author.html',
+    'the-books/training-vs-inference.html': '/books/training-vs-inference.html',
+    'online-material/index.html': '/books/footnotes.html',
+    'online-material/appendices/index.html': '/books/appendices/',
+    'printworks/': '/about/printworks.html',
+    'printworks/index.html': '/about/printworks.html',
+    'sitemap.xml': '/sitemap.xml',
+  };
+  if (mxRedirects[remaining] !== undefined) return mxRedirects[remaining];
+  if (remaining.startsWith('online-material/appendices/')) {
+    return remaining.replace('online-material/appendices/', '/books/appendices/');
+  }
+  if (remaining.startsWith('bookshop')) return remaining.replace(/^bookshop/, '/books') || '/books/';
+  if (remaining.startsWith('cognovamx-website/')) return remaining.replace(/^cognovamx-website/, '/learn');
+  return '/';
+};
+
+const legacyRoute = (pathname, acceptLanguage) => {
+  if (pathname.startsWith('/mx/')) return legacyMxRedirect(pathname.replace(/^\/mx\/?/, ''));
+  // The config body was re-parsed on every request
+  const langConfig = JSON.parse(languageConfigText);
+  const match = findLanguageSite(pathname, langConfig.sites);
+  if (!match) return null;
+  const { site, remainingPath } = match;
+  const langPattern = new RegExp(`^/(${site.languages.join('|')})/`);
+  if (langPattern.test(remainingPath) || !shouldLanguageRedirect(remainingPath, site)) return null;
+  return `${site.pathPrefix}/${detectLanguage(acceptLanguage, site.languages, site.default)}/`;
+};
+
+const languageRoutes = compileLanguageConfig(languageConfig);
+const compiledRoute = (pathname, acceptLanguage) => {
+  if (pathname.startsWith('/mx/')) return resolveMxPathRedirect(pathname.replace(/^\/mx\/?/, ''));
+  return resolveLanguageRedirect(languageRoutes, pathname, acceptLanguage);
+};
+
+describe(`Routing decisions — ${languageConfig.sites.length} language sites`, () => {
+  bench('per-request parse, linear scan and RegExp', () => {
+    for (const [pathname, acceptLanguage] of routingRequests) legacyRoute(pathname, acceptLanguage);
+  });
+
+  bench('compiled per-isolate routing table', () => {
+    for (const [pathname, acceptLanguage] of routingRequests) compiledRoute(pathname, acceptLanguage);
+  });
+});
+
+// Per-request classification corpus: User-Agent strings as they arrive at
+// the edge, from browsers, AI crawlers and assistants, search bots and tools
+const userAgents = [
+  'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+  'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
+  'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+  'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15',
+  'Mozilla/5.0 (Macintosh; Intel Mac OS X 14.4; rv:125.0) Gecko/20100101 Firefox/125.0',
+  'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+  'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1',
+  'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/124.0.6367.88 Mobile/15E148 Safari/604.1',
+  'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.82 Mobile Safari/537.36',
+  'Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/24.0 Chrome/117.0.0.0 Mobile Safari/537.36',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; GPTBot/1.2; +https://openai.com/gptbot)',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko); compatible; ChatGPT-User/1.0; +https://openai.com/bot',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko); compatible; OAI-SearchBot/1.0; +https://openai.com/searchbot',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; ClaudeBot/1.0; +claudebot@anthropic.com)',
+  'Claude-User/1.0 (+https://support.anthropic.com/)',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; PerplexityBot/1.0; +https://perplexity.ai/perplexitybot)',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; Perplexity-User/1.0; +https://perplexity.ai/perplexity-user)',
+  'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) BingPreview/1.0b',
+  'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.1 Safari/605.1.15 (Applebot/0.1; +http://www.apple.com/go/applebot)',
+  'meta-externalagent/1.1 (+https://developers.facebook.com/docs/sharing/webmasters/crawler)',
+  'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+  'Mozilla/5.0 (Linux; Android 5.0) AppleWebKit/537.36 (KHTML, like Gecko) Mobile Safari/537.36 (compatible; Bytespider; spider-feedback@bytedance.com)',
+  'CCBot/2.0 (https://commoncrawl.org/faq/)',
+  'Mozilla/5.0 (compatible; Amazonbot/0.1; +https://developer.amazon.com/support/amazonbot) Chrome/119.0.6045.214 Safari/537.36',
+  'Mozilla/5.0 (compatible; YouBot (+http://www.you.com))',
+  'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; MistralAI-User/1.0; +https://docs.mistral.ai/robots)',
+  'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+  'Mozilla/5.0 (Linux; Android 6.0.1; Nexus 5X Build/MMB29P) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.60 Mobile Safari/537.36 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+  'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+  'Mozilla/5.0 (compatible; YandexBot/3.0; +http://yandex.com/bots)',
+  'Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)',
+  'Mozilla/5.0 (compatible; SemrushBot/7~bl; +http://www.semrush.com/bot.html)',
+  'DuckDuckBot/1.1; (+http://duckduckgo.com/duckduckbot.html)',
+  'Twitterbot/1.0',
+  'LinkedInBot/1.0 (compatible; Mozilla/5.0; Apache-HttpClient +http://www.linkedin.com)',
+  'Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)',
+  'curl/8.4.0',
+  'python-requests/2.31.0',
+  'Go-http-client/2.0',
+  'node-fetch/1.0 (+https://github.com/bitinn/node-fetch)',
+  '',
+];
+
+const referers = [
+  '',
+  'https://allabout.network/',
+  'https://allabout.network/blogs/ddt/ai/',
+  'https://www.google.com/',
+  'https://www.google.co.uk/search?q=machine+experience',
+  'https://www.bing.com/search?q=allabout.network',
+  'https://duckduckgo.com/',
+  'https://t.co/abc123',
+  'https://www.linkedin.com/feed/',
+  'https://chatgpt.com/',
+  'https://chatgpt.com/c/6651f0e2-1a2b-4c3d-9e8f',
+  'https://www.perplexity.ai/search/what-is-machine-experience',
+  'https://gemini.google.com/app',
+  'https://copilot.microsoft.com/',
+  'https://claude.ai/chat/0b1c2d3e',
+  'https://www.bing.com/chat?q=mx',
+  'https://duckduckgo.com/?q=mx&ia=chat&duckai=1',
+];
+
+// Request paths as logged: pages, assets, RUM beacons and API calls
+const requestPaths = [
+  '/',
+  '/blogs/ddt/ai/',
+  '/blogs/ddt/integrations/model-context-protocol.html',
+  '/books/handbook.html',
+  '/scripts/aem.js',
+  '/styles/styles.css',
+  '/icons/search.svg',
+  '/media_1a2b3c4d5e.png?width=750&format=webply',
+  '/fonts/roboto-regular.woff2',
+  '/query-index.json',
+  '/sitemap.xml',
+  '/robots.txt',
+  '/favicon.ico',
+  '/.rum/@adobe/helix-rum-js@^2/dist/rum-standalone.js',
+  '/api/subscribe',
+  '/llms.txt',
+];
+
+const acceptLanguages = [
+  'en-GB,en;q=0.9',
+  'en-US,en;q=0.9',
+  'de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7',
+  'es-ES,es;q=0.9,en;q=0.8',
+  'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7,de;q=0.6',
+  'zh-CN,zh;q=0.9,en;q=0.8',
+  'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+  'ja',
+  '*',
+  '',
+];
+
+const visits = userAgents.map((userAgent, i) => ({
+  hostname: HOSTNAME,
+  pathname: requestPaths[i % requestPaths.length],
+  userAgent,
+  referer: referers[i % referers.length],
+  country: 'GB',
+  status: 200,
+  now: 0,
+}));
+
+// The classifiers as they were before they were compiled per isolate
+const legacyCategoriseAgent = (userAgent) => {
+  if (!userAgent) return 'unknown';
+  const ua = userAgent.toLowerCase();
+  if (ua.includes('gptbot') || ua.includes('oai-searchbot') || ua.includes('chatgpt') || ua.includes('openai')) return 'chatgpt';
+  if (ua.includes('claudebot') || ua.includes('claude') || ua.includes('anthropic')) return 'claude';
+  if (ua.includes('perplexitybot') || ua.includes('perplexity')) return 'perplexity';
+  if (ua.includes('google-extended') || ua.includes('gemini')) return 'gemini';
+  if (ua.includes('copilot') || ua.includes('bingpreview')) return 'copilot';
+  if (ua.includes('applebot-extended')) return 'applebot';
+  if (ua.includes('meta-externalagent') || ua.includes('facebookexternalhit')) return 'meta-ai';
+  if (ua.includes('bytespider')) return 'bytespider';
+  if (ua.includes('ccbot')) return 'ccbot';
+  if (ua.includes('amazonbot')) return 'amazonbot';
+  if (ua.includes('youbot') || ua.includes('you.com')) return 'you';
+  if (ua.includes('phindbot')) return 'phind';
+  if (ua.includes('mistralai') || ua.includes('mistral-ai')) return 'mistral';
+  if (ua.includes('googlebot')) return 'googlebot';
+  if (ua.includes('bingbot')) return 'bingbot';
+  if (ua.includes('mozilla') || ua.includes('chrome') || ua.includes('safari')) return 'browser';
+  if (ua.includes('bot') || ua.includes('crawler') || ua.includes('spider')) return 'bot';
+  return 'unknown';
+};
+
+const legacyIsAiAgent = (category) => [
+  'chatgpt', 'claude', 'perplexity', 'gemini', 'copilot', 'applebot', 'meta-ai',
+  'bytespider', 'ccbot', 'amazonbot', 'you', 'phind', 'mistral',
+].includes(category);
+
+const legacyCategoriseReferer = (referer) => {
+  if (!referer) return null;
+  let host;
+  let path;
+  try {
+    const u = new URL(referer);
+    host = u.hostname.toLowerCase();
+    path = u.pathname.toLowerCase();
+  } catch {
+    return null;
+  }
+  const hostMatches = [
+    { pattern: /(^|\.)chat\.openai\.com$/, source: 'chat.openai.com', agentKey: 'chatgpt' },
+    { pattern: /(^|\.)chatgpt\.com$/, source: 'chatgpt.com', agentKey: 'chatgpt' },
+    { pattern: /(^|\.)perplexity\.ai$/, source: 'perplexity.ai', agentKey: 'perplexity' },
+    { pattern: /(^|\.)gemini\.google\.com$/, source: 'gemini.google.com', agentKey: 'gemini' },
+    { pattern: /(^|\.)bard\.google\.com$/, source: 'bard.google.com', agentKey: 'gemini' },
+    { pattern: /(^|\.)copilot\.microsoft\.com$/, source: 'copilot.microsoft.com', agentKey: 'copilot' },
+    { pattern: /(^|\.)copilot\.cloud\.microsoft$/, source: 'copilot.cloud.microsoft', agentKey: 'copilot' },
+    { pattern: /(^|\.)m365\.cloud\.microsoft$/, source: 'm365.cloud.microsoft', agentKey: 'copilot' },
+    { pattern: /(^|\.)claude\.ai$/, source: 'claude.ai', agentKey: 'claude' },
+    { pattern: /(^|\.)you\.com$/, source: 'you.com', agentKey: 'you' },
+    { pattern: /(^|\.)phind\.com$/, source: 'phind.com', agentKey: 'phind' },
+    { pattern: /(^|\.)poe\.com$/, source: 'poe.com', agentKey: 'poe' },
+    { pattern: /(^|\.)chat\.mistral\.ai$/, source: 'chat.mistral.ai', agentKey: 'mistral' },
+    { pattern: /(^|\.)meta\.ai$/, source: 'meta.ai', agentKey: 'meta-ai' },
+    { pattern: /(^|\.)grok\.com$/, source: 'grok.com', agentKey: 'grok' },
+    { pattern: /(^|\.)x\.ai$/, source: 'x.ai', agentKey: 'grok' },
+  ];
+  for (const { pattern, source, agentKey } of hostMatches) {
+    if (pattern.test(host)) return { source, agentKey };
+  }
+  if (/(^|\.)bing\.com$/.test(host) && /^\/chat($|\/)/.test(path)) {
+    return { source: 'bing.com/chat', agentKey: 'copilot' };
+  }
+  if (/(^|\.)duckduckgo\.com$/.test(host) && /duckai/.test(path)) {
+    return { source: 'duckduckgo.com/duckai', agentKey: 'duckai' };
+  }
+  return null;
+};
+
+describe(`Agent classification — ${userAgents.length} User-Agents`, () => {
+  bench('per-request includes scans', () => {
+    for (const ua of userAgents) legacyIsAiAgent(legacyCategoriseAgent(ua));
+  });
+
+  bench('compiled single-pass classifier', () => {
+    for (const ua of userAgents) isAiAgent(categoriseAgent(ua));
+  });
+});
+
+describe(`Referer classification — ${referers.length} Referers`, () => {
+  bench('per-request RegExp list', () => {
+    for (const referer of referers) legacyCategoriseReferer(referer);
+  });
+
+  bench('compiled hostname-suffix map', () => {
+    for (const referer of referers) categoriseReferer(referer);
+  });
+});
+
+describe(`Per-request hot path — ${visits.length} requests`, () => {
+  bench('buildAiVisitRow', () => {
+    for (const visit of visits) buildAiVisitRow(visit);
+  });
+
+  bench('shouldSkipAiCapture', () => {
+    for (const pathname of requestPaths) shouldSkipAiCapture(pathname);
+  });
+
+  bench('parseAcceptLanguage', () => {
+    for (const header of acceptLanguages) parseAcceptLanguage(header);
+  });
+
+  bench('detectLanguage', () => {
+    for (const header of acceptLanguages) detectLanguage(header, ['en', 'es', 'de', 'fr'], 'en');
+  });
+});
+
+// Aliveness: a simulated registry of COGs spread over publisher hosts, all
+// served by one local HTTP stand-in. Requests keep their registry/publisher
+// hostnames for the scheduler and are routed to the stand-in by path.
+const REGISTRY_COGS = 2000;
+const PUBLISHER_HOSTS = 40;
+const STAND_IN_LATENCY_MS = 2;
+
+const nodeSqlite = await import('node:sqlite').catch(() => null);
+const aliveSchema = ['schema.sql', 'migration-002-aliveness.sql', 'migration-008-aliveness-scheduler.sql']
+  .map((file) => readFileSync(new URL(`./reginald/db/${file}`, import.meta.url), 'utf8'))
+  .join('\n');
+
+// Minimal D1 stand-in over in-memory SQLite (node:sqlite, Node 22.5+)
+const createSqliteD1 = () => {
+  const database = new nodeSqlite.DatabaseSync(':memory:');
+  database.exec(aliveSchema);
+  const statement = (sql, params = []) => ({
+    bind: (...values) => statement(sql, values),
+    run: async () => ({ meta: { changes: database.prepare(sql).run(...params).changes } }),
+    all: async () => ({ results: database.prepare(sql).all(...params) }),
+    first: async () => database.prepare(sql).get(...params) ?? null,
+  });
+  return {
+    prepare: (sql) => statement(sql),
+    async batch(statements) {
+      database.exec('BEGIN');
+      const results = [];
+      for (const stmt of statements) results.push(await stmt.run()); // eslint-disable-line no-await-in-loop
+      database.exec('COMMIT');
+      return results;
+    },
+  };
+};
+
+const registry = Array.from({ length: REGISTRY_COGS }, (_, i) => {
+  const body = `<!DOCTYPE html><html><body><h1>COG ${i}</h1>${'<p>Published content.</p>'.repeat(40)}</body></html>`;
+  return {
+    namespace: `publisher-${i % PUBLISHER_HOSTS}`,
+    name: `cog-${i}`,
+    body,
+    hash: `sha256:${createHash('sha256').update(body).digest('hex')}`,
+    etag: `"cog-${i}-v1"`,
+  };
+});
+const cogsByName = new Map(registry.map((cog) => [cog.name, cog]));
+
+const standIn = createServer((req, res) => {
+  setTimeout(() => {
+    const [, host, ...rest] = req.url.split('/');
+    const path = `/${rest.join('/')}`;
+    if (host === 'registry.bench') {
+      if (path === '/registry/reginald/api/v1/index.json') {
+        res.setHeader('Content-Type', 'application/json');
+        res.end(JSON.stringify({ cogs: registry.map(({ namespace, name }) => ({ namespace, name })) }));
+        return;
+      }
+      const cog = cogsByName.get(path.split('/')[5]);
+      res.setHeader('Content-Type', 'application/json');
+      res.end(JSON.stringify({ canonical_url: `https://${cog.namespace}.bench/${cog.name}.html`, content_hash: cog.hash }));
+      return;
+    }
+    const cog = cogsByName.get(path.slice(1, -'.html'.length));
+    if (req.headers['if-none-match'] === cog.etag) {
+      res.writeHead(304, { ETag: cog.etag });
+      res.end();
+      return;
+    }
+    res.writeHead(200, { ETag: cog.etag, 'Content-Type': 'text/html' });
+    res.end(req.method === 'HEAD' ? undefined : cog.body);
+  }, STAND_IN_LATENCY_MS);
+});
+await new Promise((resolve) => { standIn.listen(0, '127.0.0.1', resolve); });
+standIn.unref();
+const standInOrigin = `http://127.0.0.1:${standIn.address().port}`;
+
+const standInFetch = (input, init) => {
+  const url = new URL(input);
+  return fetch(`${standInOrigin}/${url.host}${url.pathname}`, init);
+};
+const aliveEnv = (db) => ({ DB: db, MX_OUTPUTS_HOSTNAME: 'registry.bench', MX_OUTPUTS_REPO_PATH: '/registry' });
+const benchRun = {
+  fetch: standInFetch, hostIntervalMs: 20, budgetMs: Infinity, maxSubrequests: Infinity,
+};
+
+// Validators from one full pass, so later passes can send conditional requests
+const warmDb = nodeSqlite ? createSqliteD1() : null;
+if (warmDb) await runAlivenessChecks(aliveEnv(warmDb), benchRun);
+
+const singleShot = { iterations: 1, warmupIterations: 0, time: 0, warmupTime: 0 };
+
+describe.skipIf(!nodeSqlite)(`Aliveness run — ${REGISTRY_COGS} COGs on ${PUBLISHER_HOSTS} hosts (local HTTP stand-in)`, () => {
+  bench('one check at a time', async () => {
+    await runAlivenessChecks(aliveEnv(createSqliteD1()), { ...benchRun, concurrency: 1, maxPendingChecks: 1 });
+  }, singleShot);
+
+  bench('concurrent scheduler, cold (full GET + hash)', async () => {
+    await runAlivenessChecks(aliveEnv(createSqliteD1()), benchRun);
+  }, singleShot);
+
+  bench('concurrent scheduler, warm (conditional GET, 304)', async () => {
+    await runAlivenessChecks(aliveEnv(warmDb), benchRun);
+  }, singleShot);
+});
@@ -36,7 +36,6 @@ import * as subscriptionsDb from './reginald/db/subscriptions.js';
 import * as publishersDb from './reginald/db/publishers.js';
 import * as audit from './reginald/db/audit.js';
 import * as downloadsDb from './reginald/db/downloads.js';
-import * as aiVisitsDb from './reginald/db/ai-visits.js';
 import { handleAiAttribution } from './reginald/handlers/ai-attribution.js';
 import { handleAiAttributionDashboard } from './reginald/handlers/ai-attribution-dashboard.js';
 import { notifyPurchase } from './reginald/lib/mailerlite.js';
@@ -45,6 +44,7 @@ import { handleLeadCapture } from './reginald/handlers/lead-capture.js';
 import { AI_ATTRIBUTION_HOSTS, isAttributionHost } from './reginald/lib/ai-attribution-hosts.js';
 import { runGa4Connector } from './reginald/lib/ga4-connector.js';
 import { runAlivenessChecks } from './reginald/lib/aliveness.js';
+import { createAiVisitBuffer } from './reginald/lib/ai-visit-buffer.js';
 
 // Worker version - hardcoded for compatibility
 // Update this when package.json version changes
@@ -442,6 +442,36 @@ export const buildJsonLd = (article, hostname) => {
   return jsonLd;
 };
 
+// Build replacement: just the img tag (preserves outer div)
+const PICTURE_PLACEHOLDER_REPLACEMENT = `<img src="${PICTURE_PLACEHOLDER_CONFIG.IMAGE_URL}" alt="${PICTURE_PLACEHOLDER_CONFIG.IMAGE_ALT}">`;
+
+// Escape special regex characters in trigger text
+const PICTURE_PLACEHOLDER_TRIGGER = PICTURE_PLACEHOLDER_CONFIG.TRIGGER_TEXT
+  .replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+
+// Pattern matches only the inner div content, preserves outer div structure.
+// Compiled once per isolate; case-insensitive comparison of the trigger text.
+const PICTURE_PLACEHOLDER_PATTERN = new RegExp(
+  `<div>([^<]*${PICTURE_PLACEHOLDER_TRIGGER}[^<]*)</div>`,
+  'gi',
+);
+
+// Meta tag names removed by removeNonSocialMetadata (keeps author and linkedin)
+const NON_SOCIAL_META_TAGS = [
+  'author-url',
+  'publication-date',
+  'published-date',
+  'modified-date',
+  'last-modified',
+  'longdescription',
+  'jsonld',
+];
+
+// Match meta tag with name="tagName" and any attributes, plus surrounding whitespace
+const NON_SOCIAL_META_PATTERNS = NON_SOCIAL_META_TAGS.map(
+  (tagName) => new RegExp(`\\s*<meta\\s+name="${tagName}"[^>]*>\\s*`, 'gi'),
+);
+
 /**
 
 * Replaces picture placeholder pattern in HTML content
@@ -450,21 +480,10 @@ export const buildJsonLd = (article, hostname) => {
 * @param {string} html - HTML content to process
 * @returns {string} Processed HTML with placeholders replaced
  */
-export const replacePicturePlaceholder = (html) => {
-  // Build replacement: just the img tag (preserves outer div)
-  const replacement = `<img src="${PICTURE_PLACEHOLDER_CONFIG.IMAGE_URL}" alt="${PICTURE_PLACEHOLDER_CONFIG.IMAGE_ALT}">`;
-
-  // Case-insensitive comparison using trigger text from config
-  // Escape special regex characters in trigger text
-  const escapedTrigger = PICTURE_PLACEHOLDER_CONFIG.TRIGGER_TEXT
-    .replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
-  // Pattern matches only the inner div content, preserves outer div structure
-  const pattern = new RegExp(
-    `<div>([^<]*${escapedTrigger}[^<]*)</div>`,
-    'gi',
-  );
-  return html.replace(pattern, replacement);
-};
+export const replacePicturePlaceholder = (html) => html.replace(
+  PICTURE_PLACEHOLDER_PATTERN,
+  PICTURE_PLACEHOLDER_REPLACEMENT,
+);
 
 /**
 
@@ -487,30 +506,10 @@ export const removeHtmlComments = (html) => (
 * @param {string} html - HTML content to process
 * @returns {string} Processed HTML with non-social metadata removed
  */
-export const removeNonSocialMetadata = (html) => {
-  // List of meta tag names to remove (keeps author and linkedin)
-  const tagsToRemove = [
-    'author-url',
-    'publication-date',
-    'published-date',
-    'modified-date',
-    'last-modified',
-    'longdescription',
-    'jsonld',
-  ];
-
-  let result = html;
-
-  // Remove each non-social meta tag
-  tagsToRemove.forEach((tagName) => {
-    // Match meta tag with name="tagName" and any attributes
-    // Pattern: <meta name="tagName"...> including multiline
-    const pattern = new RegExp(`\\s*<meta\\s+name="${tagName}"[^>]*>\\s*`, 'gi');
-    result = result.replace(pattern, '');
-  });
-
-  return result;
-};
+export const removeNonSocialMetadata = (html) => (
+  // Remove each non-social meta tag in turn
+  NON_SOCIAL_META_PATTERNS.reduce((result, pattern) => result.replace(pattern, ''), html)
+);
 
 /**
 
@@ -526,6 +525,25 @@ export const extractMetaContent = (html, selector) => {
   return match ? match[1] : null;
 };
 
+/**
+ * Collects every `<meta name|property="..." content="...">` value in one scan.
+ * Keys are the lower-cased selector exactly as extractMetaContent takes it
+ * (e.g. 'property="og:title"'); the first occurrence of each selector wins,
+ * matching what extractMetaContent would return for that selector.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {string} html - HTML content
+ * @returns {Object<string, string>} Map of selector to content value
+ */
+export const collectMetaContent = (html) => {
+  const meta = {};
+  const pattern = /<meta\s+((?:name|property)="[^"]*")\s+content="([^"]*)"/gi;
+  for (const [, selector, content] of html.matchAll(pattern)) {
+    const key = selector.toLowerCase();
+    if (!(key in meta)) meta[key] = content;
+  }
+  return meta;
+};
+
 /**
 
 * Checks if JSON-LD generation should be triggered
@@ -560,22 +578,23 @@ export const injectJsonLd = (html, hostname) => {
     return html;
   }
 
-  // Extract article metadata from meta tags using regex
+  // Extract article metadata from meta tags in a single scan
+  const meta = collectMetaContent(html);
   const article = {
-    title: extractMetaContent(html, 'property="og:title"'),
-    description: extractMetaContent(html, 'property="og:description"')
-      || extractMetaContent(html, 'name="description"')
-      || extractMetaContent(html, 'name="longdescription"'),
-    url: extractMetaContent(html, 'property="og:url"'),
-    image: extractMetaContent(html, 'property="og:image"'),
-    imageAlt: extractMetaContent(html, 'property="og:image:alt"'),
-    author: extractMetaContent(html, 'name="author"'),
-    authorUrl: extractMetaContent(html, 'name="author-url"')
-      || extractMetaContent(html, 'name="linkedin"'),
-    publishDate: extractMetaContent(html, 'name="publication-date"')
-      || extractMetaContent(html, 'name="published-date"'),
-    modifiedDate: extractMetaContent(html, 'name="modified-date"')
-      || extractMetaContent(html, 'name="last-modified"'),
+    title: meta['property="og:title"'],
+    description: meta['property="og:description"']
+      || meta['name="description"']
+      || meta['name="longdescription"'],
+    url: meta['property="og:url"'],
+    image: meta['property="og:image"'],
+    imageAlt: meta['property="og:image:alt"'],
+    author: meta['name="author"'],
+    authorUrl: meta['name="author-url"']
+      || meta['name="linkedin"'],
+    publishDate: meta['name="publication-date"']
+      || meta['name="published-date"'],
+    modifiedDate: meta['name="modified-date"']
+      || meta['name="last-modified"'],
   };
 
   // Must have title to generate JSON-LD
@@ -613,6 +632,208 @@ export const injectSpeculationRules = (html) => {
   return html.replace('</head>', `${speculationScript}\n</head>`);
 };
 
+// Single-pass body matcher: a picture placeholder or a non-social meta tag.
+// Equivalent to replacePicturePlaceholder followed by removeNonSocialMetadata
+// for any text that contains neither construct nested inside the other.
+const HTML_BODY_TRANSFORM_PATTERN = new RegExp(
+  `(<div>[^<]*${PICTURE_PLACEHOLDER_TRIGGER}[^<]*</div>)|\\s*<meta\\s+name="(?:${NON_SOCIAL_META_TAGS.join('|')})"[^>]*>\\s*`,
+  'gi',
+);
+
+const HEAD_CLOSE_TAG = '</head>';
+
+/**
+ * Runs the full ADD-then-DELETE chain (minus comment removal) over the document head.
+ * The head is small and holds every JSON-LD trigger and meta value, so it is
+ * processed with the same pure functions the buffered pipeline used.
+ * @param {string} html - Document text up to and including the first </head>
+ * @param {string} hostname - Publisher hostname for JSON-LD
+ * @returns {string} Processed head
+ */
+const transformHtmlHead = (html, hostname) => {
+  // CRITICAL ORDER: transformations (ADD content) FIRST, removals LAST
+  let result = replacePicturePlaceholder(html);
+  result = injectJsonLd(result, hostname);
+  result = injectSpeculationRules(result);
+  return removeNonSocialMetadata(result);
+};
+
+/**
+ * Finds the longest prefix of buffered body text that no transform can straddle.
+ * Every body pattern begins at a `<` (optionally preceded by whitespace that a
+ * removed meta tag swallows), and a picture placeholder spans exactly one
+ * `<div>` plus its closing tag, so text is held back from the last `<`, the
+ * whitespace before it and, when that `<` may close one, the open `<div>`.
+ * @param {string} text - Buffered body text
+ * @returns {number} Index at which to cut; text before it is safe to emit
+ */
+const findHtmlSafeCut = (text) => {
+  const lastTag = text.lastIndexOf('<');
+  let cut = lastTag === -1 ? text.length : lastTag;
+  while (cut > 0 && /\s/.test(text[cut - 1])) cut -= 1;
+  const previousTag = cut > 0 ? text.lastIndexOf('<', cut - 1) : -1;
+  if (previousTag !== -1 && text.slice(previousTag, previousTag + 5).toLowerCase() === '<div>') {
+    cut = previousTag;
+  }
+  return cut;
+};
+
+/**
+ * Creates an incremental HTML transformer that applies all five worker
+ * transforms in one pass over a sequence of text chunks:
+ * picture placeholders, JSON-LD, Speculation Rules, non-social metadata
+ * removal and HTML comment removal.
+ *
+ * Only the `<head>` is buffered (JSON-LD needs every meta value before
+ * `</head>`); the body is emitted as soon as a chunk boundary cannot split a
+ * match. Output is identical to the buffered chain for well-formed pages —
+ * JSON-LD triggers and meta values are read from the head, which is where
+ * EDS emits them.
+ *
+ * Pure string state machine - fully testable without Cloudflare Workers runtime.
+ * @param {string} hostname - Publisher hostname for JSON-LD
+ * @returns {{push: function(string): string, flush: function(): string}}
+ */
+export const createHtmlStreamTransformer = (hostname) => {
+  let head = '';
+  let inBody = false;
+  let pending = '';
+  // True when the last emitted body segment ended on a removed meta tag,
+  // whose trailing whitespace lives at the start of the next segment
+  let swallowWhitespace = false;
+  // Text of a comment that has opened but not yet closed, or null
+  let openComment = null;
+
+  // Stateful equivalent of removeHtmlComments across segments. An unclosed
+  // comment is held back and restored on flush, as the regex leaves it intact.
+  const stripComments = (text) => {
+    let out = '';
+    let pos = 0;
+    while (pos < text.length) {
+      if (openComment === null) {
+        const open = text.indexOf('<!--', pos);
+        if (open === -1) {
+          out += text.slice(pos);
+          break;
+        }
+        out += text.slice(pos, open);
+        openComment = '<!--';
+        pos = open + 4;
+      } else {
+        // A closing --> may straddle the previous segment; it never overlaps <!--
+        const tail = Math.min(2, openComment.length - 4);
+        const straddle = `${openComment.slice(openComment.length - tail)}${text.slice(pos, pos + 2)}`
+          .indexOf('-->');
+        let end = -1;
+        if (straddle !== -1 && straddle < tail) {
+          end = pos + straddle + 3 - tail;
+        } else {
+          const close = text.indexOf('-->', pos);
+          if (close !== -1) end = close + 3;
+        }
+        if (end === -1) {
+          openComment += text.slice(pos);
+          break;
+        }
+        pos = end;
+        openComment = null;
+      }
+    }
+    return out;
+  };
+
+  const transformSegment = (segment) => {
+    let text = segment;
+    if (swallowWhitespace) {
+      text = text.replace(/^\s+/, '');
+      if (!text) return '';
+    }
+    swallowWhitespace = false;
+    const result = text.replace(HTML_BODY_TRANSFORM_PATTERN, (match, picture, offset) => {
+      if (picture) return PICTURE_PLACEHOLDER_REPLACEMENT;
+      if (offset + match.length === text.length) swallowWhitespace = true;
+      return '';
+    });
+    return stripComments(result);
+  };
+
+  const pushBody = (chunk) => {
+    pending += chunk;
+    const cut = findHtmlSafeCut(pending);
+    if (cut === 0) return '';
+    const segment = pending.slice(0, cut);
+    pending = pending.slice(cut);
+    return transformSegment(segment);
+  };
+
+  return {
+    push(chunk) {
+      if (inBody) return pushBody(chunk);
+      const searchFrom = Math.max(0, head.length - HEAD_CLOSE_TAG.length + 1);
+      head += chunk;
+      const close = head.indexOf(HEAD_CLOSE_TAG, searchFrom);
+      if (close === -1) return '';
+      inBody = true;
+      const end = close + HEAD_CLOSE_TAG.length;
+      const rest = head.slice(end);
+      const out = stripComments(transformHtmlHead(head.slice(0, end), hostname));
+      head = '';
+      return out + pushBody(rest);
+    },
+    flush() {
+      let out;
+      if (inBody) {
+        out = transformSegment(pending);
+        pending = '';
+      } else {
+        // No </head> at all: the injections are no-ops, as in the buffered chain
+        out = stripComments(transformHtmlHead(head, hostname));
+        head = '';
+      }
+      if (openComment !== null) {
+        out += openComment;
+        openComment = null;
+      }
+      return out;
+    },
+  };
+};
+
+/**
+ * Applies all five HTML transforms to a complete document in one pass.
+ * Same result as running the chain of pure functions in CRITICAL ORDER.
+ * @param {string} html - HTML content to process
+ * @param {string} hostname - Publisher hostname for JSON-LD
+ * @returns {string} Processed HTML
+ */
+export const transformHtml = (html, hostname) => {
+  const transformer = createHtmlStreamTransformer(hostname);
+  return transformer.push(html) + transformer.flush();
+};
+
+/**
+ * Wraps createHtmlStreamTransformer in a byte-level TransformStream so an
+ * origin body can be piped straight through to the client.
+ * Uses only web-standard stream and encoding APIs (available in Node 18+).
+ * @param {string} hostname - Publisher hostname for JSON-LD
+ * @returns {TransformStream<Uint8Array, Uint8Array>}
+ */
+export const createHtmlTransformStream = (hostname) => {
+  const transformer = createHtmlStreamTransformer(hostname);
+  const decoder = new TextDecoder();
+  const encoder = new TextEncoder();
+  return new TransformStream({
+    transform(chunk, controller) {
+      const out = transformer.push(decoder.decode(chunk, { stream: true }));
+      if (out) controller.enqueue(encoder.encode(out));
+    },
+    flush(controller) {
+      const out = transformer.push(decoder.decode()) + transformer.flush();
+      if (out) controller.enqueue(encoder.encode(out));
+    },
+  });
+};
+
 /**
  * Parses an Accept-Language HTTP header into a sorted array of language preferences.
  * Pure function - fully testable without Cloudflare Workers runtime.
@@ -710,6 +931,306 @@ export const shouldLanguageRedirect = (remainingPath, site) => {
   return false;
 };
 
+/**
+ * Inserts a path prefix into a segment trie. Segments keep their leading
+ * slash ('/demo', '/salva'), so a prefix matches exactly the pathnames
+ * findLanguageSite accepts: the prefix itself or the prefix followed by '/'.
+ * @param {object} trie - Root node ({children: Map, value})
+ * @param {string} prefix - Path prefix (e.g. "/demo/salva")
+ * @param {object} value - Payload stored at the prefix node
+ */
+const insertPathPrefix = (trie, prefix, value) => {
+  let node = trie;
+  let pos = 0;
+  while (pos < prefix.length) {
+    const next = prefix.indexOf('/', pos + 1);
+    const end = next === -1 ? prefix.length : next;
+    const segment = prefix.slice(pos, end);
+    if (!node.children.has(segment)) node.children.set(segment, { children: new Map(), value: null });
+    node = node.children.get(segment);
+    pos = end;
+  }
+  if (!node.value) node.value = value;
+};
+
+/**
+ * Walks a segment trie and returns the matching payload with the lowest
+ * `order`, i.e. the first matching entry of the source array.
+ * @param {object} trie - Root node
+ * @param {string} pathname - Request pathname
+ * @returns {object|null} Stored payload or null
+ */
+const matchPathPrefix = (trie, pathname) => {
+  let node = trie;
+  let best = null;
+  let pos = 0;
+  while (node) {
+    if (node.value && (pos === pathname.length || pathname[pos] === '/')
+      && (!best || node.value.order < best.order)) {
+      best = node.value;
+    }
+    if (pos >= pathname.length) break;
+    const next = pathname.indexOf('/', pos + 1);
+    const end = next === -1 ? pathname.length : next;
+    node = node.children.get(pathname.slice(pos, end));
+    pos = end;
+  }
+  return best;
+};
+
+/**
+ * Compiles a language-config.json document into routing structures built once
+ * per isolate: a path-prefix trie over `sites` and, per site, a precompiled
+ * "already on a language path" matcher.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {{sites: Array<object>}|null} config - Parsed language config
+ * @returns {{trie: object, siteCount: number}} Compiled language routes
+ */
+export const compileLanguageConfig = (config) => {
+  const trie = { children: new Map(), value: null };
+  const sites = config && Array.isArray(config.sites) ? config.sites : [];
+  let siteCount = 0;
+  sites.forEach((site, order) => {
+    if (!site || typeof site.pathPrefix !== 'string') return;
+    // A site without a language list never redirects (the per-request code threw)
+    const languagePattern = Array.isArray(site.languages)
+      ? new RegExp(`^/(${site.languages.join('|')})/`)
+      : null;
+    insertPathPrefix(trie, site.pathPrefix, { order, site, languagePattern });
+    siteCount += 1;
+  });
+  return { trie, siteCount };
+};
+
+/**
+ * Resolves the language redirect for a request against compiled routes.
+ * Same decision as findLanguageSite + shouldLanguageRedirect + detectLanguage.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {object} routes - Output of compileLanguageConfig
+ * @param {string} pathname - Request pathname
+ * @param {string} acceptLanguageHeader - Raw Accept-Language header value
+ * @returns {string|null} Pathname to redirect to, or null
+ */
+export const resolveLanguageRedirect = (routes, pathname, acceptLanguageHeader) => {
+  if (!routes || !routes.siteCount) return null;
+  const match = matchPathPrefix(routes.trie, pathname);
+  if (!match || !match.languagePattern) return null;
+  const { site, languagePattern } = match;
+  const remainingPath = pathname.slice(site.pathPrefix.length) || '/';
+  // Skip if already on a language path
+  if (languagePattern.test(remainingPath) || !shouldLanguageRedirect(remainingPath, site)) {
+    return null;
+  }
+  const targetLang = detectLanguage(acceptLanguageHeader, site.languages, site.default);
+  return `${site.pathPrefix}/${targetLang}/`;
+};
+
+// Isolate-level freshness window for language-config.json, plus how long a
+// stale copy keeps serving while a background refresh runs, and how soon a
+// failed load is retried
+const LANGUAGE_CONFIG_TTL_MS = 5 * 60 * 1000;
+const LANGUAGE_CONFIG_MAX_STALE_MS = 60 * 60 * 1000;
+const LANGUAGE_CONFIG_RETRY_MS = 15 * 1000;
+
+/**
+ * Creates an isolate-level cache of compiled language routes with
+ * stale-while-revalidate. Fresh entries are served with no subrequest;
+ * stale entries are served while one background refresh runs (via
+ * ctx.waitUntil); only a cold or expired cache waits for the load.
+ * A failed load keeps serving the previous routes (or none on a cold
+ * isolate) without counting as fresh, and is retried after retryMs.
+ * @param {object} [options]
+ * @param {number} [options.ttlMs] - Freshness window
+ * @param {number} [options.maxStaleMs] - Stale-while-revalidate window after the TTL
+ * @param {number} [options.retryMs] - Delay before retrying a failed load
+ * @param {function(): number} [options.now] - Clock (injectable for tests)
+ * @returns {{get: function(function(): Promise<object>, object): Promise<object>}}
+ */
+export const createLanguageConfigCache = ({
+  ttlMs = LANGUAGE_CONFIG_TTL_MS,
+  maxStaleMs = LANGUAGE_CONFIG_MAX_STALE_MS,
+  retryMs = LANGUAGE_CONFIG_RETRY_MS,
+  now = Date.now,
+} = {}) => {
+  let entry = null;
+  let refreshing = null;
+  let retryAt = 0;
+
+  const refresh = (load) => {
+    if (!refreshing) {
+      refreshing = Promise.resolve()
+        .then(load)
+        .then(compileLanguageConfig)
+        .then(
+          (routes) => {
+            entry = { routes, loadedAt: now() };
+            retryAt = 0;
+          },
+          () => {
+            // Never loaded: serve no routes, but keep the entry stale
+            if (!entry) entry = { routes: compileLanguageConfig(null), loadedAt: -Infinity };
+            retryAt = now() + retryMs;
+          },
+        )
+        .then(() => {
+          refreshing = null;
+        });
+    }
+    return refreshing;
+  };
+
+  return {
+    async get(load, ctx) {
+      const age = entry ? now() - entry.loadedAt : Infinity;
+      if (age < ttlMs) return entry.routes;
+      // The last load failed: keep serving what we have until the retry delay
+      if (now() < retryAt) return entry.routes;
+      if (age < ttlMs + maxStaleMs) {
+        const pending = refresh(load);
+        if (ctx) ctx.waitUntil(pending);
+        return entry.routes;
+      }
+      await refresh(load);
+      return entry.routes;
+    },
+  };
+};
+
+/**
+ * Compiles exact-path and prefix redirect rules into a resolver built once
+ * per isolate. Exact paths resolve through a Map; prefix rules live in a
+ * character trie, so any path is matched in a single walk (longest prefix wins).
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {object} rules
+ * @param {Object<string, string>} [rules.exact] - Path to target pathname
+ * @param {Array<{prefix: string, rewrite: function(string): string}>} [rules.prefixes]
+ * @returns {function(string): (string|null)} Resolver returning the target pathname or null
+ */
+export const compileRedirectTable = ({ exact = {}, prefixes = [] }) => {
+  const exactPaths = new Map(Object.entries(exact));
+  const trie = { children: new Map(), rule: null };
+  prefixes.forEach((rule) => {
+    let node = trie;
+    for (const ch of rule.prefix) {
+      if (!node.children.has(ch)) node.children.set(ch, { children: new Map(), rule: null });
+      node = node.children.get(ch);
+    }
+    node.rule = rule;
+  });
+
+  return (path) => {
+    const target = exactPaths.get(path);
+    if (target !== undefined) return target;
+    let node = trie;
+    let match = trie.rule;
+    for (let i = 0; node && i < path.length; i += 1) {
+      node = node.children.get(path[i]);
+      if (node && node.rule) match = node.rule;
+    }
+    return match ? match.rewrite(path) : null;
+  };
+};
+
+// Documentation URLs whose canonical file only exists as .md (302, see below)
+const MX_SITE_DOC_REDIRECTS = {
+  '/cog-runtime.html': '/drafts/cog-runtime.md',
+  '/drafts/cog-runtime': '/drafts/cog-runtime.md',
+  '/drafts/cog-spec.v1': '/drafts/cog-spec.v1.md',
+};
+
+// Permanent redirects for relocated profile pages on mx-site.
+// The printed book points readers at /blog/about.tom.cranstoun.html; the
+// files now live under /blog/profiles/. Keep the old URLs working with 301.
+const MX_SITE_PROFILE_REDIRECTS = {
+  '/blog/about.tom.cranstoun.html': '/blog/profiles/about.tom.cranstoun.html',
+  '/blog/about.claude.code.html': '/blog/profiles/about.claude.code.html',
+  '/blog/about.claude.sonnet.4.5.html': '/blog/profiles/about.claude.sonnet.4.5.html',
+  '/blog/about.microsoft.copilot.html': '/blog/profiles/about.microsoft.copilot.html',
+};
+
+// Retired/superseded posts: 301 to the replacement that is now canonical.
+const MX_SITE_RETIRED_POST_REDIRECTS = {
+  '/blog/salesforce-buys-contentful-agent-ready-content.html': '/blog/salesforce-contentful-not-an-mx-strategy.html',
+  // Blog group migration 2026-06-16
+  '/blog/the-crawl-still-speaks-english.html': '/blog/agent-web/the-crawl-still-speaks-english.html',
+  '/blog/what-googles-web-dev-agent-guidance-does-not-touch.html': '/blog/agent-web/what-googles-web-dev-agent-guidance-does-not-touch.html',
+  '/blog/a-pdf-that-can-prove-itself.html': '/blog/provenance/a-pdf-that-can-prove-itself.html',
+  '/blog/read-is-not-the-same-as-trusted.html': '/blog/provenance/read-is-not-the-same-as-trusted.html',
+  '/blog/software-agreed-the-deal.html': '/blog/provenance/software-agreed-the-deal.html',
+  '/blog/the-inspector-you-can-audit-yourself.html': '/blog/provenance/the-inspector-you-can-audit-yourself.html',
+  '/blog/the-padlock-and-the-page.html': '/blog/provenance/the-padlock-and-the-page.html',
+  '/blog/agency-platforms-and-the-open-layer.html': '/blog/industry/agency-platforms-and-the-open-layer.html',
+  '/blog/geo-is-a-tactic-mx-is-the-specification.html': '/blog/industry/geo-is-a-tactic-mx-is-the-specification.html',
+  '/blog/google-named-geo-then-debunked-it.html': '/blog/industry/google-named-geo-then-debunked-it.html',
+  '/blog/microsoft-frontier-tuning-and-the-unsigned-trace.html': '/blog/industry/microsoft-frontier-tuning-and-the-unsigned-trace.html',
+  '/blog/orange-with-pump.html': '/blog/foundations/orange-with-pump.html',
+  '/blog/strip-the-marks-lose-the-word.html': '/blog/foundations/strip-the-marks-lose-the-word.html',
+};
+
+/**
+ * Resolves mx-site paths that 301 elsewhere: relocated profile pages, retired
+ * posts, and plural-to-singular /blogs or /blogs/* → /blog or /blog/*.
+ * Compiled once per isolate.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {string} pathname - Request pathname
+ * @returns {string|null} Target pathname, or null if none applies
+ */
+export const resolveMxSitePermanentRedirect = compileRedirectTable({
+  exact: {
+    ...MX_SITE_PROFILE_REDIRECTS,
+    ...MX_SITE_RETIRED_POST_REDIRECTS,
+    '/blogs': '/blog',
+  },
+  prefixes: [
+    { prefix: '/blogs/', rewrite: (path) => path.replace(/^\/blogs/, '/blog') },
+  ],
+});
+
+// Legacy allabout.network/mx/* paths: specific old URLs, then folder prefixes
+const resolveMxPathRedirectTable = compileRedirectTable({
+  exact: {
+    '': '/',
+    'index.html': '/learn/mx-principles.html',
+    'coming-soon.html': '/books/',
+    'coming-soon.cog.html': '/books/',
+    'mx-principles-menu.html': '/learn/mx-principles.html',
+    'principles-changed-how-i-build.html': '/blog/principles-changed-how-i-build.html',
+    'mx-introduction-chapter.pdf': '/books/mx-introduction-chapter.pdf',
+    'the-books/index.html': '/books/',
+    'the-books/introduction.html': '/books/introduction.html',
+    'the-books/handbook.html': '/books/handbook.html',
+    'the-books/protocols.html': '/books/protocols.html',
+    'the-books/the-author.html': '/books/the-author.html',
+    'the-books/training-vs-inference.html': '/books/training-vs-inference.html',
+    'online-material/index.html': '/books/footnotes.html',
+    'online-material/appendices/index.html': '/books/appendices/',
+    'printworks/': '/about/printworks.html',
+    'printworks/index.html': '/about/printworks.html',
+    'sitemap.xml': '/sitemap.xml',
+  },
+  prefixes: [
+    // Appendix files: /mx/online-material/appendices/X → /books/appendices/X
+    {
+      prefix: 'online-material/appendices/',
+      rewrite: (path) => path.replace('online-material/appendices/', '/books/appendices/'),
+    },
+    // Legacy bookshop path
+    { prefix: 'bookshop', rewrite: (path) => path.replace(/^bookshop/, '/books') },
+    // Legacy cognovamx-website path
+    { prefix: 'cognovamx-website/', rewrite: (path) => path.replace(/^cognovamx-website/, '/learn') },
+  ],
+});
+
+/**
+ * Resolves the mx.allabout.network pathname for a legacy allabout.network/mx/*
+ * path. Specific mappings for old URLs first, then legacy folder prefixes;
+ * anything else goes to the mx.allabout.network root.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {string} remaining - Path after the leading /mx/ (e.g. "the-books/index.html")
+ * @returns {string} Target pathname on mx.allabout.network
+ */
+export const resolveMxPathRedirect = (remaining) => resolveMxPathRedirectTable(remaining) || '/';
+
 /**
  * Resolves mx-site documentation URLs whose only published file carries a .md
  * extension. The cog magic-header convention advertises
@@ -721,13 +1242,156 @@ export const shouldLanguageRedirect = (remainingPath, site) => {
  * @param {string} pathname - Request pathname (e.g. "/cog-runtime.html")
  * @returns {string|null} Target pathname to redirect to, or null if none applies
  */
-export const resolveMxSiteDocRedirect = (pathname) => {
-  const map = {
-    '/cog-runtime.html': '/drafts/cog-runtime.md',
-    '/drafts/cog-runtime': '/drafts/cog-runtime.md',
-    '/drafts/cog-spec.v1': '/drafts/cog-spec.v1.md',
+export const resolveMxSiteDocRedirect = (pathname) => (
+  Object.hasOwn(MX_SITE_DOC_REDIRECTS, pathname) ? MX_SITE_DOC_REDIRECTS[pathname] : null
+);
+
+// User-Agent rules in priority order: the first rule with a token anywhere in
+// the lowercased UA wins. `ai` marks the categories isAiAgent counts.
+const AGENT_RULES = [
+  { category: 'chatgpt', ai: true, tokens: ['gptbot', 'oai-searchbot', 'chatgpt', 'openai'] },
+  { category: 'claude', ai: true, tokens: ['claudebot', 'claude', 'anthropic'] },
+  { category: 'perplexity', ai: true, tokens: ['perplexitybot', 'perplexity'] },
+  { category: 'gemini', ai: true, tokens: ['google-extended', 'gemini'] },
+  { category: 'copilot', ai: true, tokens: ['copilot', 'bingpreview'] },
+  { category: 'applebot', ai: true, tokens: ['applebot-extended'] },
+  { category: 'meta-ai', ai: true, tokens: ['meta-externalagent', 'facebookexternalhit'] },
+  { category: 'bytespider', ai: true, tokens: ['bytespider'] },
+  { category: 'ccbot', ai: true, tokens: ['ccbot'] },
+  { category: 'amazonbot', ai: true, tokens: ['amazonbot'] },
+  { category: 'you', ai: true, tokens: ['youbot', 'you.com'] },
+  { category: 'phind', ai: true, tokens: ['phindbot'] },
+  { category: 'mistral', ai: true, tokens: ['mistralai', 'mistral-ai'] },
+  { category: 'googlebot', tokens: ['googlebot'] },
+  { category: 'bingbot', tokens: ['bingbot'] },
+  { category: 'browser', tokens: ['mozilla', 'chrome', 'safari'] },
+  { category: 'bot', tokens: ['bot', 'crawler', 'spider'] },
+];
+
+// Referer rules in priority order. `host` matches the hostname and any
+// subdomain of it; `path`, when present, must also match the lowercased path.
+const REFERER_RULES = [
+  { host: 'chat.openai.com', source: 'chat.openai.com', agentKey: 'chatgpt' },
+  { host: 'chatgpt.com', source: 'chatgpt.com', agentKey: 'chatgpt' },
+  { host: 'perplexity.ai', source: 'perplexity.ai', agentKey: 'perplexity' },
+  { host: 'gemini.google.com', source: 'gemini.google.com', agentKey: 'gemini' },
+  { host: 'bard.google.com', source: 'bard.google.com', agentKey: 'gemini' },
+  { host: 'copilot.microsoft.com', source: 'copilot.microsoft.com', agentKey: 'copilot' },
+  { host: 'copilot.cloud.microsoft', source: 'copilot.cloud.microsoft', agentKey: 'copilot' },
+  { host: 'm365.cloud.microsoft', source: 'm365.cloud.microsoft', agentKey: 'copilot' },
+  { host: 'claude.ai', source: 'claude.ai', agentKey: 'claude' },
+  { host: 'you.com', source: 'you.com', agentKey: 'you' },
+  { host: 'phind.com', source: 'phind.com', agentKey: 'phind' },
+  { host: 'poe.com', source: 'poe.com', agentKey: 'poe' },
+  { host: 'chat.mistral.ai', source: 'chat.mistral.ai', agentKey: 'mistral' },
+  { host: 'meta.ai', source: 'meta.ai', agentKey: 'meta-ai' },
+  { host: 'grok.com', source: 'grok.com', agentKey: 'grok' },
+  { host: 'x.ai', source: 'x.ai', agentKey: 'grok' },
+  // Bing chat lives at www.bing.com/chat, so the path decides
+  {
+    host: 'bing.com', path: /^\/chat($|\/)/, source: 'bing.com/chat', agentKey: 'copilot',
+  },
+  {
+    host: 'duckduckgo.com', path: /duckai/, source: 'duckduckgo.com/duckai', agentKey: 'duckai',
+  },
+];
+
+const escapeRegExp = (text) => text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+
+/**
+ * Compiles User-Agent rules into a classifier built once per isolate.
+ * All tokens go into one alternation, scanned in a single pass over the
+ * lowercased UA; the lowest-priority-index rule seen wins, exactly as
+ * checking each rule's tokens in order would.
+ * Tokens that contain a token of the same or an earlier rule are dropped
+ * (the shorter token always matches too). After a match the scan resumes
+ * one character in only when an earlier rule's token could start inside
+ * the matched text, so overlapping tokens are never missed.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {Array<{category: string, tokens: Array<string>}>} rules - In priority order
+ * @param {string} [fallback='unknown'] - Category when no token matches
+ * @returns {function(string): string} Classifier
+ */
+export const compileAgentClassifier = (rules, fallback = 'unknown') => {
+  const ruleOf = new Map();
+  rules.forEach(({ tokens }, index) => tokens.forEach((token) => {
+    if (!ruleOf.has(token)) ruleOf.set(token, index);
+  }));
+  const tokens = [...ruleOf.keys()]
+    .filter((token) => ![...ruleOf.keys()].some((other) => other !== token
+      && ruleOf.get(other) <= ruleOf.get(token) && token.includes(other)))
+    // Earlier rules first, so a position where two tokens start yields the earlier rule
+    .sort((a, b) => ruleOf.get(a) - ruleOf.get(b) || b.length - a.length);
+  const overlapping = new Set(tokens.filter((token) => {
+    for (let k = 1; k < token.length; k += 1) {
+      const tail = token.slice(k);
+      const hidden = tokens.some((other) => ruleOf.get(other) < ruleOf.get(token)
+        && (other.startsWith(tail) || tail.includes(other)));
+      if (hidden) return true;
+    }
+    return false;
+  }));
+  const matcher = new RegExp(tokens.map(escapeRegExp).join('|'), 'g');
+  const categories = rules.map(({ category }) => category);
+
+  return (userAgent) => {
+    if (!userAgent) return fallback;
+    const ua = userAgent.toLowerCase();
+    let best = categories.length;
+    matcher.lastIndex = 0;
+    let match = matcher.exec(ua);
+    while (match !== null) {
+      const rule = ruleOf.get(match[0]);
+      if (rule < best) best = rule;
+      if (best === 0) break;
+      if (overlapping.has(match[0])) matcher.lastIndex = match.index + 1;
+      match = matcher.exec(ua);
+    }
+    return best < categories.length ? categories[best] : fallback;
+  };
+};
+
+/**
+ * Compiles Referer rules into a classifier built once per isolate. Rules
+ * are keyed by hostname in a Map, so a referer costs one lookup per label
+ * of its hostname ("www.bing.com" → "www.bing.com", "bing.com", "com")
+ * instead of a RegExp per rule. Where several rules match, the earliest wins.
+ * Pure function - fully testable without Cloudflare Workers runtime.
+ * @param {Array<{host: string, path?: RegExp, source: string, agentKey: string}>} rules - In priority order
+ * @returns {function(string|null): ({source: string, agentKey: string}|null)} Classifier
+ */
+export const compileRefererClassifier = (rules) => {
+  const byHost = new Map();
+  rules.forEach((rule, index) => {
+    if (!byHost.has(rule.host)) byHost.set(rule.host, []);
+    byHost.get(rule.host).push({ ...rule, index });
+  });
+
+  return (referer) => {
+    if (!referer) return null;
+    let host;
+    let pathname;
+    try {
+      const u = new URL(referer);
+      host = u.hostname.toLowerCase();
+      pathname = u.pathname;
+    } catch {
+      return null;
+    }
+    const path = pathname.toLowerCase();
+    let best = null;
+    let suffix = host;
+    while (suffix) {
+      const candidates = byHost.get(suffix);
+      if (candidates) {
+        const rule = candidates.find((candidate) => !candidate.path || candidate.path.test(path));
+        if (rule && (!best || rule.index < best.index)) best = rule;
+      }
+      const dot = suffix.indexOf('.');
+      suffix = dot === -1 ? '' : suffix.slice(dot + 1);
+    }
+    return best ? { source: best.source, agentKey: best.agentKey } : null;
   };
-  return map[pathname] || null;
 };
 
 /**
@@ -736,28 +1400,9 @@ export const resolveMxSiteDocRedirect = (pathname) => {
  * @param {string} userAgent - User-Agent header value
  * @returns {string} Agent category
  */
-export const categoriseAgent = (userAgent) => {
-  if (!userAgent) return 'unknown';
-  const ua = userAgent.toLowerCase();
-  if (ua.includes('gptbot') || ua.includes('oai-searchbot') || ua.includes('chatgpt') || ua.includes('openai')) return 'chatgpt';
-  if (ua.includes('claudebot') || ua.includes('claude') || ua.includes('anthropic')) return 'claude';
-  if (ua.includes('perplexitybot') || ua.includes('perplexity')) return 'perplexity';
-  if (ua.includes('google-extended') || ua.includes('gemini')) return 'gemini';
-  if (ua.includes('copilot') || ua.includes('bingpreview')) return 'copilot';
-  if (ua.includes('applebot-extended')) return 'applebot';
-  if (ua.includes('meta-externalagent') || ua.includes('facebookexternalhit')) return 'meta-ai';
-  if (ua.includes('bytespider')) return 'bytespider';
-  if (ua.includes('ccbot')) return 'ccbot';
-  if (ua.includes('amazonbot')) return 'amazonbot';
-  if (ua.includes('youbot') || ua.includes('you.com')) return 'you';
-  if (ua.includes('phindbot')) return 'phind';
-  if (ua.includes('mistralai') || ua.includes('mistral-ai')) return 'mistral';
-  if (ua.includes('googlebot')) return 'googlebot';
-  if (ua.includes('bingbot')) return 'bingbot';
-  if (ua.includes('mozilla') || ua.includes('chrome') || ua.includes('safari')) return 'browser';
-  if (ua.includes('bot') || ua.includes('crawler') || ua.includes('spider')) return 'bot';
-  return 'unknown';
-};
+export const categoriseAgent = compileAgentClassifier(AGENT_RULES);
+
+const AI_AGENT_CATEGORIES = new Set(AGENT_RULES.filter((rule) => rule.ai).map((rule) => rule.category));
 
 /**
  * Is the given agent category an AI agent (crawler or assistant)?
@@ -765,69 +1410,21 @@ export const categoriseAgent = (userAgent) => {
  * @param {string} category - output of categoriseAgent
  * @returns {boolean}
  */
-export const isAiAgent = (category) => [
-  'chatgpt', 'claude', 'perplexity', 'gemini', 'copilot',
-  'applebot', 'meta-ai', 'bytespider', 'ccbot', 'amazonbot',
-  'you', 'phind', 'mistral',
-].includes(category);
+export const isAiAgent = (category) => AI_AGENT_CATEGORIES.has(category);
 
 /**
  * Categorise a Referer header against known AI surfaces.
  * Pure function - no network, no runtime dependencies.
  *
  * Returns null if the referer is absent, same-site, or not from a known AI
- * surface. Returns { source, agentKey } otherwise.
+ * surface. Returns { source, agentKey } otherwise. Matching is anchored on
+ * hostname labels, so bare domains and subdomains both match without
+ * over-matching (`evil-chatgpt.com` is not `chatgpt.com`).
  *
  * @param {string|null} referer - Referer header value
  * @returns {{ source: string, agentKey: string }|null}
  */
-export const categoriseReferer = (referer) => {
-  if (!referer) return null;
-  let host;
-  let path;
-  try {
-    const u = new URL(referer);
-    host = u.hostname.toLowerCase();
-    path = u.pathname.toLowerCase();
-  } catch {
-    return null;
-  }
-  // Hostname-only matchers. The anchored (^|\.) prefix lets bare domains
-  // and subdomains both match without over-matching (e.g. `evil.com`
-  // would not hit `chatgpt.com` because `.com` doesn't precede `chatgpt`).
-  const hostMatches = [
-    { pattern: /(^|\.)chat\.openai\.com$/, source: 'chat.openai.com', agentKey: 'chatgpt' },
-    { pattern: /(^|\.)chatgpt\.com$/, source: 'chatgpt.com', agentKey: 'chatgpt' },
-    { pattern: /(^|\.)perplexity\.ai$/, source: 'perplexity.ai', agentKey: 'perplexity' },
-    { pattern: /(^|\.)gemini\.google\.com$/, source: 'gemini.google.com', agentKey: 'gemini' },
-    { pattern: /(^|\.)bard\.google\.com$/, source: 'bard.google.com', agentKey: 'gemini' },
-    { pattern: /(^|\.)copilot\.microsoft\.com$/, source: 'copilot.microsoft.com', agentKey: 'copilot' },
-    { pattern: /(^|\.)copilot\.cloud\.microsoft$/, source: 'copilot.cloud.microsoft', agentKey: 'copilot' },
-    { pattern: /(^|\.)m365\.cloud\.microsoft$/, source: 'm365.cloud.microsoft', agentKey: 'copilot' },
-    { pattern: /(^|\.)claude\.ai$/, source: 'claude.ai', agentKey: 'claude' },
-    { pattern: /(^|\.)you\.com$/, source: 'you.com', agentKey: 'you' },
-    { pattern: /(^|\.)phind\.com$/, source: 'phind.com', agentKey: 'phind' },
-    { pattern: /(^|\.)poe\.com$/, source: 'poe.com', agentKey: 'poe' },
-    { pattern: /(^|\.)chat\.mistral\.ai$/, source: 'chat.mistral.ai', agentKey: 'mistral' },
-    { pattern: /(^|\.)meta\.ai$/, source: 'meta.ai', agentKey: 'meta-ai' },
-    { pattern: /(^|\.)grok\.com$/, source: 'grok.com', agentKey: 'grok' },
-    { pattern: /(^|\.)x\.ai$/, source: 'x.ai', agentKey: 'grok' },
-  ];
-  for (const { pattern, source, agentKey } of hostMatches) {
-    if (pattern.test(host)) return { source, agentKey };
-  }
-  // Host+path matchers. Bing chat lives at www.bing.com/chat — the earlier
-  // pattern `(^|\.)bing\.com\/chat$` never matched because the regex ran
-  // against hostname-only, so Bing-Copilot referrals fell through to
-  // "unknown" instead of being credited to copilot.
-  if (/(^|\.)bing\.com$/.test(host) && /^\/chat($|\/)/.test(path)) {
-    return { source: 'bing.com/chat', agentKey: 'copilot' };
-  }
-  if (/(^|\.)duckduckgo\.com$/.test(host) && /duckai/.test(path)) {
-    return { source: 'duckduckgo.com/duckai', agentKey: 'duckai' };
-  }
-  return null;
-};
+export const categoriseReferer = compileRefererClassifier(REFERER_RULES);
 
 /**
  * Should this request be skipped for AI-visit capture?
@@ -1065,46 +1662,12 @@ const handleMxSubdomain = async (request, url, subdomain, env) => {
       return Response.redirect(redirectUrl.toString(), 302);
     }
 
-    const profileRedirects = {
-      '/blog/about.tom.cranstoun.html': '/blog/profiles/about.tom.cranstoun.html',
-      '/blog/about.claude.code.html': '/blog/profiles/about.claude.code.html',
-      '/blog/about.claude.sonnet.4.5.html': '/blog/profiles/about.claude.sonnet.4.5.html',
-      '/blog/about.microsoft.copilot.html': '/blog/profiles/about.microsoft.copilot.html',
-    };
-    if (profileRedirects[url.pathname]) {
-      const redirectUrl = new URL(url);
-      redirectUrl.pathname = profileRedirects[url.pathname];
-      return Response.redirect(redirectUrl.toString(), 301);
-    }
-
-    // Retired/superseded posts: 301 to the replacement that is now canonical.
-    const retiredPostRedirects = {
-      '/blog/salesforce-buys-contentful-agent-ready-content.html': '/blog/salesforce-contentful-not-an-mx-strategy.html',
-      // Blog group migration 2026-06-16
-      '/blog/the-crawl-still-speaks-english.html': '/blog/agent-web/the-crawl-still-speaks-english.html',
-      '/blog/what-googles-web-dev-agent-guidance-does-not-touch.html': '/blog/agent-web/what-googles-web-dev-agent-guidance-does-not-touch.html',
-      '/blog/a-pdf-that-can-prove-itself.html': '/blog/provenance/a-pdf-that-can-prove-itself.html',
-      '/blog/read-is-not-the-same-as-trusted.html': '/blog/provenance/read-is-not-the-same-as-trusted.html',
-      '/blog/software-agreed-the-deal.html': '/blog/provenance/software-agreed-the-deal.html',
-      '/blog/the-inspector-you-can-audit-yourself.html': '/blog/provenance/the-inspector-you-can-audit-yourself.html',
-      '/blog/the-padlock-and-the-page.html': '/blog/provenance/the-padlock-and-the-page.html',
-      '/blog/agency-platforms-and-the-open-layer.html': '/blog/industry/agency-platforms-and-the-open-layer.html',
-      '/blog/geo-is-a-tactic-mx-is-the-specification.html': '/blog/industry/geo-is-a-tactic-mx-is-the-specification.html',
-      '/blog/google-named-geo-then-debunked-it.html': '/blog/industry/google-named-geo-then-debunked-it.html',
-      '/blog/microsoft-frontier-tuning-and-the-unsigned-trace.html': '/blog/industry/microsoft-frontier-tuning-and-the-unsigned-trace.html',
-      '/blog/orange-with-pump.html': '/blog/foundations/orange-with-pump.html',
-      '/blog/strip-the-marks-lose-the-word.html': '/blog/foundations/strip-the-marks-lose-the-word.html',
-    };
-    if (retiredPostRedirects[url.pathname]) {
-      const redirectUrl = new URL(url);
-      redirectUrl.pathname = retiredPostRedirects[url.pathname];
-      return Response.redirect(redirectUrl.toString(), 301);
-    }
-
-    // Plural-to-singular: /blogs or /blogs/* → /blog or /blog/*
-    if (url.pathname === '/blogs' || url.pathname === '/blogs/' || url.pathname.startsWith('/blogs/')) {
+    // Relocated profile pages (the printed book links the old URLs), retired
+    // posts, and plural /blogs paths: all permanent
+    const permanentRedirect = resolveMxSitePermanentRedirect(url.pathname);
+    if (permanentRedirect) {
       const redirectUrl = new URL(url);
-      redirectUrl.pathname = url.pathname.replace(/^\/blogs/, '/blog') || '/blog/';
+      redirectUrl.pathname = permanentRedirect;
       return Response.redirect(redirectUrl.toString(), 301);
     }
   }
@@ -1311,9 +1874,19 @@ const handleMxSubdomain = async (request, url, subdomain, env) => {
 // Re-export host allowlist helpers so existing test imports keep working.
 export { AI_ATTRIBUTION_HOSTS, isAttributionHost };
 
+// Per-isolate write-behind buffer: AI-visit rows reach D1 as batched
+// multi-row inserts instead of one INSERT per request. Its counters are
+// logged as a structured "AI visits: buffer stats" line at most once a minute.
+const aiVisitBuffer = createAiVisitBuffer();
+
+// Per-isolate compiled language routes (see createLanguageConfigCache)
+const languageConfigCache = createLanguageConfigCache();
+
 /**
  * Fire-and-forget capture of an AI-visit into D1 and Analytics Engine.
  * Called from handleRequest via ctx.waitUntil so it never blocks the response.
+ * The D1 row goes through the write-behind buffer; the returned promise
+ * covers any flush this row triggers.
  * Safe to call with missing bindings or an irrelevant hostname — it no-ops.
  *
  * @param {object} args - { request, response, url, env }
@@ -1331,9 +1904,6 @@ const captureAiVisit = async ({ request, response, url, env }) => {
       status: response?.status || null,
     });
     if (!row) return;
-    if (env.DB) {
-      await aiVisitsDb.insert(env.DB, row);
-    }
     if (env.ANALYTICS) {
       env.ANALYTICS.writeDataPoint({
         blobs: [row.hostname, row.path, row.agentKey, row.eventType, row.country || 'XX'],
@@ -1341,6 +1911,9 @@ const captureAiVisit = async ({ request, response, url, env }) => {
         indexes: [row.agentKey],
       });
     }
+    if (env.DB) {
+      await aiVisitBuffer.push(env.DB, row);
+    }
   } catch (_) {
     /* never let capture interfere with responses */
   }
@@ -1533,44 +2106,7 @@ const handleRequest = async (request, env, ctx) => {
     redirectUrl.hostname = 'mx.allabout.network';
     const remaining = url.pathname.replace(/^\/mx\/?/, '');
 
-    // Specific path mappings for old URLs
-    const mxRedirects = {
-      '': '/',
-      'index.html': '/learn/mx-principles.html',
-      'coming-soon.html': '/books/',
-      'coming-soon.cog.html': '/books/',
-      'mx-principles-menu.html': '/learn/mx-principles.html',
-      'principles-changed-how-i-build.html': '/blog/principles-changed-how-i-build.html',
-      'mx-introduction-chapter.pdf': '/books/mx-introduction-chapter.pdf',
-      'the-books/index.html': '/books/',
-      'the-books/introduction.html': '/books/introduction.html',
-      'the-books/handbook.html': '/books/handbook.html',
-      'the-books/protocols.html': '/books/protocols.html',
-      'the-books/the-author.html': '/books/the-author.html',
-      'the-books/training-vs-inference.html': '/books/training-vs-inference.html',
-      'online-material/index.html': '/books/footnotes.html',
-      'online-material/appendices/index.html': '/books/appendices/',
-      'printworks/': '/about/printworks.html',
-      'printworks/index.html': '/about/printworks.html',
-      'sitemap.xml': '/sitemap.xml',
-    };
-
-    // Check exact match first
-    if (mxRedirects[remaining] !== undefined) {
-      redirectUrl.pathname = mxRedirects[remaining];
-    } else if (remaining.startsWith('online-material/appendices/')) {
-      // Appendix files: /mx/online-material/appendices/X → /books/appendices/X
-      redirectUrl.pathname = remaining.replace('online-material/appendices/', '/books/appendices/');
-    } else if (remaining.startsWith('bookshop')) {
-      // Legacy bookshop path
-      redirectUrl.pathname = remaining.replace(/^bookshop/, '/books') || '/books/';
-    } else if (remaining.startsWith('cognovamx-website/')) {
-      // Legacy cognovamx-website path
-      redirectUrl.pathname = remaining.replace(/^cognovamx-website/, '/learn');
-    } else {
-      // Default: redirect to mx.allabout.network root
-      redirectUrl.pathname = '/';
-    }
+    redirectUrl.pathname = resolveMxPathRedirect(remaining);
 
     return new Response(null, {
       status: 301,
@@ -1636,32 +2172,28 @@ const handleRequest = async (request, env, ctx) => {
   }
 
   // --- Language redirect (before origin fetch) ---
-  // Fetch language config from mx-outputs (reginald API) with 1-hour edge cache
+  // Compiled language routes are cached per isolate; language-config.json is
+  // only fetched (from mx-outputs, with a 1-hour edge cache) when they go stale
   try {
-    const configUrl = new URL('/reginald/api/v1/language-config.json', url);
-    configUrl.hostname = env.MX_OUTPUTS_HOSTNAME || env.ORIGIN_HOSTNAME;
-    const configResp = await fetch(configUrl, { cf: { cacheTtl: 3600 } });
-    if (configResp.ok) {
-      const langConfig = await configResp.json();
-      const match = findLanguageSite(url.pathname, langConfig.sites);
-      if (match) {
-        const { site, remainingPath } = match;
-        // Skip if already on a language path
-        const langPattern = new RegExp(`^/(${site.languages.join('|')})/`);
-        if (!langPattern.test(remainingPath) && shouldLanguageRedirect(remainingPath, site)) {
-          const acceptLang = request.headers.get('Accept-Language') || '';
-          const targetLang = detectLanguage(acceptLang, site.languages, site.default);
-          const redirectUrl = new URL(request.url);
-          redirectUrl.pathname = `${site.pathPrefix}/${targetLang}/`;
-          return new Response(null, {
-            status: 302,
-            headers: {
-              Location: redirectUrl.toString(),
-              'Cache-Control': 'no-cache',
-            },
-          });
-        }
-      }
+    const languageRoutes = await languageConfigCache.get(async () => {
+      const configUrl = new URL('/reginald/api/v1/language-config.json', url);
+      configUrl.hostname = env.MX_OUTPUTS_HOSTNAME || env.ORIGIN_HOSTNAME;
+      const configResp = await fetch(configUrl, { cf: { cacheTtl: 3600 } });
+      if (!configResp.ok) throw new Error(`language config: HTTP ${configResp.status}`);
+      return configResp.json();
+    }, ctx);
+    const acceptLang = request.headers.get('Accept-Language') || '';
+    const languagePath = resolveLanguageRedirect(languageRoutes, url.pathname, acceptLang);
+    if (languagePath) {
+      const redirectUrl = new URL(request.url);
+      redirectUrl.pathname = languagePath;
+      return new Response(null, {
+        status: 302,
+        headers: {
+          Location: redirectUrl.toString(),
+          'Cache-Control': 'no-cache',
+        },
+      });
     }
   } catch (_langErr) {
     // Language redirect is non-critical — fall through to normal request handling
@@ -1705,9 +2237,9 @@ const handleRequest = async (request, env, ctx) => {
   const req = new Request(url, request);
   req.headers.set('x-forwarded-host', req.headers.get('host'));
   req.headers.set('x-byo-cdn-type', 'cloudflare');
-  // Request uncompressed from origin — the worker modifies HTML as text,
-  // so compressed responses cause double-encoding issues with cacheEverything
-  req.headers.set('Accept-Encoding', 'identity');
+  // Compressed origin bodies are fine: the runtime decodes them as the HTML
+  // transform stream reads, and the rewritten response drops the origin
+  // content-encoding/content-length so the edge re-encodes for the client.
   if (env.PUSH_INVALIDATION !== 'disabled') {
     req.headers.set('x-push-invalidation', 'enabled');
   }
@@ -1735,33 +2267,20 @@ const handleRequest = async (request, env, ctx) => {
   // Only process HTML responses for content transformations
   const contentType = resp.headers.get('content-type');
   if (contentType && contentType.includes('text/html')) {
-    // Get HTML text for pure string processing
-    let htmlText = await resp.text();
-
-    // CRITICAL ORDER: Apply transformations (ADD content) FIRST
-    // 1. Transform: Replace picture placeholders
-    htmlText = replacePicturePlaceholder(htmlText);
-
-    // 2. Transform: Inject JSON-LD structured data
-    htmlText = injectJsonLd(htmlText, publicHostname);
-
-    // 3. Transform: Inject Speculation Rules for near-instant navigation
-    htmlText = injectSpeculationRules(htmlText);
-
-    // CRITICAL ORDER: Apply removals (DELETE content) LAST
-    // 4. Clean: Remove non-social metadata tags
-    htmlText = removeNonSocialMetadata(htmlText);
-
-    // 5. Clean: Remove HTML comments (must be last to preserve triggers for transforms)
-    htmlText = removeHtmlComments(htmlText);
-
-    // Create new response with processed HTML
-    // Must strip content-encoding and content-length: resp.text() auto-decompresses
-    // but the original headers still claim compressed encoding and size
+    // Single pass over the body: transformations (ADD content) FIRST,
+    // removals (DELETE content) LAST, with comment removal last of all.
+    // Origin bodies are piped through as a stream (only <head> is buffered);
+    // empty or already-buffered bodies go through the same engine in one call.
+    const body = typeof resp.body?.pipeThrough === 'function'
+      ? resp.body.pipeThrough(createHtmlTransformStream(publicHostname))
+      : transformHtml(await resp.text(), publicHostname);
+
+    // Must strip content-encoding and content-length: the body is decoded as
+    // it is read, but the original headers still claim compressed encoding and size
     const processedHeaders = new Headers(resp.headers);
     processedHeaders.delete('content-encoding');
     processedHeaders.delete('content-length');
-    resp = new Response(htmlText, {
+    resp = new Response(body, {
       status: resp.status,
       statusText: resp.statusText,
       headers: processedHeaders,
@@ -2066,14 +2585,25 @@ export default {
     if (event.cron === '0 2 * * *') {
       await runSubscriptionExpiry(env);
     }
-    // Monthly on 1st at 03:00 UTC — run aliveness checks
+    // Monthly on 1st at 03:00 UTC — start an aliveness run
     if (event.cron === '0 3 1 * *') {
       await runAlivenessChecks(env);
     }
     // Hourly at :05 — forward ai_visits to GA4 Measurement Protocol
-    // for every row in ga4_connectors where enabled=1.
+    // for every row in ga4_connectors where enabled=1, then continue an
+    // aliveness run that ran out of budget (no-op when none is open).
+    // Each job has its own try/catch so one failing never skips the other.
     if (event.cron === '5 * * * *') {
-      await runGa4Connector(env);
+      try {
+        await runGa4Connector(env);
+      } catch (e) {
+        console.error(`GA4 connector: ${e.message}`);
+      }
+      try {
+        await runAlivenessChecks(env, { resume: true });
+      } catch (e) {
+        console.error(`Aliveness resume: ${e.message}`);
+      }
     }
   },
 };
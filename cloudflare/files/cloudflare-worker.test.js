@@ -22,6 +22,7 @@
 import {
   describe, test, expect, vi, beforeEach, afterEach,
 } from 'vitest';
+import { readFileSync } from 'fs';
 import worker, {
   getExtension,
   isMediaRequest,
@@ -36,11 +37,24 @@ import worker, {
   removeHtmlComments,
   injectSpeculationRules,
   injectJsonLd,
+  removeNonSocialMetadata,
+  collectMetaContent,
+  createHtmlStreamTransformer,
+  createHtmlTransformStream,
+  transformHtml,
   parseAcceptLanguage,
   detectLanguage,
   findLanguageSite,
   shouldLanguageRedirect,
   resolveMxSiteDocRedirect,
+  compileRedirectTable,
+  resolveMxSitePermanentRedirect,
+  resolveMxPathRedirect,
+  compileLanguageConfig,
+  resolveLanguageRedirect,
+  createLanguageConfigCache,
+  compileAgentClassifier,
+  compileRefererClassifier,
   categoriseAgent,
   categoriseReferer,
   isAiAgent,
@@ -1090,6 +1104,147 @@ describe('injectSpeculationRules', () => {
   });
 });
 
+// Reference buffered chain — the order handleRequest used before streaming
+const applyHtmlChain = (html, hostname) => {
+  let result = replacePicturePlaceholder(html);
+  result = injectJsonLd(result, hostname);
+  result = injectSpeculationRules(result);
+  result = removeNonSocialMetadata(result);
+  return removeHtmlComments(result);
+};
+
+// Feeds html to a stream transformer in fixed-size chunks
+const transformInChunks = (html, hostname, size) => {
+  const transformer = createHtmlStreamTransformer(hostname);
+  let out = '';
+  for (let i = 0; i < html.length; i += size) {
+    out += transformer.push(html.slice(i, i + size));
+  }
+  return out + transformer.flush();
+};
+
+const STREAM_TEST_PAGE = `<!DOCTYPE html>
+<html>
+<head>
+  <title>Stream Test</title>
+  <!-- Trigger JSON-LD generation -->
+  <meta name="jsonld" content="article">
+  <meta property="og:title" content="Stream Test Article">
+  <meta property="og:description" content="Chunk boundaries must not change output">
+  <meta name="author" content="Tom Cranstoun">
+  <meta name="author-url" content="https://example.com/tom">
+  <meta name="publication-date" content="15/12/2024">
+  <meta name="modified-date" content="Dec 20, 2024">
+</head>
+<body>
+  <main>
+    <!-- multi-line
+         comment with <div>Picture Here</div> inside -->
+    <div><div>Picture Here</div></div>
+    <meta name="longdescription" content="stray body meta">
+    <p>Body text <!-- inline --> continues</p>
+    <DIV>picture here please</DIV>
+  </main>
+</body>
+</html>`;
+
+describe('collectMetaContent', () => {
+  test('returns the same values as extractMetaContent per selector', () => {
+    const meta = collectMetaContent(STREAM_TEST_PAGE);
+    expect(meta['property="og:title"']).toBe('Stream Test Article');
+    expect(meta['name="author-url"']).toBe('https://example.com/tom');
+    expect(meta['name="linkedin"']).toBeUndefined();
+  });
+
+  test('first occurrence of a selector wins and keys are case-insensitive', () => {
+    const html = '<META NAME="Author" content="First"><meta name="author" content="Second">';
+    expect(collectMetaContent(html)['name="author"']).toBe('First');
+  });
+});
+
+describe('createHtmlStreamTransformer', () => {
+  test('matches the buffered chain for a whole document', () => {
+    expect(transformHtml(STREAM_TEST_PAGE, 'allabout.network'))
+      .toBe(applyHtmlChain(STREAM_TEST_PAGE, 'allabout.network'));
+  });
+
+  test('matches the buffered chain at every chunk size', () => {
+    const expected = applyHtmlChain(STREAM_TEST_PAGE, 'allabout.network');
+    for (let size = 1; size <= 64; size += 1) {
+      expect(transformInChunks(STREAM_TEST_PAGE, 'allabout.network', size)).toBe(expected);
+    }
+  });
+
+  test('emits body text before the document ends', () => {
+    const transformer = createHtmlStreamTransformer('allabout.network');
+    expect(transformer.push('<html><head><title>T</title>')).toBe('');
+    const first = transformer.push('</head><body><p>one</p><p>two');
+    expect(first).toContain('speculationrules');
+    expect(first).toContain('<p>one</p>');
+    expect(transformer.flush()).toBe('<p>two');
+  });
+
+  test('removes a meta tag and its trailing whitespace across chunks', () => {
+    const html = '<head></head><body><meta name="jsonld" content="x">\n   \n<p>After</p></body>';
+    const expected = applyHtmlChain(html, 'allabout.network');
+    expect(expected).toContain('</head><body><p>After</p>');
+    for (let size = 1; size <= 16; size += 1) {
+      expect(transformInChunks(html, 'allabout.network', size)).toBe(expected);
+    }
+  });
+
+  test('removes comments that span chunks, including a split closing marker', () => {
+    const html = '<head></head><body>a<!-- x <p>y</p> --- >c --->b</body>';
+    for (let size = 1; size <= 8; size += 1) {
+      expect(transformInChunks(html, 'allabout.network', size)).toBe(applyHtmlChain(html, 'allabout.network'));
+    }
+  });
+
+  test('leaves an unclosed comment intact like removeHtmlComments', () => {
+    const html = '<head></head><body><p>a</p><!-- never closed <p>b</p>';
+    expect(transformInChunks(html, 'allabout.network', 5)).toBe(applyHtmlChain(html, 'allabout.network'));
+    expect(transformHtml(html, 'allabout.network')).toContain('<!-- never closed');
+  });
+
+  test('handles documents without </head>', () => {
+    const html = '<div>Picture Here</div><!-- c --><meta name="jsonld" content="article">';
+    expect(transformInChunks(html, 'allabout.network', 3)).toBe(applyHtmlChain(html, 'allabout.network'));
+    expect(transformHtml(html, 'allabout.network')).not.toContain('speculationrules');
+  });
+
+  test('transforms the local test.html fixture identically', () => {
+    const html = readFileSync(new URL('../test.html', import.meta.url), 'utf8');
+    const expected = applyHtmlChain(html, 'allabout.network');
+    [1, 7, 256, 4096].forEach((size) => {
+      expect(transformInChunks(html, 'allabout.network', size)).toBe(expected);
+    });
+  });
+});
+
+describe('createHtmlTransformStream', () => {
+  test('transforms a byte stream split inside multi-byte characters', async () => {
+    const html = STREAM_TEST_PAGE.replace('Body text', 'Body tèxt — ✓');
+    const bytes = new TextEncoder().encode(html);
+    const source = new ReadableStream({
+      start(controller) {
+        for (let i = 0; i < bytes.length; i += 5) controller.enqueue(bytes.slice(i, i + 5));
+        controller.close();
+      },
+    });
+    const reader = source.pipeThrough(createHtmlTransformStream('allabout.network')).getReader();
+    const decoder = new TextDecoder();
+    let out = '';
+    for (;;) {
+      // eslint-disable-next-line no-await-in-loop
+      const { done, value } = await reader.read();
+      if (done) break;
+      out += decoder.decode(value, { stream: true });
+    }
+    out += decoder.decode();
+    expect(out).toBe(applyHtmlChain(html, 'allabout.network'));
+  });
+});
+
 // Mock HTMLRewriter for integration testing
 class MockHTMLRewriter {
   static activeHandlers = [];
@@ -1530,7 +1685,7 @@ describe('Content-Encoding Safety', () => {
     expect(response.headers.get('content-encoding')).toBe('gzip');
   });
 
-  test('sets Accept-Encoding: identity on origin requests', async () => {
+  test('does not force Accept-Encoding: identity on origin requests', async () => {
     const originHtml = '<html><head><title>Test</title></head><body>Hello</body></html>';
     mockFetch.mockResolvedValue(new global.Response(originHtml, {
       headers: { 'content-type': 'text/html' },
@@ -1539,22 +1694,17 @@ describe('Content-Encoding Safety', () => {
     const request = {
       url: 'https://allabout.network/page.html',
       method: 'GET',
-      headers: new Map(),
+      headers: new Map([['accept-encoding', 'gzip, br']]),
     };
     const env = { ORIGIN_HOSTNAME: 'main--test--owner.aem.live' };
 
     await worker.fetch(request, env);
 
-    // Verify the outgoing request to the origin asks for uncompressed content
-    const fetchCall = mockFetch.mock.calls[0];
-    const outgoingRequest = fetchCall[0];
-
-    // The request should have Accept-Encoding: identity
-    if (outgoingRequest.headers && typeof outgoingRequest.headers.get === 'function') {
-      expect(outgoingRequest.headers.get('Accept-Encoding')).toBe('identity');
-    } else if (outgoingRequest.headers instanceof Map) {
-      expect(outgoingRequest.headers.get('Accept-Encoding')).toBe('identity');
-    }
+    // The HTML transform stream reads decoded bodies, so the origin may
+    // answer compressed; the client's Accept-Encoding passes through
+    const originCall = mockFetch.mock.calls.find(([req]) => req instanceof Request);
+    expect(originCall).toBeDefined();
+    expect(originCall[0].headers.get('Accept-Encoding')).not.toBe('identity');
   });
 
   test('HTML body is readable text after processing', async () => {
@@ -1795,6 +1945,211 @@ describe('resolveMxSiteDocRedirect', () => {
   });
 });
 
+// ============================================================
+// Compiled routing table Tests
+// ============================================================
+describe('compileRedirectTable', () => {
+  const resolve = compileRedirectTable({
+    exact: { '/old': '/new', '/docs/': '/manual/' },
+    prefixes: [
+      { prefix: '/docs/', rewrite: (path) => path.replace(/^\/docs/, '/manual') },
+      { prefix: '/docs/api/', rewrite: (path) => path.replace(/^\/docs\/api/, '/reference') },
+    ],
+  });
+
+  test('resolves exact paths before prefix rules', () => {
+    expect(resolve('/old')).toBe('/new');
+    expect(resolve('/docs/')).toBe('/manual/');
+  });
+
+  test('uses the longest matching prefix', () => {
+    expect(resolve('/docs/intro.html')).toBe('/manual/intro.html');
+    expect(resolve('/docs/api/fetch.html')).toBe('/reference/fetch.html');
+  });
+
+  test('returns null when nothing matches', () => {
+    expect(resolve('/doc')).toBeNull();
+    expect(resolve('/')).toBeNull();
+    expect(resolve('constructor')).toBeNull();
+  });
+});
+
+describe('resolveMxSitePermanentRedirect', () => {
+  test('maps relocated profile pages', () => {
+    expect(resolveMxSitePermanentRedirect('/blog/about.tom.cranstoun.html'))
+      .toBe('/blog/profiles/about.tom.cranstoun.html');
+  });
+
+  test('maps retired posts to their replacements', () => {
+    expect(resolveMxSitePermanentRedirect('/blog/orange-with-pump.html'))
+      .toBe('/blog/foundations/orange-with-pump.html');
+  });
+
+  test('maps plural /blogs paths to /blog', () => {
+    expect(resolveMxSitePermanentRedirect('/blogs')).toBe('/blog');
+    expect(resolveMxSitePermanentRedirect('/blogs/')).toBe('/blog/');
+    expect(resolveMxSitePermanentRedirect('/blogs/agent-web/x.html')).toBe('/blog/agent-web/x.html');
+  });
+
+  test('returns null for canonical paths', () => {
+    expect(resolveMxSitePermanentRedirect('/blog/profiles/about.tom.cranstoun.html')).toBeNull();
+    expect(resolveMxSitePermanentRedirect('/blogsx')).toBeNull();
+    expect(resolveMxSitePermanentRedirect('/cog-runtime.html')).toBeNull();
+  });
+});
+
+describe('resolveMxPathRedirect', () => {
+  test('maps specific legacy URLs', () => {
+    expect(resolveMxPathRedirect('')).toBe('/');
+    expect(resolveMxPathRedirect('index.html')).toBe('/learn/mx-principles.html');
+    expect(resolveMxPathRedirect('the-books/handbook.html')).toBe('/books/handbook.html');
+    expect(resolveMxPathRedirect('online-material/appendices/index.html')).toBe('/books/appendices/');
+  });
+
+  test('rewrites legacy folder prefixes', () => {
+    expect(resolveMxPathRedirect('online-material/appendices/appendix-a.html')).toBe('/books/appendices/appendix-a.html');
+    expect(resolveMxPathRedirect('bookshop')).toBe('/books');
+    expect(resolveMxPathRedirect('bookshop/index.html')).toBe('/books/index.html');
+    expect(resolveMxPathRedirect('cognovamx-website/intro.html')).toBe('/learn/intro.html');
+  });
+
+  test('defaults to the mx.allabout.network root', () => {
+    expect(resolveMxPathRedirect('unknown/page.html')).toBe('/');
+    expect(resolveMxPathRedirect('cognovamx-website')).toBe('/');
+  });
+});
+
+describe('compileLanguageConfig / resolveLanguageRedirect', () => {
+  const config = {
+    sites: [
+      {
+        pathPrefix: '/demo/salva',
+        languages: ['es', 'en'],
+        default: 'es',
+        redirectPaths: ['/', '/index.html'],
+        excludePaths: ['/assets/'],
+      },
+      {
+        pathPrefix: '/demo',
+        languages: ['de', 'en'],
+        default: 'de',
+        redirectPaths: ['/'],
+      },
+      { pathPrefix: '/broken', languages: 'en', redirectPaths: ['/'] },
+    ],
+  };
+  const routes = compileLanguageConfig(config);
+
+  test('redirects registered paths using Accept-Language', () => {
+    expect(resolveLanguageRedirect(routes, '/demo/salva/', 'en-GB,en;q=0.9')).toBe('/demo/salva/en/');
+    expect(resolveLanguageRedirect(routes, '/demo/salva', '')).toBe('/demo/salva/es/');
+    expect(resolveLanguageRedirect(routes, '/demo/', 'fr')).toBe('/demo/de/');
+  });
+
+  test('matches whole path segments only', () => {
+    expect(resolveLanguageRedirect(routes, '/demo/salva-extra/', 'en')).toBeNull();
+    expect(resolveLanguageRedirect(routes, '/demonstration', 'en')).toBeNull();
+  });
+
+  test('skips language, excluded and unregistered paths', () => {
+    expect(resolveLanguageRedirect(routes, '/demo/salva/es/', 'en')).toBeNull();
+    expect(resolveLanguageRedirect(routes, '/demo/salva/assets/', 'en')).toBeNull();
+    expect(resolveLanguageRedirect(routes, '/demo/salva/about.html', 'en')).toBeNull();
+  });
+
+  test('agrees with findLanguageSite when prefixes overlap', () => {
+    const reordered = compileLanguageConfig({ sites: [config.sites[1], config.sites[0]] });
+    expect(findLanguageSite('/demo/salva/', [config.sites[1], config.sites[0]]).site.pathPrefix).toBe('/demo');
+    // '/salva/' is not a redirect path of the '/demo' site
+    expect(resolveLanguageRedirect(reordered, '/demo/salva/', 'en')).toBeNull();
+  });
+
+  test('never redirects for invalid sites or an empty config', () => {
+    expect(resolveLanguageRedirect(routes, '/broken/', 'en')).toBeNull();
+    expect(resolveLanguageRedirect(compileLanguageConfig(null), '/demo/', 'en')).toBeNull();
+  });
+});
+
+describe('createLanguageConfigCache', () => {
+  const config = { sites: [{ pathPrefix: '/demo', languages: ['en'], default: 'en', redirectPaths: ['/'] }] };
+
+  const setup = () => {
+    let time = 0;
+    const waits = [];
+    const ctx = { waitUntil: vi.fn((p) => waits.push(p)) };
+    const cache = createLanguageConfigCache({
+      ttlMs: 1000, maxStaleMs: 5000, retryMs: 300, now: () => time,
+    });
+    return { cache, ctx, waits, advance: (ms) => { time += ms; } };
+  };
+
+  test('loads once and serves fresh routes without reloading', async () => {
+    const { cache, ctx } = setup();
+    const load = vi.fn().mockResolvedValue(config);
+    const [a, b] = await Promise.all([cache.get(load, ctx), cache.get(load, ctx)]);
+    expect(await cache.get(load, ctx)).toBe(a);
+    expect(b).toBe(a);
+    expect(load).toHaveBeenCalledTimes(1);
+    expect(resolveLanguageRedirect(a, '/demo', '')).toBe('/demo/en/');
+  });
+
+  test('serves stale routes while revalidating in the background', async () => {
+    const { cache, ctx, waits, advance } = setup();
+    const load = vi.fn().mockResolvedValue(config);
+    const first = await cache.get(load, ctx);
+    advance(2000);
+    expect(await cache.get(load, ctx)).toBe(first);
+    expect(ctx.waitUntil).toHaveBeenCalledTimes(1);
+    await waits[0];
+    const refreshed = await cache.get(load, ctx);
+    expect(refreshed).not.toBe(first);
+    expect(load).toHaveBeenCalledTimes(2);
+  });
+
+  test('waits for a reload once the stale window has passed', async () => {
+    const { cache, ctx, advance } = setup();
+    const load = vi.fn().mockResolvedValueOnce(config).mockResolvedValueOnce({ sites: [] });
+    await cache.get(load, ctx);
+    advance(10000);
+    const routes = await cache.get(load, ctx);
+    expect(routes.siteCount).toBe(0);
+    expect(ctx.waitUntil).not.toHaveBeenCalled();
+  });
+
+  test('keeps the previous routes when a refresh fails', async () => {
+    const { cache, ctx, advance } = setup();
+    const load = vi.fn()
+      .mockResolvedValueOnce(config)
+      .mockRejectedValueOnce(new Error('HTTP 503'))
+      .mockResolvedValueOnce({ sites: [] });
+    const first = await cache.get(load, ctx);
+    advance(10000);
+    expect(await cache.get(load, ctx)).toBe(first);
+    // The failure is retried after a short delay, not on every request
+    advance(200);
+    expect(await cache.get(load, ctx)).toBe(first);
+    expect(load).toHaveBeenCalledTimes(2);
+    // ...and does not count as fresh, so the next request after it reloads
+    advance(200);
+    expect((await cache.get(load, ctx)).siteCount).toBe(0);
+    expect(load).toHaveBeenCalledTimes(3);
+  });
+
+  test('retries a failed cold load after the retry delay, not the TTL', async () => {
+    const { cache, ctx, advance } = setup();
+    const load = vi.fn().mockRejectedValueOnce(new Error('offline')).mockResolvedValueOnce(config);
+    const routes = await cache.get(load, ctx);
+    expect(routes.siteCount).toBe(0);
+    expect(await cache.get(load, ctx)).toBe(routes);
+    expect(load).toHaveBeenCalledTimes(1);
+
+    advance(300);
+    const loaded = await cache.get(load, ctx);
+    expect(resolveLanguageRedirect(loaded, '/demo', '')).toBe('/demo/en/');
+    expect(load).toHaveBeenCalledTimes(2);
+  });
+});
+
 // ============================================================
 // categoriseAgent Tests
 // ============================================================
@@ -1866,6 +2221,68 @@ describe('categoriseAgent', () => {
     expect(categoriseAgent('curl/7.88.1')).toBe('unknown');
     expect(categoriseAgent('custom-http-client')).toBe('unknown');
   });
+
+  test('classifies real User-Agent strings', () => {
+    const cases = [
+      ['Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; GPTBot/1.2; +https://openai.com/gptbot)', 'chatgpt'],
+      ['Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko); compatible; ChatGPT-User/1.0; +https://openai.com/bot', 'chatgpt'],
+      ['Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; ClaudeBot/1.0; +claudebot@anthropic.com)', 'claude'],
+      ['Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; PerplexityBot/1.0; +https://perplexity.ai/perplexitybot)', 'perplexity'],
+      ['Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)', 'googlebot'],
+      ['Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)', 'bingbot'],
+      ['Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) BingPreview/1.0b', 'copilot'],
+      ['Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.1 Safari/605.1.15 (Applebot/0.1; +http://www.apple.com/go/applebot)', 'browser'],
+      ['facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)', 'meta-ai'],
+      ['Mozilla/5.0 (Linux; Android 5.0) AppleWebKit/537.36 (KHTML, like Gecko) Mobile Safari/537.36 (compatible; Bytespider; spider-feedback@bytedance.com)', 'bytespider'],
+      ['Mozilla/5.0 (compatible; YouBot (+http://www.you.com))', 'you'],
+      ['Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; MistralAI-User/1.0; +https://docs.mistral.ai/robots)', 'mistral'],
+      ['Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1', 'browser'],
+      ['Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0', 'browser'],
+      ['python-requests/2.31.0', 'unknown'],
+    ];
+    cases.forEach(([ua, category]) => {
+      expect(categoriseAgent(ua)).toBe(category);
+    });
+  });
+
+  test('earlier rules win however the tokens are ordered in the UA', () => {
+    // "claudebot" contains "bot"; "anthropic" and "openai" appear after other tokens
+    expect(categoriseAgent('crawler ClaudeBot')).toBe('claude');
+    expect(categoriseAgent('Mozilla/5.0 Anthropic OpenAI')).toBe('chatgpt');
+    expect(categoriseAgent('googlebot gemini')).toBe('gemini');
+  });
+});
+
+describe('compileAgentClassifier', () => {
+  const classify = compileAgentClassifier([
+    { category: 'first', tokens: ['abcd'] },
+    { category: 'second', tokens: ['ab', 'bcdx'] },
+    { category: 'third', tokens: ['cd'] },
+  ], 'none');
+
+  test('returns the first rule with a matching token', () => {
+    expect(classify('xx ab cd')).toBe('second');
+    expect(classify('ABCD')).toBe('first');
+    expect(classify('cd')).toBe('third');
+  });
+
+  test('finds tokens that overlap a match of a later rule', () => {
+    // "bcdx" starts inside "ab"
+    expect(classify('abcdx')).toBe('first');
+    expect(classify('abcx bcdx')).toBe('second');
+  });
+
+  test('returns the fallback when nothing matches', () => {
+    expect(classify('zzz')).toBe('none');
+    expect(classify('')).toBe('none');
+    expect(classify(null)).toBe('none');
+  });
+
+  test('escapes RegExp characters in tokens', () => {
+    const dotted = compileAgentClassifier([{ category: 'you', tokens: ['you.com'] }]);
+    expect(dotted('you.com')).toBe('you');
+    expect(dotted('youxcom')).toBe('unknown');
+  });
 });
 
 // ── Book Sales Tests ───────────────────────────────────────────
@@ -2439,12 +2856,12 @@ describe('End-to-End Book Flow', () => {
 // ============================================================
 describe('isAiAgent', () => {
   test('classifies AI categories as AI', () => {
-    ['chatgpt', 'claude', 'perplexity', 'gemini', 'copilot', 'applebot', 'meta-ai', 'bytespider', 'ccbot', 'amazonbot'].forEach((k) => {
+    ['chatgpt', 'claude', 'perplexity', 'gemini', 'copilot', 'applebot', 'meta-ai', 'bytespider', 'ccbot', 'amazonbot', 'you', 'phind', 'mistral'].forEach((k) => {
       expect(isAiAgent(k)).toBe(true);
     });
   });
   test('classifies non-AI categories as not AI', () => {
-    ['browser', 'googlebot', 'bingbot', 'bot', 'unknown'].forEach((k) => {
+    ['browser', 'googlebot', 'bingbot', 'bot', 'unknown', '', undefined].forEach((k) => {
       expect(isAiAgent(k)).toBe(false);
     });
   });
@@ -2498,6 +2915,38 @@ describe('categoriseReferer', () => {
     expect(categoriseReferer('https://m365.cloud.microsoft/chat').agentKey).toBe('copilot');
     expect(categoriseReferer('https://duckduckgo.com/duckai?q=x').agentKey).toBe('duckai');
   });
+
+  test('matches subdomains and ignores lookalike hosts', () => {
+    expect(categoriseReferer('https://EU.Chatgpt.com/').agentKey).toBe('chatgpt');
+    expect(categoriseReferer('https://a.b.x.ai:8443/p').agentKey).toBe('grok');
+    expect(categoriseReferer('https://evil-chatgpt.com/')).toBeNull();
+    expect(categoriseReferer('https://chatgpt.com.evil.com/')).toBeNull();
+    expect(categoriseReferer('https://openai.com/')).toBeNull();
+    expect(categoriseReferer('https://www.bing.com/chatty')).toBeNull();
+  });
+});
+
+describe('compileRefererClassifier', () => {
+  const classify = compileRefererClassifier([
+    { host: 'example.com', path: /^\/ai/, source: 'example.com/ai', agentKey: 'ai' },
+    { host: 'chat.example.com', source: 'chat.example.com', agentKey: 'chat' },
+    { host: 'example.com', source: 'example.com', agentKey: 'plain' },
+  ]);
+
+  test('earlier rules win over more specific hosts', () => {
+    expect(classify('https://chat.example.com/ai/x').agentKey).toBe('ai');
+    expect(classify('https://chat.example.com/other').agentKey).toBe('chat');
+    expect(classify('https://www.example.com/').agentKey).toBe('plain');
+  });
+
+  test('matches the path case-insensitively', () => {
+    expect(classify('https://example.com/AI').agentKey).toBe('ai');
+  });
+
+  test('returns null when no host rule matches', () => {
+    expect(classify('https://example.org/ai')).toBeNull();
+    expect(classify('https://com/')).toBeNull();
+  });
 });
 
 describe('shouldSkipAiCapture', () => {
@@ -2570,6 +3019,507 @@ describe('buildAiVisitRow', () => {
   });
 });
 
+// ─── AI-visit write-behind buffer ──────────────────────────────────────────
+
+import * as aiVisitsDb from './reginald/db/ai-visits.js';
+import { createAiVisitBuffer } from './reginald/lib/ai-visit-buffer.js';
+
+// node:sqlite ships with Node 22.5+; the SQLite-backed tests skip on older runtimes
+const nodeSqlite = await import('node:sqlite').catch(() => null);
+
+/**
+ * D1 stand-in backed by an in-memory SQLite database. Implements the subset
+ * of the D1 API the reginald db modules use: prepare/bind/run/all/first and
+ * an atomic batch. Counts batch round-trips and can fail the next batch.
+ */
+function createSqliteD1(schemaSql) {
+  const database = new nodeSqlite.DatabaseSync(':memory:');
+  database.exec(schemaSql);
+  const statement = (sql, params = []) => ({
+    bind: (...values) => statement(sql, values),
+    run: async () => {
+      const result = database.prepare(sql).run(...params);
+      return { meta: { changes: result.changes, last_row_id: Number(result.lastInsertRowid) } };
+    },
+    all: async () => ({ results: database.prepare(sql).all(...params) }),
+    first: async () => database.prepare(sql).get(...params) ?? null,
+  });
+  const d1 = {
+    batches: 0,
+    failNextBatch: false,
+    prepare: (sql) => statement(sql),
+    async batch(statements) {
+      d1.batches += 1;
+      database.exec('BEGIN');
+      try {
+        if (d1.failNextBatch) {
+          d1.failNextBatch = false;
+          throw new Error('D1_ERROR: simulated outage');
+        }
+        const results = [];
+        for (const stmt of statements) {
+          results.push(await stmt.run()); // eslint-disable-line no-await-in-loop
+        }
+        database.exec('COMMIT');
+        return results;
+      } catch (e) {
+        database.exec('ROLLBACK');
+        throw e;
+      }
+    },
+  };
+  return d1;
+}
+
+const aiVisitRow = (i) => ({
+  ts: 1700000000000 + i,
+  hostname: 'allabout.network',
+  path: `/blogs/post-${i}`,
+  eventType: i % 2 ? 'referral' : 'crawler',
+  agentKey: i % 2 ? 'perplexity' : 'claude',
+  ua: 'ClaudeBot/1.0',
+  referer: null,
+  country: 'GB',
+  status: 200,
+});
+
+// Deferred sleep: the buffer's time threshold fires only when the test says so
+const createManualSleep = () => {
+  const wakers = [];
+  const sleep = vi.fn(() => new Promise((resolve) => { wakers.push(resolve); }));
+  sleep.wake = () => wakers.splice(0).forEach((resolve) => resolve());
+  return sleep;
+};
+
+// Let pending promise callbacks (a rejected write, a spill) run
+const settle = () => new Promise((resolve) => { setTimeout(resolve, 0); });
+
+describe('createAiVisitBuffer', () => {
+  test('flushes one batch when the size threshold is reached', async () => {
+    const write = vi.fn(async () => {});
+    const buffer = createAiVisitBuffer({ maxBatchRows: 5, write, sleep: createManualSleep() });
+    const pushes = [0, 1, 2, 3, 4].map((i) => buffer.push('db', aiVisitRow(i)));
+    await pushes[4];
+
+    expect(write.mock.calls).toHaveLength(1);
+    expect(write.mock.calls[0][1]).toHaveLength(5);
+    expect(buffer.stats()).toEqual({
+      buffered: 0, flushed: 5, dropped: 0, flushes: 1, failedFlushes: 0,
+    });
+  });
+
+  test('flushes a partial batch when the first row ages out', async () => {
+    const write = vi.fn(async () => {});
+    const sleep = createManualSleep();
+    const buffer = createAiVisitBuffer({ maxBatchRows: 50, write, sleep });
+    const first = buffer.push('db', aiVisitRow(0));
+    await buffer.push('db', aiVisitRow(1));
+    expect(write.mock.calls).toHaveLength(0);
+    expect(buffer.stats().buffered).toBe(2);
+
+    sleep.wake();
+    expect(await first).toBe(2);
+    expect(write.mock.calls).toHaveLength(1);
+  });
+
+  test('spills rows back after a failed flush and writes them next time', async () => {
+    const write = vi.fn()
+      .mockImplementationOnce(async () => { throw new Error('D1 unavailable'); })
+      .mockImplementation(async () => {});
+    const buffer = createAiVisitBuffer({ maxBatchRows: 2, write, sleep: createManualSleep() });
+    buffer.push('db', aiVisitRow(0));
+    expect(await buffer.push('db', aiVisitRow(1))).toBe(0);
+    expect(buffer.stats()).toMatchObject({ buffered: 2, failedFlushes: 1, flushed: 0 });
+
+    expect(await buffer.flush('db')).toBe(2);
+    expect(write.mock.calls[1][1].map((r) => r.path)).toEqual(['/blogs/post-0', '/blogs/post-1']);
+    expect(buffer.stats()).toMatchObject({ buffered: 0, flushed: 2, dropped: 0 });
+  });
+
+  test('re-arms the deadline with backoff after a failed flush', async () => {
+    const write = vi.fn()
+      .mockImplementationOnce(async () => { throw new Error('D1 unavailable'); })
+      .mockImplementation(async () => {});
+    const sleep = createManualSleep();
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 50, maxAgeMs: 5000, write, sleep,
+    });
+    const first = buffer.push('db', aiVisitRow(0));
+
+    sleep.wake();
+    await settle();
+    expect(buffer.stats()).toMatchObject({ buffered: 1, failedFlushes: 1 });
+    expect(sleep.mock.calls.map(([ms]) => ms)).toEqual([5000, 10000]);
+
+    // The retry runs without another push and settles the original promise
+    sleep.wake();
+    expect(await first).toBe(1);
+    expect(buffer.stats()).toMatchObject({ buffered: 0, flushed: 1 });
+  });
+
+  test('caps the retry backoff and resets it after a successful flush', async () => {
+    const write = vi.fn()
+      .mockImplementationOnce(async () => { throw new Error('D1 unavailable'); })
+      .mockImplementationOnce(async () => { throw new Error('D1 unavailable'); })
+      .mockImplementationOnce(async () => { throw new Error('D1 unavailable'); })
+      .mockImplementation(async () => {});
+    const sleep = createManualSleep();
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 50, maxAgeMs: 5000, maxRetryDelayMs: 12000, write, sleep,
+    });
+    const first = buffer.push('db', aiVisitRow(0));
+    for (let i = 0; i < 4; i += 1) {
+      sleep.wake();
+      await settle(); // eslint-disable-line no-await-in-loop
+    }
+    expect(await first).toBe(1);
+    expect(sleep.mock.calls.map(([ms]) => ms)).toEqual([5000, 10000, 12000, 12000]);
+
+    buffer.push('db', aiVisitRow(1));
+    expect(sleep.mock.calls.at(-1)[0]).toBe(5000);
+  });
+
+  test('re-arms a deadline whose promise never settled', async () => {
+    let clock = 0;
+    const sleep = createManualSleep();
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 50, maxAgeMs: 5000, sleep, now: () => clock,
+    });
+    buffer.push('db', aiVisitRow(0));
+    buffer.push('db', aiVisitRow(1));
+    expect(sleep).toHaveBeenCalledTimes(1);
+
+    // The runtime cancelled the waitUntil holding the first deadline
+    clock = 20000;
+    buffer.push('db', aiVisitRow(2));
+    expect(sleep).toHaveBeenCalledTimes(2);
+  });
+
+  test('drops the oldest rows beyond the buffer cap while D1 is down', async () => {
+    const write = vi.fn(async () => { throw new Error('D1 unavailable'); });
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 10, maxBufferedRows: 3, write, sleep: createManualSleep(),
+    });
+    for (let i = 0; i < 6; i += 1) buffer.push('db', aiVisitRow(i));
+    expect(await buffer.flush('db')).toBe(0);
+
+    const stats = buffer.stats();
+    expect(stats).toMatchObject({
+      buffered: 3, dropped: 3, flushed: 0, failedFlushes: 1,
+    });
+    expect(write.mock.calls[0][1].map((r) => r.path)).toEqual(['/blogs/post-3', '/blogs/post-4', '/blogs/post-5']);
+  });
+
+  test('logs every dropped row', async () => {
+    const warnSpy = vi.spyOn(console, 'warn').mockImplementation(() => {});
+    const errorSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
+    const write = vi.fn(async () => { throw new Error('D1 unavailable'); });
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 10, maxBufferedRows: 2, write, sleep: createManualSleep(),
+    });
+    for (let i = 0; i < 3; i += 1) buffer.push('db', aiVisitRow(i));
+    expect(warnSpy).toHaveBeenCalledTimes(1);
+    expect(warnSpy.mock.calls[0][0]).toContain('1 dropped');
+
+    // Rows arriving during a failed flush overflow when the batch spills back
+    const flushing = buffer.flush('db');
+    buffer.push('db', aiVisitRow(3));
+    await flushing;
+    expect(errorSpy.mock.calls.at(-1)[0]).toContain('2 buffered, 1 dropped');
+    expect(buffer.stats().dropped).toBe(2);
+    warnSpy.mockRestore();
+    errorSpy.mockRestore();
+  });
+
+  test('logs the counters after a flush, at most once per interval', async () => {
+    const logSpy = vi.spyOn(console, 'log').mockImplementation(() => {});
+    let clock = 0;
+    const buffer = createAiVisitBuffer({
+      maxBatchRows: 1, statsIntervalMs: 60000, write: async () => {}, sleep: createManualSleep(), now: () => clock,
+    });
+    await buffer.push('db', aiVisitRow(0));
+    await buffer.push('db', aiVisitRow(1));
+    expect(logSpy).toHaveBeenCalledTimes(1);
+    expect(logSpy.mock.calls[0][0]).toEqual({
+      message: 'AI visits: buffer stats', buffered: 0, flushed: 1, dropped: 0, flushes: 1, failedFlushes: 0,
+    });
+
+    clock = 60000;
+    await buffer.push('db', aiVisitRow(2));
+    expect(logSpy).toHaveBeenCalledTimes(2);
+    expect(logSpy.mock.calls[1][0]).toMatchObject({ flushed: 3, flushes: 3 });
+    logSpy.mockRestore();
+  });
+});
+
+describe.skipIf(!nodeSqlite)('AI visits batched ingestion (SQLite-backed D1)', () => {
+  const schema = readFileSync(new URL('./reginald/db/migration-005-ai-visits.sql', import.meta.url), 'utf8');
+
+  test('insertMany writes every row in a single batch round-trip', async () => {
+    const db = createSqliteD1(schema);
+    const rows = Array.from({ length: 23 }, (_, i) => aiVisitRow(i));
+    await aiVisitsDb.insertMany(db, rows);
+
+    expect(db.batches).toBe(1);
+    const totals = await aiVisitsDb.totals(db, { hostname: 'allabout.network', since: 0 });
+    expect(totals).toEqual({ crawler: 12, referral: 11, total: 23 });
+  });
+
+  test('buffer turns a crawler burst into a handful of batches', async () => {
+    const db = createSqliteD1(schema);
+    const buffer = createAiVisitBuffer({ maxBatchRows: 50, sleep: createManualSleep() });
+    const pushes = Array.from({ length: 500 }, (_, i) => buffer.push(db, aiVisitRow(i)));
+    await Promise.all(pushes.filter((_, i) => (i + 1) % 50 === 0));
+
+    // Rows that arrive while a flush is in flight join the next batch, so a
+    // burst needs at most one batch per maxBatchRows rows — never one per row
+    expect(db.batches).toBeLessThanOrEqual(10);
+    const { results } = await db.prepare('SELECT COUNT(*) AS n FROM ai_visits').all();
+    expect(results[0].n).toBe(500);
+    expect(buffer.stats()).toMatchObject({ buffered: 0, flushed: 500, dropped: 0 });
+  });
+
+  test('a failed batch writes nothing and the retry writes every row once', async () => {
+    const db = createSqliteD1(schema);
+    const buffer = createAiVisitBuffer({ maxBatchRows: 25, sleep: createManualSleep() });
+    db.failNextBatch = true;
+    const pushes = Array.from({ length: 25 }, (_, i) => buffer.push(db, aiVisitRow(i)));
+    await pushes[24];
+
+    let { results } = await db.prepare('SELECT COUNT(*) AS n FROM ai_visits').all();
+    expect(results[0].n).toBe(0);
+    expect(buffer.stats()).toMatchObject({ buffered: 25, failedFlushes: 1 });
+
+    await buffer.flush(db);
+    ({ results } = await db.prepare('SELECT COUNT(*) AS n FROM ai_visits').all());
+    expect(results[0].n).toBe(25);
+  });
+});
+
+// ============================================================
+// Aliveness scheduler Tests (SQLite-backed D1, simulated publishers)
+// ============================================================
+import { createHash } from 'crypto';
+import * as alivenessDb from './reginald/db/aliveness.js';
+import { runAlivenessChecks, WORST_CASE_SUBREQUESTS_PER_COG } from './reginald/lib/aliveness.js';
+
+const ALIVENESS_ENV = { MX_OUTPUTS_HOSTNAME: 'registry.test', MX_OUTPUTS_REPO_PATH: '/repo' };
+// Integration tests above replace and delete global.Response; keep the real one
+const NativeResponse = globalThis.Response;
+const sha256 = (text) => `sha256:${createHash('sha256').update(text).digest('hex')}`;
+
+/**
+ * Registry and publisher servers behind a fetch function. Each COG is
+ * served from its publisher host with an ETag and honours If-None-Match.
+ * Records per-host request times and the peak number of open requests.
+ */
+const createCogWeb = (cogs, { latencyMs = 0 } = {}) => {
+  const byName = new Map(cogs.map((cog) => [cog.name, cog]));
+  const web = { requests: [], hostTimes: new Map(), active: 0, maxActive: 0 };
+  const reply = async (response) => {
+    web.active += 1;
+    web.maxActive = Math.max(web.maxActive, web.active);
+    if (latencyMs) await new Promise((resolve) => { setTimeout(resolve, latencyMs); });
+    web.active -= 1;
+    return response;
+  };
+  web.fetch = vi.fn(async (input, init = {}) => {
+    const url = new URL(input);
+    web.requests.push({ url: url.href, method: init.method || 'GET', headers: init.headers || {} });
+    if (url.host === 'registry.test') {
+      if (url.pathname === '/repo/reginald/api/v1/index.json') {
+        return reply(NativeResponse.json({ cogs: cogs.map(({ namespace, name }) => ({ namespace, name })) }));
+      }
+      const [, ns, name] = url.pathname.match(/^\/repo\/reginald\/cogs\/([^/]+)\/([^/]+)\/latest\.json$/) || [];
+      const cog = byName.get(name);
+      if (!cog || cog.namespace !== ns || cog.latestStatus) return reply(new NativeResponse('missing', { status: cog?.latestStatus || 404 }));
+      return reply(NativeResponse.json({
+        canonical_url: `https://${cog.host}/${cog.name}.html`,
+        content_hash: 'expectedHash' in cog ? cog.expectedHash : sha256(cog.body),
+      }));
+    }
+    if (!web.hostTimes.has(url.host)) web.hostTimes.set(url.host, []);
+    web.hostTimes.get(url.host).push(Date.now());
+    const cog = byName.get(url.pathname.slice(1).replace(/\.html$/, ''));
+    if (cog.status) return reply(new NativeResponse('down', { status: cog.status }));
+    const etag = `"${sha256(cog.body).slice(7, 23)}"`;
+    if (init.headers?.['If-None-Match'] === etag) return reply(new NativeResponse(null, { status: 304 }));
+    return reply(new NativeResponse(init.method === 'HEAD' ? null : cog.body, { headers: { ETag: etag } }));
+  });
+  return web;
+};
+
+const createCogs = (count, hosts = 3) => Array.from({ length: count }, (_, i) => ({
+  namespace: `pub-${i % hosts}`,
+  name: `cog-${String(i).padStart(3, '0')}`,
+  host: `publisher-${i % hosts}.test`,
+  body: `<html><body>COG ${i}</body></html>`,
+}));
+
+describe.skipIf(!nodeSqlite)('Aliveness scheduler (SQLite-backed D1)', () => {
+  const schema = ['schema.sql', 'migration-002-aliveness.sql', 'migration-008-aliveness-scheduler.sql']
+    .map((file) => readFileSync(new URL(`./reginald/db/${file}`, import.meta.url), 'utf8'))
+    .join('\n');
+  const noSleep = () => Promise.resolve();
+  const count = async (db, sql) => (await db.prepare(sql).first()).n;
+
+  test('checks COGs concurrently within the global and per-host limits', async () => {
+    const db = createSqliteD1(schema);
+    const web = createCogWeb(createCogs(12), { latencyMs: 10 });
+    const summary = await runAlivenessChecks({ ...ALIVENESS_ENV, DB: db }, {
+      fetch: web.fetch, concurrency: 3, hostIntervalMs: 40,
+    });
+
+    expect(summary).toMatchObject({ complete: true, checked: 12, passed: 12, failed: 0 });
+    expect(web.maxActive).toBeGreaterThan(1);
+    expect(web.maxActive).toBeLessThanOrEqual(3);
+    for (const times of web.hostTimes.values()) {
+      for (let i = 1; i < times.length; i += 1) {
+        expect(times[i] - times[i - 1]).toBeGreaterThanOrEqual(35);
+      }
+    }
+    expect(await count(db, 'SELECT COUNT(*) AS n FROM aliveness_checks WHERE hash_match = 1 AND http_status = 200')).toBe(12);
+    expect(await count(db, "SELECT COUNT(*) AS n FROM audit_log WHERE action = 'aliveness_run'")).toBe(1);
+  });
+
+  test('writes results and run progress in one db.batch per commit', async () => {
+    const db = createSqliteD1(schema);
+    const web = createCogWeb(createCogs(12));
+    await runAlivenessChecks({ ...ALIVENESS_ENV, DB: db }, {
+      fetch: web.fetch, hostIntervalMs: 0, commitEvery: 5,
+    });
+
+    expect(db.batches).toBe(3);
+    const run = await alivenessDb.findOpenRun(db);
+    expect(run).toBeNull();
+    const last = await db.prepare('SELECT * FROM aliveness_runs ORDER BY id DESC LIMIT 1').first();
+    expect(last).toMatchObject({ status: 'completed', total: 12, passed: 12 });
+  });
+
+  test('sends conditional requests and reuses the stored hash on 304', async () => {
+    const db = createSqliteD1(schema);
+    const cogs = createCogs(6);
+    const web = createCogWeb(cogs);
+    const env = { ...ALIVENESS_ENV, DB: db };
+    await runAlivenessChecks(env, { fetch: web.fetch, hostIntervalMs: 0 });
+
+    cogs[0].body = '<html><body>Edited</body></html>';
+    web.requests.length = 0;
+    const summary = await runAlivenessChecks(env, { fetch: web.fetch, hostIntervalMs: 0 });
+
+    const canonical = web.requests.filter((r) => r.url.includes('publisher-'));
+    expect(canonical.every((r) => r.headers['If-None-Match'])).toBe(true);
+    expect(summary).toMatchObject({ complete: true, passed: 6, not_modified: 5 });
+    expect(await count(db, 'SELECT COUNT(*) AS n FROM aliveness_checks WHERE http_status = 304 AND hash_match = 1')).toBe(5);
+    const edited = await db.prepare(
+      "SELECT content_hash FROM aliveness_validators WHERE cog_name = 'cog-000'",
+    ).first();
+    expect(edited.content_hash).toBe(sha256(cogs[0].body));
+  });
+
+  test('records hash mismatches and failures with batched failure counts', async () => {
+    const db = createSqliteD1(schema);
+    const cogs = createCogs(4);
+    cogs[0].expectedHash = sha256('something else');
+    cogs[1].status = 500;
+    cogs[2].latestStatus = 404;
+    const web = createCogWeb(cogs);
+    const summary = await runAlivenessChecks({ ...ALIVENESS_ENV, DB: db }, {
+      fetch: web.fetch, hostIntervalMs: 0, sleep: noSleep,
+    });
+
+    expect(summary).toMatchObject({ passed: 2, failed: 2 });
+    const checks = (await db.prepare('SELECT * FROM aliveness_checks ORDER BY cog_name').all()).results;
+    expect(checks[0]).toMatchObject({ http_status: 200, hash_match: 0 });
+    expect(checks[1]).toMatchObject({ http_status: 500, error_message: 'HTTP 500' });
+    expect(checks[2].error_message).toBe('latest.json HTTP 404');
+    expect(web.requests.filter((r) => r.url.endsWith('cog-001.html'))).toHaveLength(3);
+    const failures = await alivenessDb.findFailuresByNamespace(db, 'pub-1');
+    expect(failures[0]).toMatchObject({ cog_name: 'cog-001', consecutive_failures: 1 });
+  });
+
+  test('budgets each COG at the most subrequests a check can make', async () => {
+    const db = createSqliteD1(schema);
+    // No content hash means HEAD checks, and a failing HEAD on the last
+    // attempt falls back to GET: the longest fetch sequence for one COG
+    const cogs = createCogs(1);
+    cogs[0].expectedHash = null;
+    cogs[0].status = 503;
+    const web = createCogWeb(cogs);
+    await runAlivenessChecks({ ...ALIVENESS_ENV, DB: db }, {
+      fetch: web.fetch, hostIntervalMs: 0, sleep: noSleep,
+    });
+
+    const perCog = web.requests.filter((r) => !r.url.endsWith('/index.json'));
+    expect(perCog.map((r) => r.method)).toEqual(['GET', 'HEAD', 'HEAD', 'HEAD', 'GET']);
+    expect(WORST_CASE_SUBREQUESTS_PER_COG).toBe(perCog.length);
+  });
+
+  test('resumes a partial run, skipping COGs already checked', async () => {
+    const db = createSqliteD1(schema);
+    const web = createCogWeb(createCogs(20));
+    const env = { ...ALIVENESS_ENV, DB: db };
+    const options = { fetch: web.fetch, hostIntervalMs: 0, commitEvery: 4 };
+
+    const first = await runAlivenessChecks(env, { ...options, maxSubrequests: 30 });
+    expect(first.complete).toBe(false);
+    expect(first.remaining).toBeGreaterThan(0);
+    const open = await alivenessDb.findOpenRun(db);
+    expect(open.lease_until).toBeNull();
+    expect(open.passed).toBe(first.checked);
+
+    let resumed;
+    do {
+      resumed = await runAlivenessChecks(env, { ...options, resume: true, maxSubrequests: 30 });
+    } while (!resumed.complete);
+
+    expect(await count(db, 'SELECT COUNT(*) AS n FROM aliveness_checks')).toBe(20);
+    expect(await count(db, 'SELECT COUNT(DISTINCT cog_name) AS n FROM aliveness_checks')).toBe(20);
+    const audit = await db.prepare("SELECT detail FROM audit_log WHERE action = 'aliveness_run'").all();
+    expect(audit.results).toHaveLength(1);
+    expect(JSON.parse(audit.results[0].detail)).toMatchObject({ total: 20, passed: 20 });
+    expect(await runAlivenessChecks(env, { ...options, resume: true })).toBeNull();
+  });
+
+  test('leaves a leased run alone and re-checks a batch whose commit failed', async () => {
+    const db = createSqliteD1(schema);
+    const web = createCogWeb(createCogs(8));
+    const env = { ...ALIVENESS_ENV, DB: db };
+
+    await alivenessDb.startRun(db, Date.now() + 60000);
+    expect(await runAlivenessChecks(env, { fetch: web.fetch, resume: true })).toBeNull();
+    expect(web.fetch).not.toHaveBeenCalled();
+
+    db.failNextBatch = true;
+    const failed = await runAlivenessChecks(env, { fetch: web.fetch, hostIntervalMs: 0, commitEvery: 4 });
+    expect(failed).toMatchObject({ complete: false, checked: 0 });
+    expect(await count(db, 'SELECT COUNT(*) AS n FROM aliveness_checks')).toBe(0);
+    expect(await count(db, "SELECT COUNT(*) AS n FROM aliveness_runs WHERE status = 'abandoned'")).toBe(1);
+
+    const resumed = await runAlivenessChecks(env, { fetch: web.fetch, hostIntervalMs: 0, resume: true });
+    expect(resumed).toMatchObject({ complete: true, checked: 8 });
+    expect(await count(db, 'SELECT COUNT(*) AS n FROM aliveness_checks')).toBe(8);
+  });
+});
+
+describe('scheduled hourly cron', () => {
+  test('resumes aliveness checks even when the GA4 connector throws', async () => {
+    const queries = [];
+    const DB = {
+      prepare: vi.fn((sql) => {
+        queries.push(sql);
+        throw new Error('D1 unavailable');
+      }),
+    };
+    const errorSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
+    await worker.scheduled({ cron: '5 * * * *' }, { ...ALIVENESS_ENV, DB }, {});
+    errorSpy.mockRestore();
+
+    expect(queries.some((sql) => sql.includes('ga4_connectors'))).toBe(true);
+    expect(queries.some((sql) => sql.includes('aliveness_runs'))).toBe(true);
+  });
+});
+
 describe('isAttributionHost', () => {
   test('matches operated domains and subdomains', () => {
     expect(isAttributionHost('allabout.network')).toBe(true);
@@ -1,9 +1,10 @@
 /**
  * AI traffic attribution — D1 operations.
  *
- * Writes come from the worker's request hot-path via ctx.waitUntil — the insert
- * is fire-and-forget so a D1 slowdown never delays a response. Reads come from
- * the /api/v1/ai-attribution endpoint.
+ * Writes come from the worker's request hot-path via ctx.waitUntil — rows are
+ * collected by the write-behind buffer in reginald/lib/ai-visit-buffer.js and
+ * flushed with insertMany, so a D1 slowdown never delays a response. Reads
+ * come from the /api/v1/ai-attribution endpoint.
  *
  * @file reginald/db/ai-visits.js
  * @author Tom Cranstoun
@@ -12,18 +13,19 @@
  * @mx:tags db, ai-attribution, analytics
  */
 
+const INSERT_COLUMNS = '(ts, hostname, path, event_type, agent_key, ua, referer, country, status, backfilled)';
+const ROW_PLACEHOLDERS = '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)';
+
+// D1 allows at most 100 bound parameters per statement; each row binds 10.
+const MAX_ROWS_PER_INSERT = 10;
+
 /**
- * Insert a single AI visit row.
- * @param {D1Database} db
- * @param {object} row - { ts, hostname, path, eventType, agentKey, ua, referer, country, status, backfilled }
- * @returns {Promise<void>}
+ * Bind values for one ai_visits row, in INSERT_COLUMNS order.
+ * @param {object} row
+ * @returns {Array}
  */
-export async function insert(db, row) {
-    await db.prepare(
-        `INSERT INTO ai_visits
-         (ts, hostname, path, event_type, agent_key, ua, referer, country, status, backfilled)
-         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)`
-    ).bind(
+function rowValues(row) {
+    return [
         row.ts,
         row.hostname,
         row.path,
@@ -34,7 +36,40 @@ export async function insert(db, row) {
         row.country || null,
         row.status != null ? row.status : null,
         row.backfilled ? 1 : 0,
-    ).run();
+    ];
+}
+
+/**
+ * Insert a single AI visit row.
+ * @param {D1Database} db
+ * @param {object} row - { ts, hostname, path, eventType, agentKey, ua, referer, country, status, backfilled }
+ * @returns {Promise<void>}
+ */
+export async function insert(db, row) {
+    await db.prepare(
+        `INSERT INTO ai_visits ${INSERT_COLUMNS} VALUES ${ROW_PLACEHOLDERS}`
+    ).bind(...rowValues(row)).run();
+}
+
+/**
+ * Insert many AI visit rows in one round-trip.
+ * Rows are packed into multi-row INSERTs (up to MAX_ROWS_PER_INSERT each)
+ * and sent as a single db.batch, which D1 runs as one transaction — a
+ * failure writes nothing, so the caller can safely retry the whole set.
+ * @param {D1Database} db
+ * @param {Array<object>} rows - same shape as insert()
+ * @returns {Promise<void>}
+ */
+export async function insertMany(db, rows) {
+    if (!rows.length) return;
+    const statements = [];
+    for (let i = 0; i < rows.length; i += MAX_ROWS_PER_INSERT) {
+        const chunk = rows.slice(i, i + MAX_ROWS_PER_INSERT);
+        statements.push(db.prepare(
+            `INSERT INTO ai_visits ${INSERT_COLUMNS} VALUES ${chunk.map(() => ROW_PLACEHOLDERS).join(', ')}`
+        ).bind(...chunk.flatMap(rowValues)));
+    }
+    await db.batch(statements);
 }
 
 /**
@@ -1,5 +1,8 @@
 /**
  * Aliveness check database operations.
+ * Per-COG writes come in two forms: a *Statement builder for db.batch and
+ * an awaitable wrapper for single writes. A 304 (unchanged since the last
+ * full fetch) counts as a pass.
  *
  * @mx:status active
  * @mx:contentType script
@@ -7,13 +10,14 @@
  */
 
 /**
- * Record an aliveness check result.
+ * Build the statement that records an aliveness check result.
+ * Use with db.batch, or via recordCheck for a single write.
  * @param {D1Database} db
  * @param {object} data
- * @returns {Promise<void>}
+ * @returns {D1PreparedStatement}
  */
-export async function recordCheck(db, data) {
-    await db.prepare(
+export function recordCheckStatement(db, data) {
+    return db.prepare(
         `INSERT INTO aliveness_checks
          (publisher_id, cog_namespace, cog_name, canonical_url, http_status, response_time_ms, hash_match, error_message)
          VALUES (?, ?, ?, ?, ?, ?, ?, ?)`
@@ -26,21 +30,31 @@ export async function recordCheck(db, data) {
         data.response_time_ms || null,
         data.hash_match !== undefined ? (data.hash_match ? 1 : 0) : null,
         data.error_message || null
-    ).run();
+    );
 }
 
 /**
- * Increment consecutive failure count for a COG.
+ * Record an aliveness check result.
+ * @param {D1Database} db
+ * @param {object} data
+ * @returns {Promise<void>}
+ */
+export async function recordCheck(db, data) {
+    await recordCheckStatement(db, data).run();
+}
+
+/**
+ * Build the statement that increments the consecutive failure count for a COG.
  * Auto-hides from resolution after 3 consecutive failures.
  * @param {D1Database} db
  * @param {string} namespace
  * @param {string} name
  * @param {string} errorMessage
- * @returns {Promise<void>}
+ * @returns {D1PreparedStatement}
  */
-export async function incrementFailure(db, namespace, name, errorMessage) {
+export function incrementFailureStatement(db, namespace, name, errorMessage) {
     // Upsert failure record
-    await db.prepare(
+    return db.prepare(
         `INSERT INTO aliveness_failures (cog_namespace, cog_name, consecutive_failures, last_failure_at, last_error)
          VALUES (?, ?, 1, datetime('now'), ?)
          ON CONFLICT(cog_namespace, cog_name)
@@ -49,22 +63,182 @@ export async function incrementFailure(db, namespace, name, errorMessage) {
            last_failure_at = datetime('now'),
            last_error = ?,
            hidden_from_resolution = CASE WHEN consecutive_failures + 1 >= 3 THEN 1 ELSE hidden_from_resolution END`
-    ).bind(namespace, name, errorMessage, errorMessage).run();
+    ).bind(namespace, name, errorMessage, errorMessage);
 }
 
 /**
- * Reset failure count on successful check.
+ * Increment consecutive failure count for a COG.
+ * Auto-hides from resolution after 3 consecutive failures.
  * @param {D1Database} db
  * @param {string} namespace
  * @param {string} name
+ * @param {string} errorMessage
  * @returns {Promise<void>}
  */
-export async function resetFailure(db, namespace, name) {
-    await db.prepare(
+export async function incrementFailure(db, namespace, name, errorMessage) {
+    await incrementFailureStatement(db, namespace, name, errorMessage).run();
+}
+
+/**
+ * Build the statement that resets the failure count on a successful check.
+ * @param {D1Database} db
+ * @param {string} namespace
+ * @param {string} name
+ * @returns {D1PreparedStatement}
+ */
+export function resetFailureStatement(db, namespace, name) {
+    return db.prepare(
         `UPDATE aliveness_failures
          SET consecutive_failures = 0, hidden_from_resolution = 0
          WHERE cog_namespace = ? AND cog_name = ?`
-    ).bind(namespace, name).run();
+    ).bind(namespace, name);
+}
+
+/**
+ * Reset failure count on successful check.
+ * @param {D1Database} db
+ * @param {string} namespace
+ * @param {string} name
+ * @returns {Promise<void>}
+ */
+export async function resetFailure(db, namespace, name) {
+    await resetFailureStatement(db, namespace, name).run();
+}
+
+/**
+ * Load the stored HTTP validators for every COG, keyed "namespace/name".
+ * @param {D1Database} db
+ * @returns {Promise<Map<string, object>>}
+ */
+export async function findValidators(db) {
+    const result = await db.prepare(
+        'SELECT cog_namespace, cog_name, canonical_url, etag, last_modified, content_hash FROM aliveness_validators'
+    ).all();
+    return new Map(result.results.map(v => [`${v.cog_namespace}/${v.cog_name}`, v]));
+}
+
+/**
+ * Build the statement that stores a COG's validators after a full fetch.
+ * @param {D1Database} db
+ * @param {object} data - cog_namespace, cog_name, canonical_url, etag, last_modified, content_hash
+ * @returns {D1PreparedStatement}
+ */
+export function saveValidatorsStatement(db, data) {
+    return db.prepare(
+        `INSERT INTO aliveness_validators (cog_namespace, cog_name, canonical_url, etag, last_modified, content_hash)
+         VALUES (?, ?, ?, ?, ?, ?)
+         ON CONFLICT(cog_namespace, cog_name)
+         DO UPDATE SET
+           canonical_url = excluded.canonical_url,
+           etag = excluded.etag,
+           last_modified = excluded.last_modified,
+           content_hash = excluded.content_hash,
+           updated_at = datetime('now')`
+    ).bind(
+        data.cog_namespace,
+        data.cog_name,
+        data.canonical_url,
+        data.etag || null,
+        data.last_modified || null,
+        data.content_hash || null
+    );
+}
+
+/**
+ * Start a new aliveness run, abandoning any run still in progress.
+ * The new run is leased to the calling invocation.
+ * @param {D1Database} db
+ * @param {number} leaseUntil - epoch ms
+ * @returns {Promise<object>} the new aliveness_runs row
+ */
+export async function startRun(db, leaseUntil) {
+    await db.prepare(
+        `UPDATE aliveness_runs SET status = 'abandoned', lease_until = NULL WHERE status = 'running'`
+    ).run();
+    return db.prepare(
+        `INSERT INTO aliveness_runs (invocations, lease_until) VALUES (1, ?) RETURNING *`
+    ).bind(leaseUntil).first();
+}
+
+/**
+ * Find the run in progress, if any.
+ * @param {D1Database} db
+ * @returns {Promise<object|null>}
+ */
+export async function findOpenRun(db) {
+    return db.prepare(
+        `SELECT * FROM aliveness_runs WHERE status = 'running' ORDER BY id DESC LIMIT 1`
+    ).first();
+}
+
+/**
+ * Take the lease on a run unless another invocation holds an unexpired one.
+ * @param {D1Database} db
+ * @param {number} runId
+ * @param {number} now - epoch ms
+ * @param {number} leaseUntil - epoch ms
+ * @returns {Promise<boolean>} true if this invocation now holds the lease
+ */
+export async function claimRun(db, runId, now, leaseUntil) {
+    const result = await db.prepare(
+        `UPDATE aliveness_runs
+         SET lease_until = ?, invocations = invocations + 1
+         WHERE id = ? AND status = 'running' AND (lease_until IS NULL OR lease_until < ?)`
+    ).bind(leaseUntil, runId, now).run();
+    return result.meta.changes === 1;
+}
+
+/**
+ * Build the statement that adds a batch of results to a run's totals.
+ * Batched with the check results it covers, so progress and results land together.
+ * @param {D1Database} db
+ * @param {number} runId
+ * @param {object} progress - total, and passed/failed/not_modified deltas
+ * @returns {D1PreparedStatement}
+ */
+export function recordRunProgressStatement(db, runId, progress) {
+    return db.prepare(
+        `UPDATE aliveness_runs
+         SET total = ?, passed = passed + ?, failed = failed + ?, not_modified = not_modified + ?
+         WHERE id = ?`
+    ).bind(progress.total, progress.passed, progress.failed, progress.not_modified, runId);
+}
+
+/**
+ * COGs that already have a check recorded since a run started, keyed "namespace/name".
+ * @param {D1Database} db
+ * @param {string} since - run started_at (D1 datetime)
+ * @returns {Promise<Set<string>>}
+ */
+export async function findCheckedCogs(db, since) {
+    const result = await db.prepare(
+        'SELECT DISTINCT cog_namespace, cog_name FROM aliveness_checks WHERE checked_at >= ?'
+    ).bind(since).all();
+    return new Set(result.results.map(c => `${c.cog_namespace}/${c.cog_name}`));
+}
+
+/**
+ * Release this invocation's lease so the next cron can resume the run.
+ * @param {D1Database} db
+ * @param {number} runId
+ * @returns {Promise<void>}
+ */
+export async function releaseRun(db, runId) {
+    await db.prepare('UPDATE aliveness_runs SET lease_until = NULL WHERE id = ?').bind(runId).run();
+}
+
+/**
+ * Mark a run completed.
+ * @param {D1Database} db
+ * @param {number} runId
+ * @returns {Promise<object>} the final aliveness_runs row
+ */
+export async function completeRun(db, runId) {
+    return db.prepare(
+        `UPDATE aliveness_runs
+         SET status = 'completed', completed_at = datetime('now'), lease_until = NULL
+         WHERE id = ? RETURNING *`
+    ).bind(runId).first();
 }
 
 /**
@@ -104,8 +278,8 @@ export async function getSummary(db, namespace) {
     const checks = await db.prepare(
         `SELECT
            COUNT(*) as total_checks,
-           SUM(CASE WHEN http_status = 200 THEN 1 ELSE 0 END) as passed,
-           SUM(CASE WHEN http_status != 200 OR http_status IS NULL THEN 1 ELSE 0 END) as failed,
+           SUM(CASE WHEN http_status IN (200, 304) THEN 1 ELSE 0 END) as passed,
+           SUM(CASE WHEN http_status NOT IN (200, 304) OR http_status IS NULL THEN 1 ELSE 0 END) as failed,
            SUM(CASE WHEN hash_match = 0 THEN 1 ELSE 0 END) as hash_mismatches,
            AVG(response_time_ms) as avg_response_time
          FROM aliveness_checks
@@ -0,0 +1,40 @@
+-- Migration 008: resumable, conditional aliveness runs
+-- aliveness_runs tracks one registry-wide run across cron invocations.
+-- An invocation stops when its time or subrequest budget is spent and the
+-- hourly cron picks the run up again, skipping COGs that already have an
+-- aliveness_checks row since the run's started_at. `lease_until` (epoch ms)
+-- stops two invocations working the same run.
+--
+-- aliveness_validators keeps the ETag / Last-Modified and content hash
+-- from each COG's last full fetch, so the next run can send a
+-- conditional GET and skip re-hashing content that has not changed.
+--
+-- Apply with:
+--   cd allaboutv2/cloudflare/files
+--   npx wrangler d1 execute reginald-auth --remote --file=reginald/db/migration-008-aliveness-scheduler.sql
+
+CREATE TABLE IF NOT EXISTS aliveness_runs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    status        TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'abandoned')),
+    total         INTEGER NOT NULL DEFAULT 0,
+    passed        INTEGER NOT NULL DEFAULT 0,
+    failed        INTEGER NOT NULL DEFAULT 0,
+    not_modified  INTEGER NOT NULL DEFAULT 0,
+    invocations   INTEGER NOT NULL DEFAULT 0,
+    lease_until   INTEGER,
+    started_at    TEXT NOT NULL DEFAULT (datetime('now')),
+    completed_at  TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_aliveness_runs_status ON aliveness_runs(status);
+
+CREATE TABLE IF NOT EXISTS aliveness_validators (
+    cog_namespace  TEXT NOT NULL,
+    cog_name       TEXT NOT NULL,
+    canonical_url  TEXT NOT NULL,
+    etag           TEXT,
+    last_modified  TEXT,
+    content_hash   TEXT,
+    updated_at     TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (cog_namespace, cog_name)
+);
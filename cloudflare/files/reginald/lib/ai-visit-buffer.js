@@ -0,0 +1,211 @@
+/**
+ * Write-behind buffer for AI-visit capture.
+ *
+ * The worker captures a row for every AI crawler or AI-referred GET on an
+ * attribution host. Writing each one with its own INSERT turns a crawler
+ * burst into thousands of tiny D1 round-trips, so rows are collected per
+ * isolate and flushed with aiVisitsDb.insertMany when either threshold is hit:
+ *   - size: the buffer holds maxBatchRows rows
+ *   - time: maxAgeMs has passed since the first row of a batch arrived
+ *
+ * The time threshold is a wait inside the push() promise, which the worker
+ * hands to ctx.waitUntil — it holds the isolate open without costing CPU.
+ * Keep maxAgeMs well under the 30 s waitUntil allowance.
+ *
+ * A failed flush spills its rows back to the front of the buffer and re-arms
+ * the deadline with exponential backoff (maxAgeMs doubled per consecutive
+ * failure, capped at maxRetryDelayMs). The retry is chained onto the promise
+ * that ran the failed flush, so it stays covered by the same waitUntil
+ * instead of waiting for the next push. A deadline whose promise the runtime
+ * cancelled is treated as lost once it is overdue, and the next push re-arms it.
+ * The buffer is bounded by maxBufferedRows; when D1 stays down the oldest
+ * rows are dropped, counted and logged rather than growing memory.
+ *
+ * After a flush, the counters from stats() are logged as one structured
+ * line, at most once per statsIntervalMs, so operators can follow buffered,
+ * flushed and dropped rows in Workers Logs.
+ *
+ * @file reginald/lib/ai-visit-buffer.js
+ * @author Tom Cranstoun
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags ai-attribution, db, performance
+ */
+
+import * as aiVisitsDb from '../db/ai-visits.js';
+
+const DEFAULT_MAX_BATCH_ROWS = 50;
+const DEFAULT_MAX_AGE_MS = 5000;
+const DEFAULT_MAX_BUFFERED_ROWS = 1000;
+const DEFAULT_MAX_RETRY_DELAY_MS = 20000;
+const DEFAULT_STATS_INTERVAL_MS = 60000;
+
+/**
+ * Create a write-behind buffer.
+ * @param {object} [options]
+ * @param {number} [options.maxBatchRows] - flush as soon as this many rows are buffered
+ * @param {number} [options.maxAgeMs] - flush this long after the first row of a batch
+ * @param {number} [options.maxBufferedRows] - hard cap; oldest rows beyond it are dropped
+ * @param {number} [options.maxRetryDelayMs] - longest backoff before retrying a failed flush
+ * @param {number} [options.statsIntervalMs] - shortest gap between two stats log lines
+ * @param {function(D1Database, Array<object>): Promise<void>} [options.write] - batch writer
+ * @param {function(number): Promise<void>} [options.sleep] - delay helper (injectable for tests)
+ * @param {function(): number} [options.now] - clock (injectable for tests)
+ * @returns {{push: function, flush: function, stats: function}}
+ */
+export function createAiVisitBuffer(options = {}) {
+    const {
+        maxBatchRows = DEFAULT_MAX_BATCH_ROWS,
+        maxAgeMs = DEFAULT_MAX_AGE_MS,
+        maxBufferedRows = DEFAULT_MAX_BUFFERED_ROWS,
+        maxRetryDelayMs = DEFAULT_MAX_RETRY_DELAY_MS,
+        statsIntervalMs = DEFAULT_STATS_INTERVAL_MS,
+        write = aiVisitsDb.insertMany,
+        sleep = delay,
+        now = Date.now,
+    } = options;
+
+    let rows = [];
+    let inFlight = null;
+    let deadlineAt = null;
+    let consecutiveFailures = 0;
+    let statsLoggedAt = -Infinity;
+    const counters = { flushed: 0, dropped: 0, flushes: 0, failedFlushes: 0 };
+
+    /**
+     * Requeue rows from a failed flush ahead of rows that arrived meanwhile,
+     * dropping the oldest beyond the buffer cap.
+     */
+    function spill(batch) {
+        const merged = batch.concat(rows);
+        const overflow = merged.length - maxBufferedRows;
+        if (overflow > 0) {
+            merged.splice(0, overflow);
+            counters.dropped += overflow;
+        }
+        rows = merged;
+        return Math.max(overflow, 0);
+    }
+
+    /**
+     * Log the counters as one structured line, unless one was logged
+     * within the last statsIntervalMs.
+     */
+    function logStats() {
+        if (now() - statsLoggedAt < statsIntervalMs) return;
+        statsLoggedAt = now();
+        console.log({ message: 'AI visits: buffer stats', ...stats() });
+    }
+
+    /**
+     * Write every buffered row. If a flush is already running, waits for it
+     * and then flushes whatever has been buffered since.
+     * Never rejects — failures are counted and the rows spilled back.
+     * @param {D1Database} db
+     * @returns {Promise<number>} rows written by this call
+     */
+    function flush(db) {
+        if (inFlight) return inFlight.then(() => flush(db));
+        if (!rows.length) return Promise.resolve(0);
+
+        const batch = rows;
+        rows = [];
+        inFlight = (async () => {
+            try {
+                await write(db, batch);
+                counters.flushed += batch.length;
+                counters.flushes++;
+                consecutiveFailures = 0;
+                return batch.length;
+            } catch (e) {
+                counters.failedFlushes++;
+                consecutiveFailures++;
+                const dropped = spill(batch);
+                console.error(`AI visits: batch of ${batch.length} failed, ${rows.length} buffered, ${dropped} dropped — ${e.message}`);
+                return 0;
+            } finally {
+                inFlight = null;
+                logStats();
+            }
+        })();
+        return inFlight;
+    }
+
+    /**
+     * Flush, and if the flush failed with rows left over, wait out the
+     * backoff and try again — unless another deadline is already pending.
+     * @param {D1Database} db
+     * @returns {Promise<number>} rows written, including by any retry
+     */
+    function flushWithRetry(db) {
+        return flush(db).then((written) => {
+            if (!rows.length || consecutiveFailures === 0 || deadlinePending()) return written;
+            const backoff = Math.min(maxAgeMs * 2 ** consecutiveFailures, maxRetryDelayMs);
+            return armDeadline(db, backoff).then((retried) => written + retried);
+        });
+    }
+
+    /**
+     * Is a deadline armed and not yet overdue? A deadline that should have
+     * fired long ago belongs to a promise the runtime cancelled.
+     */
+    function deadlinePending() {
+        return deadlineAt !== null && now() <= deadlineAt + maxAgeMs;
+    }
+
+    /**
+     * Flush after ms, retrying with backoff if that flush fails.
+     * @param {D1Database} db
+     * @param {number} ms
+     * @returns {Promise<number>}
+     */
+    function armDeadline(db, ms) {
+        const armedAt = now() + ms;
+        deadlineAt = armedAt;
+        return sleep(ms).then(() => {
+            if (deadlineAt === armedAt) deadlineAt = null;
+            return flushWithRetry(db);
+        });
+    }
+
+    /**
+     * Buffer one row. The returned promise settles once this row's flush
+     * duty is done — immediately, after a size-triggered flush, or after the
+     * batch deadline this row armed, including any retry of a failed
+     * flush — so it can be passed to ctx.waitUntil.
+     * @param {D1Database} db
+     * @param {object} row - ai_visits row from buildAiVisitRow
+     * @returns {Promise<number>}
+     */
+    function push(db, row) {
+        if (rows.length >= maxBufferedRows) {
+            rows.shift();
+            counters.dropped++;
+            console.warn(`AI visits: buffer full at ${maxBufferedRows} rows, dropped the oldest — ${counters.dropped} dropped in this isolate`);
+        }
+        rows.push(row);
+
+        if (rows.length >= maxBatchRows) return flushWithRetry(db);
+        if (!deadlinePending()) return armDeadline(db, maxAgeMs);
+        return Promise.resolve(0);
+    }
+
+    /**
+     * Snapshot of buffer counters.
+     * @returns {{buffered: number, flushed: number, dropped: number, flushes: number, failedFlushes: number}}
+     */
+    function stats() {
+        return { buffered: rows.length, ...counters };
+    }
+
+    return { push, flush, stats };
+}
+
+/**
+ * Simple delay helper.
+ * @param {number} ms
+ * @returns {Promise<void>}
+ */
+function delay(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
@@ -3,6 +3,18 @@
  * Monthly cron: fetches registry index, checks each COG's canonical_url,
  * verifies content_hash via SHA-256, records results to D1.
  *
+ * A run is one pass over the registry and can span several cron invocations:
+ *   - checks run concurrently (MAX_CONCURRENT_CHECKS open connections) while
+ *     each publisher host gets at most one request per PER_HOST_INTERVAL_MS;
+ *     namespaces are interleaved so a large publisher does not stall the rest
+ *   - canonical URLs are fetched with If-None-Match / If-Modified-Since from
+ *     the last full fetch; a 304 reuses the stored content hash
+ *   - bodies are hashed as they stream in (crypto.DigestStream)
+ *   - results are committed COMMIT_BATCH_SIZE COGs per db.batch, together
+ *     with the run totals
+ *   - an invocation stops launching checks when its time or subrequest budget
+ *     is spent; the hourly cron resumes the run, skipping COGs already checked
+ *
  * @mx:status active
  * @mx:contentType script
  * @mx:tags aliveness, health-check, cron
@@ -14,157 +26,384 @@ import * as audit from '../db/audit.js';
 const CHECK_TIMEOUT_MS = 5000;
 const MAX_RETRIES = 3;
 const RETRY_DELAY_MS = 1000;
-const INTER_CHECK_DELAY_MS = 500;
+
+// Workers allow six simultaneous open connections per invocation
+const MAX_CONCURRENT_CHECKS = 6;
+// Politeness towards publisher servers: minimum gap between requests to one host
+const PER_HOST_INTERVAL_MS = 500;
+// Checks in flight at once — enough that other hosts proceed while one is throttled
+const MAX_PENDING_CHECKS = 64;
+const COMMIT_BATCH_SIZE = 25;
+// Cron invocations may run for 15 minutes; stop launching checks well before
+const INVOCATION_BUDGET_MS = 10 * 60 * 1000;
+const LEASE_GRACE_MS = 5 * 60 * 1000;
+// Per-invocation subrequest limit is 1000; leave headroom for the rest of the cron
+const MAX_SUBREQUESTS = 900;
+// latest.json + one request per attempt + the GET fallback after a failed
+// HEAD on the last attempt (see checkCog / checkUrl)
+export const WORST_CASE_SUBREQUESTS_PER_COG = 1 + MAX_RETRIES + 1;
 
 /**
  * Run aliveness checks for all COGs in the registry.
- * Called by monthly cron trigger.
+ * Called by the monthly cron trigger to start a run, and by the hourly cron
+ * with `resume: true` to continue one that ran out of budget.
  * @param {object} env - Worker environment bindings
+ * @param {object} [options]
+ * @param {boolean} [options.resume] - only continue an open run; never start one
+ * @param {number} [options.concurrency] - global limit on in-flight requests
+ * @param {number} [options.hostIntervalMs] - minimum gap between requests to one publisher host
+ * @param {number} [options.maxPendingChecks] - checks in flight at once
+ * @param {number} [options.commitEvery] - COGs per db.batch commit
+ * @param {number} [options.budgetMs] - stop launching checks after this long
+ * @param {number} [options.maxSubrequests] - stop launching checks before this many fetches
+ * @param {function} [options.fetch] - fetch implementation (injectable for tests)
+ * @param {function(number): Promise<void>} [options.sleep] - delay helper (injectable for tests)
+ * @param {function(): number} [options.now] - clock (injectable for tests)
+ * @returns {Promise<object|null>} invocation summary, or null if there was nothing to do
  */
-export async function runAlivenessChecks(env) {
-    const repoPath = env.MX_OUTPUTS_REPO_PATH || '/Digital-Domain-Technologies-Ltd/MX-outputs/main';
-    const indexUrl = `https://${env.MX_OUTPUTS_HOSTNAME}${repoPath}/reginald/api/v1/index.json`;
+export async function runAlivenessChecks(env, options = {}) {
+    const {
+        resume = false,
+        concurrency = MAX_CONCURRENT_CHECKS,
+        hostIntervalMs = PER_HOST_INTERVAL_MS,
+        maxPendingChecks = MAX_PENDING_CHECKS,
+        commitEvery = COMMIT_BATCH_SIZE,
+        budgetMs = INVOCATION_BUDGET_MS,
+        maxSubrequests = MAX_SUBREQUESTS,
+        fetch: fetchImpl = fetch,
+        sleep = delay,
+        now = Date.now,
+    } = options;
+    const db = env.DB;
+    const startedAt = now();
+    const leaseUntil = startedAt + budgetMs + LEASE_GRACE_MS;
 
-    let index;
-    try {
-        const resp = await fetch(indexUrl);
-        if (!resp.ok) {
-            console.error(`Aliveness: failed to fetch index.json — HTTP ${resp.status}`);
-            return;
+    let run;
+    if (resume) {
+        run = await alivenessDb.findOpenRun(db);
+        if (!run) return null;
+        if (!await alivenessDb.claimRun(db, run.id, startedAt, leaseUntil)) {
+            console.log(`Aliveness: run ${run.id} is leased to another invocation`);
+            return null;
         }
-        index = await resp.json();
-    } catch (e) {
-        console.error(`Aliveness: failed to fetch index.json — ${e.message}`);
-        return;
+    } else {
+        run = await alivenessDb.startRun(db, leaseUntil);
     }
 
-    const cogs = index.cogs || index.entries || [];
-    let passed = 0;
-    let failed = 0;
-
-    for (const cog of cogs) {
-        const namespace = cog.namespace || cog.publisher?.namespace;
-        const name = cog.name;
+    let subrequests = 0;
+    const io = {
+        fetch: (...args) => {
+            subrequests++;
+            return fetchImpl(...args);
+        },
+        limit: createConcurrencyLimit(concurrency),
+        acquireHost: createHostLimiter(hostIntervalMs, { sleep, now }),
+        sleep,
+        now,
+        db,
+    };
 
-        if (!namespace || !name) continue;
+    let complete = false;
+    try {
+        const repoPath = env.MX_OUTPUTS_REPO_PATH || '/Digital-Domain-Technologies-Ltd/MX-outputs/main';
+        const registryBase = `https://${env.MX_OUTPUTS_HOSTNAME}${repoPath}/reginald`;
 
-        // Fetch the COG's latest.json to get canonical_url and content_hash
-        const latestUrl = `https://${env.MX_OUTPUTS_HOSTNAME}${repoPath}/reginald/cogs/${namespace}/${name}/latest.json`;
-        let latest;
+        let index;
         try {
-            const latestResp = await fetch(latestUrl);
-            if (!latestResp.ok) {
-                await recordFailure(env.DB, namespace, name, latestUrl, null, null, `latest.json HTTP ${latestResp.status}`);
-                failed++;
-                continue;
+            const resp = await io.fetch(`${registryBase}/api/v1/index.json`);
+            if (!resp.ok) {
+                console.error(`Aliveness: failed to fetch index.json — HTTP ${resp.status}`);
+                return null;
             }
-            latest = await latestResp.json();
+            index = await resp.json();
         } catch (e) {
-            await recordFailure(env.DB, namespace, name, latestUrl, null, null, `latest.json fetch: ${e.message}`);
-            failed++;
-            continue;
+            console.error(`Aliveness: failed to fetch index.json — ${e.message}`);
+            return null;
         }
 
-        const canonicalUrl = latest.canonical_url;
-        const expectedHash = latest.content_hash;
+        const cogs = registryOrder(index.cogs || index.entries || []);
+        const done = resume ? await alivenessDb.findCheckedCogs(db, run.started_at) : new Set();
+        const queue = cogs.filter(cog => !done.has(cog.key));
+        const validators = await alivenessDb.findValidators(db);
+
+        const pending = new Set();
+        const totals = { checked: 0, passed: 0, failed: 0, not_modified: 0 };
+        let finished = [];
+        let commitChain = Promise.resolve();
+        let commitError = null;
 
-        if (!canonicalUrl) {
-            await recordFailure(env.DB, namespace, name, 'unknown', null, null, 'No canonical_url in latest.json');
-            failed++;
-            continue;
+        // Results only count once their batch is in D1; a lost batch is checked again on resume
+        const commitFinished = (final) => {
+            while (finished.length >= commitEvery || (final && finished.length)) {
+                const slice = finished.slice(0, commitEvery);
+                finished = finished.slice(commitEvery);
+                commitChain = commitChain
+                    .then(() => (commitError ? null : commitResults(db, run.id, slice, done.size + queue.length, totals)))
+                    .catch((e) => {
+                        commitError = e;
+                    });
+            }
+        };
+
+        const withinBudget = () => !commitError
+            && now() - startedAt < budgetMs
+            && subrequests + (pending.size + 1) * WORST_CASE_SUBREQUESTS_PER_COG <= maxSubrequests;
+
+        let launched = 0;
+        while (launched < queue.length && withinBudget()) {
+            if (pending.size >= maxPendingChecks) {
+                await Promise.race(pending);
+                continue;
+            }
+            const cog = queue[launched++];
+            const task = checkCog(cog, validators.get(cog.key), registryBase, io).then((result) => {
+                finished.push(result);
+                pending.delete(task);
+                commitFinished(false);
+            });
+            pending.add(task);
         }
+        await Promise.all(pending);
+        commitFinished(true);
+        await commitChain;
 
-        // Check the canonical URL
-        const result = await checkUrl(canonicalUrl, expectedHash);
+        if (commitError) {
+            console.error(`Aliveness: run ${run.id} commit failed — ${commitError.message}`);
+        }
 
-        await alivenessDb.recordCheck(env.DB, {
-            cog_namespace: namespace,
-            cog_name: name,
-            canonical_url: canonicalUrl,
-            http_status: result.status,
-            response_time_ms: result.responseTime,
-            hash_match: result.hashMatch,
-            error_message: result.error,
-        });
+        const remaining = queue.length - totals.checked;
+        complete = remaining === 0;
+        const summary = { runId: run.id, complete, remaining, subrequests, ...totals };
 
-        if (result.ok) {
-            await alivenessDb.resetFailure(env.DB, namespace, name);
-            passed++;
+        if (complete) {
+            const finished = await alivenessDb.completeRun(db, run.id);
+            await audit.log(db, null, 'aliveness_run', {
+                run_id: run.id,
+                total: finished.total,
+                passed: finished.passed,
+                failed: finished.failed,
+                not_modified: finished.not_modified,
+                invocations: finished.invocations,
+            });
+            console.log(`Aliveness: checked ${finished.total} COGs — ${finished.passed} passed, ${finished.failed} failed `
+                + `(${finished.not_modified} unchanged, ${finished.invocations} invocation(s))`);
         } else {
-            await alivenessDb.incrementFailure(env.DB, namespace, name, result.error || `HTTP ${result.status}`);
-            failed++;
+            console.log(`Aliveness: run ${run.id} paused after ${totals.checked} COGs — ${remaining} left for the next invocation`);
         }
+        return summary;
+    } finally {
+        if (!complete) await alivenessDb.releaseRun(db, run.id);
+    }
+}
+
+/**
+ * Valid registry entries in run order, keyed "namespace/name".
+ * Namespaces take turns (one COG from each in rotation): a publisher's COGs
+ * usually share a host, so listing them back to back would leave every check
+ * in flight waiting on the same per-host interval.
+ * @param {Array<object>} entries - index.json cogs/entries
+ * @returns {Array<{key: string, namespace: string, name: string}>}
+ */
+function registryOrder(entries) {
+    const byNamespace = new Map();
+    const seen = new Set();
+    for (const cog of entries) {
+        const namespace = cog.namespace || cog.publisher?.namespace;
+        const name = cog.name;
+        if (!namespace || !name) continue;
+        const key = `${namespace}/${name}`;
+        if (seen.has(key)) continue;
+        seen.add(key);
+        if (!byNamespace.has(namespace)) byNamespace.set(namespace, []);
+        byNamespace.get(namespace).push({ key, namespace, name });
+    }
+    const groups = [...byNamespace.values()];
+    const ordered = [];
+    for (let i = 0; ordered.length < seen.size; i++) {
+        for (const group of groups) {
+            if (i < group.length) ordered.push(group[i]);
+        }
+    }
+    return ordered;
+}
+
+/**
+ * Write one slice of results and the run totals in a single db.batch.
+ */
+async function commitResults(db, runId, slice, total, totals) {
+    const delta = { passed: 0, failed: 0, not_modified: 0 };
+    const statements = [];
+    for (const result of slice) {
+        statements.push(...result.statements);
+        if (result.ok) delta.passed++;
+        else delta.failed++;
+        if (result.notModified) delta.not_modified++;
+    }
+    statements.push(alivenessDb.recordRunProgressStatement(db, runId, { total, ...delta }));
+    await db.batch(statements);
+    totals.checked += slice.length;
+    totals.passed += delta.passed;
+    totals.failed += delta.failed;
+    totals.not_modified += delta.not_modified;
+}
+
+/**
+ * Check one COG: fetch its latest.json, then its canonical URL.
+ * @returns {Promise<{ok: boolean, notModified: boolean, statements: Array}>}
+ */
+async function checkCog(cog, stored, registryBase, io) {
+    const { namespace, name } = cog;
+    const { db } = io;
+
+    // Fetch the COG's latest.json to get canonical_url and content_hash
+    const latestUrl = `${registryBase}/cogs/${namespace}/${name}/latest.json`;
+    let latest;
+    try {
+        latest = await io.limit(async () => {
+            const latestResp = await io.fetch(latestUrl);
+            if (!latestResp.ok) {
+                latestResp.body?.cancel();
+                return { httpStatus: latestResp.status };
+            }
+            return latestResp.json();
+        });
+    } catch (e) {
+        return failure(db, cog, latestUrl, `latest.json fetch: ${e.message}`);
+    }
+    if (latest?.httpStatus) {
+        return failure(db, cog, latestUrl, `latest.json HTTP ${latest.httpStatus}`);
+    }
 
-        // Rate limit: don't overwhelm publisher servers
-        await delay(INTER_CHECK_DELAY_MS);
+    const canonicalUrl = latest?.canonical_url;
+    const expectedHash = latest?.content_hash;
+
+    if (!canonicalUrl) {
+        return failure(db, cog, 'unknown', 'No canonical_url in latest.json');
     }
 
-    await audit.log(env.DB, null, 'aliveness_run', {
-        total: cogs.length,
-        passed,
-        failed,
-    });
+    // Check the canonical URL
+    const result = await checkUrl(canonicalUrl, expectedHash, stored, io);
 
-    console.log(`Aliveness: checked ${cogs.length} COGs — ${passed} passed, ${failed} failed`);
+    const statements = [alivenessDb.recordCheckStatement(db, {
+        cog_namespace: namespace,
+        cog_name: name,
+        canonical_url: canonicalUrl,
+        http_status: result.status,
+        response_time_ms: result.responseTime,
+        hash_match: result.hashMatch,
+        error_message: result.error,
+    })];
+
+    if (result.ok) {
+        statements.push(alivenessDb.resetFailureStatement(db, namespace, name));
+    } else {
+        statements.push(alivenessDb.incrementFailureStatement(db, namespace, name, result.error || `HTTP ${result.status}`));
+    }
+    if (result.validators) {
+        statements.push(alivenessDb.saveValidatorsStatement(db, {
+            cog_namespace: namespace,
+            cog_name: name,
+            canonical_url: canonicalUrl,
+            ...result.validators,
+        }));
+    }
+
+    return { ok: result.ok, notModified: result.status === 304, statements };
 }
 
 /**
  * Check a single URL with retries.
+ * With an expected hash the URL is fetched with GET — conditionally when
+ * validators from the last full fetch are stored — and the body hashed as it
+ * streams in. Without one, HEAD is enough (GET on the last attempt for servers
+ * that reject HEAD).
  * @param {string} url - Canonical URL to check
  * @param {string} expectedHash - Expected sha256:hex hash
- * @returns {Promise<{ok: boolean, status: number, responseTime: number, hashMatch: boolean, error: string|null}>}
+ * @param {object|undefined} stored - aliveness_validators row for this COG
+ * @param {object} io - fetch, limit, acquireHost, sleep, now
+ * @returns {Promise<{ok: boolean, status: number, responseTime: number, hashMatch: boolean, error: string|null, validators?: object}>}
  */
-async function checkUrl(url, expectedHash) {
+async function checkUrl(url, expectedHash, stored, io) {
+    let host;
+    try {
+        host = new URL(url).host;
+    } catch {
+        return { ok: false, status: null, responseTime: null, hashMatch: false, error: `Invalid canonical_url: ${url}` };
+    }
+
+    const conditional = expectedHash && stored && stored.canonical_url === url && stored.content_hash ? stored : null;
+    const headers = {};
+    if (conditional?.etag) headers['If-None-Match'] = conditional.etag;
+    if (conditional?.last_modified) headers['If-Modified-Since'] = conditional.last_modified;
+
     let lastError = null;
 
     for (let attempt = 0; attempt < MAX_RETRIES; attempt++) {
         try {
-            const start = Date.now();
-
-            // Try HEAD first (lighter), fall back to GET
-            let resp = await fetch(url, {
-                method: 'HEAD',
-                signal: AbortSignal.timeout(CHECK_TIMEOUT_MS),
-            });
+            const started = await io.acquireHost(host);
+            const outcome = await io.limit(async () => {
+                started();
+                const start = io.now();
 
-            // If HEAD returns error, try GET (some servers don't support HEAD)
-            if (!resp.ok && attempt === MAX_RETRIES - 1) {
-                resp = await fetch(url, {
-                    method: 'GET',
+                let resp = await io.fetch(url, {
+                    method: expectedHash ? 'GET' : 'HEAD',
+                    headers,
                     signal: AbortSignal.timeout(CHECK_TIMEOUT_MS),
                 });
-            }
 
-            const responseTime = Date.now() - start;
+                // If HEAD returns error, try GET (some servers don't support HEAD)
+                if (!expectedHash && !resp.ok && attempt === MAX_RETRIES - 1) {
+                    resp = await io.fetch(url, {
+                        method: 'GET',
+                        signal: AbortSignal.timeout(CHECK_TIMEOUT_MS),
+                    });
+                }
+
+                const responseTime = io.now() - start;
 
-            if (!resp.ok) {
-                lastError = `HTTP ${resp.status}`;
-                if (attempt < MAX_RETRIES - 1) {
-                    await delay(RETRY_DELAY_MS);
-                    continue;
+                // Unchanged since the last full fetch: the stored hash still applies
+                if (resp.status === 304 && conditional) {
+                    return { ok: true, status: 304, responseTime, hashMatch: conditional.content_hash === expectedHash, error: null };
                 }
-                return { ok: false, status: resp.status, responseTime, hashMatch: false, error: lastError };
-            }
 
-            // Hash verification (only if we have content and expected hash)
-            let hashMatch = true;
-            if (expectedHash && resp.method !== 'HEAD') {
+                if (!resp.ok) {
+                    resp.body?.cancel();
+                    return { ok: false, status: resp.status, responseTime, hashMatch: false, error: `HTTP ${resp.status}` };
+                }
+
+                if (!expectedHash) {
+                    resp.body?.cancel();
+                    return { ok: true, status: resp.status, responseTime, hashMatch: true, error: null };
+                }
+
+                // Hash verification is best-effort: a body that fails mid-stream is not a dead COG
+                let contentHash;
                 try {
-                    const body = await resp.text();
-                    const computed = await computeHash(body);
-                    hashMatch = (expectedHash === computed);
+                    contentHash = await hashBody(resp);
                 } catch {
-                    // Hash check is best-effort; HEAD responses have no body
-                    hashMatch = true;
+                    return { ok: true, status: resp.status, responseTime, hashMatch: true, error: null };
                 }
-            }
+                return {
+                    ok: true,
+                    status: resp.status,
+                    responseTime,
+                    hashMatch: contentHash === expectedHash,
+                    error: null,
+                    validators: {
+                        etag: resp.headers.get('ETag'),
+                        last_modified: resp.headers.get('Last-Modified'),
+                        content_hash: contentHash,
+                    },
+                };
+            });
 
-            return { ok: true, status: resp.status, responseTime, hashMatch, error: null };
+            if (outcome.ok || attempt === MAX_RETRIES - 1) return outcome;
+            lastError = outcome.error;
         } catch (e) {
             lastError = e.message;
-            if (attempt < MAX_RETRIES - 1) {
-                await delay(RETRY_DELAY_MS);
-            }
+        }
+        if (attempt < MAX_RETRIES - 1) {
+            await io.sleep(RETRY_DELAY_MS);
         }
     }
 
@@ -172,31 +411,100 @@ async function checkUrl(url, expectedHash) {
 }
 
 /**
- * Compute SHA-256 hash of content.
- * @param {string} content
+ * SHA-256 of a response body.
+ * In the Workers runtime the body is piped through crypto.DigestStream, so it
+ * is hashed chunk by chunk as it arrives and never held in memory whole.
+ * @param {Response} resp
  * @returns {Promise<string>} sha256:hex format
  */
-async function computeHash(content) {
-    const encoder = new TextEncoder();
-    const data = encoder.encode(content);
-    const hashBuffer = await crypto.subtle.digest('SHA-256', data);
+async function hashBody(resp) {
+    let hashBuffer;
+    if (resp.body && typeof crypto.DigestStream === 'function') {
+        const digestStream = new crypto.DigestStream('SHA-256');
+        await resp.body.pipeTo(digestStream);
+        hashBuffer = await digestStream.digest;
+    } else {
+        hashBuffer = await crypto.subtle.digest('SHA-256', await resp.arrayBuffer());
+    }
     const hashArray = Array.from(new Uint8Array(hashBuffer));
     return 'sha256:' + hashArray.map(b => b.toString(16).padStart(2, '0')).join('');
 }
 
 /**
- * Record a failure when we can't even fetch latest.json.
+ * Statements for a COG whose latest.json could not be used.
  */
-async function recordFailure(db, namespace, name, url, status, responseTime, errorMsg) {
-    await alivenessDb.recordCheck(db, {
-        cog_namespace: namespace,
-        cog_name: name,
-        canonical_url: url,
-        http_status: status,
-        response_time_ms: responseTime,
-        error_message: errorMsg,
-    });
-    await alivenessDb.incrementFailure(db, namespace, name, errorMsg);
+function failure(db, cog, url, errorMsg) {
+    return {
+        ok: false,
+        notModified: false,
+        statements: [
+            alivenessDb.recordCheckStatement(db, {
+                cog_namespace: cog.namespace,
+                cog_name: cog.name,
+                canonical_url: url,
+                http_status: null,
+                response_time_ms: null,
+                error_message: errorMsg,
+            }),
+            alivenessDb.incrementFailureStatement(db, cog.namespace, cog.name, errorMsg),
+        ],
+    };
+}
+
+/**
+ * Limit how many async operations run at once. A finishing operation hands
+ * its slot straight to the next waiter, so the limit is never exceeded.
+ * @param {number} limit
+ * @returns {function(function(): Promise): Promise}
+ */
+function createConcurrencyLimit(limit) {
+    let active = 0;
+    const waiting = [];
+    return async function run(fn) {
+        if (active < limit) {
+            active++;
+        } else {
+            await new Promise(resolve => waiting.push(resolve));
+        }
+        try {
+            return await fn();
+        } finally {
+            const next = waiting.shift();
+            if (next) next();
+            else active--;
+        }
+    };
+}
+
+/**
+ * Space request starts to each host at least intervalMs apart. Callers for a
+ * host take turns: acquire() resolves once it is this caller's turn and the
+ * interval since the host's last request has passed, and returns a `started`
+ * callback to invoke when the request actually begins (after any wait for a
+ * connection slot). The next caller's turn starts from that moment.
+ * @param {number} intervalMs
+ * @param {object} clock - sleep and now
+ * @returns {function(string): Promise<function(): void>}
+ */
+function createHostLimiter(intervalMs, { sleep, now }) {
+    const hosts = new Map();
+    return async function acquire(host) {
+        let state = hosts.get(host);
+        if (!state) {
+            state = { turn: Promise.resolve(), lastStart: -Infinity };
+            hosts.set(host, state);
+        }
+        const previous = state.turn;
+        let release;
+        state.turn = new Promise(resolve => { release = resolve; });
+        await previous;
+        const wait = state.lastStart + intervalMs - now();
+        if (wait > 0) await sleep(wait);
+        return function started() {
+            state.lastStart = now();
+            release();
+        };
+    };
 }
 
 /**
@@ -276,7 +276,8 @@ function readBlockConfig(block) {
  */
 async function loadCSS(href) {
   return new Promise((resolve, reject) => {
-    if (!document.querySelector(`head > link[href="${href}"]`)) {
+    // Match stylesheets only: a preload hint for the same href is not one
+    if (!document.querySelector(`head > link[rel="stylesheet"][href="${href}"]`)) {
       const link = document.createElement('link');
       link.rel = 'stylesheet';
       link.href = href;
@@ -646,9 +647,82 @@ function buildBlock(blockName, content) {
   return blockEl;
 }
 
+// Blocks after the first section load this many at a time
+const BLOCK_LOAD_CONCURRENCY = 4;
+
+/**
+
+* Gets the JS and CSS URLs for a block.
+* @param {string} blockName name of the block
+* @returns {Object} js and css URLs
+ */
+function getBlockResources(blockName) {
+  const base = `${window.hlx.codeBasePath}/blocks/${blockName}/${blockName}`;
+  return { js: `${base}.js`, css: `${base}.css` };
+}
+
+/**
+
+* Gets the network time for a resource from Resource Timing, if the
+* browser recorded one.
+* @param {string} href URL of the resource
+* @returns {number|null} milliseconds from request start to response end
+ */
+function getResourceDuration(href) {
+  if (!window.performance || !performance.getEntriesByName) return null;
+  const entries = performance.getEntriesByName(new URL(href, window.location.href).href);
+  if (!entries.length) return null;
+  const entry = entries[entries.length - 1];
+  return Math.round(entry.responseEnd - entry.startTime);
+}
+
+/**
+
+* Records a block's load timings in window.hlx.blockTimings and RUM.
+* @param {Object} timing timings in milliseconds
+ */
+function recordBlockTiming(timing) {
+  window.hlx = window.hlx || {};
+  window.hlx.blockTimings = window.hlx.blockTimings || [];
+  window.hlx.blockTimings.push(timing);
+  sampleRUM('blocktiming', {
+    source: timing.block,
+    target: `fetch:${timing.fetch};import:${timing.import};decorate:${timing.decorate};total:${timing.total}`,
+  });
+}
+
+/**
+
+* Adds modulepreload and preload hints for blocks that have not loaded yet,
+* so their JS and CSS download while earlier blocks decorate.
+* @param {Array<Element>} blocks block elements
+ */
+function preloadBlocks(blocks) {
+  const names = new Set(blocks
+    .filter((block) => block.dataset.blockStatus === 'initialized')
+    .map((block) => block.dataset.blockName));
+  names.forEach((blockName) => {
+    const { js, css } = getBlockResources(blockName);
+    if (!document.querySelector(`head > link[href="${js}"]`)) {
+      const link = document.createElement('link');
+      link.rel = 'modulepreload';
+      link.href = js;
+      document.head.append(link);
+    }
+    if (!document.querySelector(`head > link[href="${css}"]`)) {
+      const link = document.createElement('link');
+      link.rel = 'preload';
+      link.as = 'style';
+      link.href = css;
+      document.head.append(link);
+    }
+  });
+}
+
 /**
 
 * Loads JS and CSS for a block.
+* Fetch, import and decorate timings are recorded with recordBlockTiming.
 * @param {Element} block The block element
  */
 async function loadBlock(block) {
@@ -656,17 +730,23 @@ async function loadBlock(block) {
   if (status !== 'loading' && status !== 'loaded') {
     block.dataset.blockStatus = 'loading';
     const { blockName } = block.dataset;
+    const { js, css } = getBlockResources(blockName);
+    const start = performance.now();
+    const timing = {
+      block: blockName, start: Math.round(start), import: null, decorate: null,
+    };
     try {
-      const cssLoaded = loadCSS(`${window.hlx.codeBasePath}/blocks/${blockName}/${blockName}.css`);
+      const cssLoaded = loadCSS(css);
       const decorationComplete = new Promise((resolve) => {
         (async () => {
           try {
-            const mod = await import(
-              `${window.hlx.codeBasePath}/blocks/${blockName}/${blockName}.js`
-            );
+            const mod = await import(js);
+            const decorateStart = performance.now();
+            timing.import = Math.round(decorateStart - start);
             if (mod.default) {
               await mod.default(block);
             }
+            timing.decorate = Math.round(performance.now() - decorateStart);
           } catch (error) {
             // eslint-disable-next-line no-console
             console.log(`failed to load module for ${blockName}`, error);
@@ -680,6 +760,12 @@ async function loadBlock(block) {
       console.log(`failed to load block ${blockName}`, error);
     }
     block.dataset.blockStatus = 'loaded';
+    recordBlockTiming({
+      ...timing,
+      fetch: getResourceDuration(js),
+      css: getResourceDuration(css),
+      total: Math.round(performance.now() - start),
+    });
   }
   return block;
 }
@@ -687,16 +773,38 @@ async function loadBlock(block) {
 /**
 
 * Loads JS and CSS for all blocks in a container element.
+* Blocks in the first section still loading are loaded together first;
+* the rest load BLOCK_LOAD_CONCURRENCY at a time in document order, with
+* preload hints so their files download meanwhile. Sections are revealed
+* in order by updateSectionsStatus as their blocks finish.
 * @param {Element} main The container element
  */
 async function loadBlocks(main) {
   updateSectionsStatus(main);
   const blocks = [...main.querySelectorAll('div.block')];
-  for (let i = 0; i < blocks.length; i += 1) {
-    // eslint-disable-next-line no-await-in-loop
-    await loadBlock(blocks[i]);
+  const firstPending = blocks.find((block) => block.dataset.blockStatus !== 'loaded');
+  if (!firstPending) return;
+  const firstSection = firstPending.closest('.section');
+  const eager = blocks.filter((block) => block.closest('.section') === firstSection);
+  const queue = blocks.filter((block) => !eager.includes(block));
+
+  preloadBlocks(queue);
+  await Promise.all(eager.map(async (block) => {
+    await loadBlock(block);
     updateSectionsStatus(main);
-  }
+  }));
+
+  let next = 0;
+  const worker = async () => {
+    while (next < queue.length) {
+      const block = queue[next];
+      next += 1;
+      // eslint-disable-next-line no-await-in-loop
+      await loadBlock(block);
+      updateSectionsStatus(main);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(BLOCK_LOAD_CONCURRENCY, queue.length) }, worker));
 }
 
 /**
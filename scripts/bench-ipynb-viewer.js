@@ -0,0 +1,140 @@
+/**
+ * Benchmark the work ipynb-viewer does before its first page, on the
+ * repo's own notebooks
+ * Runs the block's DOM-free modules under Node, so it needs nothing beyond
+ * the tree. Per notebook it times:
+ *   - reading the notebook JSON
+ *   - outlining the cells and grouping them into pages
+ *   - parsing the first page's markdown (done before the first page shows)
+ *   - parsing every markdown cell (done before the first page until pages
+ *     were built lazily; now done in the background)
+ *   - the cached parse the background step uses, on a first visit (hash
+ *     every cell, parse, store) and a repeat visit (one hash of the whole
+ *     notebook)
+ * Node has no IndexedDB, so the repeat visit is served from the in-memory
+ * cache: the real repeat visit adds one IndexedDB read. Building cell DOM
+ * and opening the overlay need a browser and are not timed.
+ *
+ * Usage:
+ *   node scripts/bench-ipynb-viewer.js [--rounds 40] [notebook.ipynb ...]
+ *
+ * @file bench-ipynb-viewer.js
+ * @version 3.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags benchmark, ipynb, performance
+ * @mx:partOf mx-os
+ */
+import fs from 'fs';
+import path from 'path';
+import { pathToFileURL } from 'url';
+import { performance } from 'perf_hooks';
+import { parseCellMarkdown } from '../blocks/ipynb-viewer/markdown-parser.js';
+import { outlineNotebookCells, createPageGroups } from '../blocks/ipynb-viewer/notebook-outline.js';
+
+const CONFIG = {
+  NOTEBOOKS: ['docs-navigation.ipynb', 'education.ipynb', 'blog.ipynb', 'explain.ipynb'],
+  ROUNDS: 40,
+  // Same as the block's DEFAULT_CONFIG
+  MAX_CODE_GROUP_SIZE: 3,
+  CELL_PARSER: path.resolve('blocks/ipynb-viewer/cell-parser.js'),
+};
+
+function parseArgs(argv) {
+  const options = { notebooks: [], rounds: CONFIG.ROUNDS };
+  for (let i = 0; i < argv.length; i += 1) {
+    if (argv[i] === '--rounds') {
+      i += 1;
+      options.rounds = Number(argv[i]);
+    } else {
+      options.notebooks.push(argv[i]);
+    }
+  }
+  if (options.notebooks.length === 0) options.notebooks = CONFIG.NOTEBOOKS;
+  return options;
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.floor(sorted.length / 2)];
+}
+
+async function time(timings, name, work) {
+  const start = performance.now();
+  const result = await work();
+  timings[name].push(performance.now() - start);
+  return result;
+}
+
+async function benchNotebook(file, rounds) {
+  const text = fs.readFileSync(file, 'utf8');
+  const timings = {
+    json: [], outline: [], firstPage: [], all: [], firstVisit: [], repeatVisit: [],
+  };
+  let markdownChars = 0;
+  let pageCount = 0;
+
+  /* eslint-disable no-await-in-loop -- rounds are timed one after another */
+  for (let round = 0; round < rounds; round += 1) {
+    const notebook = await time(timings, 'json', () => JSON.parse(text));
+    const { metadata = {} } = notebook;
+    const repoUrl = metadata.repo || null;
+    const branch = metadata['github-branch'] || 'main';
+
+    const pages = await time(timings, 'outline', () => createPageGroups(
+      outlineNotebookCells(notebook.cells),
+      CONFIG.MAX_CODE_GROUP_SIZE,
+    ));
+    await time(timings, 'firstPage', () => pages[0].outline
+      .filter((entry) => entry.type === 'markdown')
+      .map((entry) => parseCellMarkdown(entry.source, repoUrl, branch)));
+
+    const sources = notebook.cells
+      .filter((cell) => cell.cell_type === 'markdown')
+      .map((cell) => (Array.isArray(cell.source) ? cell.source.join('') : cell.source));
+    await time(timings, 'all', () => sources.map((source) => parseCellMarkdown(source, repoUrl, branch)));
+
+    // A fresh module instance per round starts with an empty cache
+    const { parseMarkdownCells } = await import(`${pathToFileURL(CONFIG.CELL_PARSER).href}?round=${round}`);
+    await time(timings, 'firstVisit', () => parseMarkdownCells(sources, { repoUrl, branch }));
+    await time(timings, 'repeatVisit', () => parseMarkdownCells(sources, { repoUrl, branch }));
+
+    markdownChars = sources.reduce((total, source) => total + source.length, 0);
+    pageCount = pages.length;
+  }
+  /* eslint-enable no-await-in-loop */
+
+  const ms = (name) => median(timings[name]).toFixed(2);
+  return {
+    notebook: path.basename(file),
+    'markdown chars': markdownChars,
+    pages: pageCount,
+    'JSON ms': ms('json'),
+    'outline + pages ms': ms('outline'),
+    'first page parse ms': ms('firstPage'),
+    'all cells parse ms': ms('all'),
+    'cached parse, first visit ms': ms('firstVisit'),
+    'cached parse, repeat visit ms': ms('repeatVisit'),
+  };
+}
+
+async function main() {
+  const { notebooks, rounds } = parseArgs(process.argv.slice(2));
+  console.log(`📓 ipynb-viewer work before the first page, median of ${rounds} rounds (Node ${process.version})\n`);
+
+  const rows = [];
+  for (const notebook of notebooks) {
+    // eslint-disable-next-line no-await-in-loop
+    rows.push(await benchNotebook(notebook, rounds));
+  }
+
+  console.table(rows);
+  console.log('\nBefore the first page: JSON + outline + first page parse. The full parse runs after it.');
+  console.log('Cell DOM, illustrations and the overlay are not included; they need a browser.');
+}
+
+// Run main function
+main();
@@ -0,0 +1,290 @@
+/**
+ * Benchmark the sharded search index against the linear query-index scan
+ * Grows a synthetic corpus from the site's query index (query-index-cleaned.csv)
+ * at 1x, 10x and 100x and replays search-as-you-type keystrokes against:
+ *   - scan: JSON.parse of the whole query index, then the search block's
+ *     original filterData over every row, as the block did per keystroke
+ *   - sharded: scripts/search-index.js over an in-memory copy of the
+ *     built files, counting the bytes each keystroke had to fetch
+ *
+ * Usage:
+ *   node scripts/bench-search-index.js [--source <csv|json>] [--scales 1,10,100]
+ *
+ * @file bench-search-index.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags benchmark, search, performance
+ * @mx:partOf mx-os
+ */
+import fs from 'fs';
+import { performance } from 'perf_hooks';
+import { buildSearchIndex, createSearchIndex } from './search-index.js';
+
+const CONFIG = {
+  SOURCE: 'query-index-cleaned.csv',
+  SCALES: [1, 10, 100],
+  QUERIES: ['adobe', 'edge delivery', 'ai agents', 'content model', 'javascript'],
+  ROUNDS: 5,
+  BASE_URL: 'https://bench.invalid/search-index/',
+};
+
+function parseArgs(argv) {
+  const options = { source: CONFIG.SOURCE, scales: CONFIG.SCALES };
+  for (let i = 0; i < argv.length; i += 1) {
+    if (argv[i] === '--source') {
+      i += 1;
+      options.source = argv[i];
+    } else if (argv[i] === '--scales') {
+      i += 1;
+      options.scales = argv[i].split(',').map(Number);
+    }
+  }
+  return options;
+}
+
+/**
+ * Minimal CSV reader for the exported query index (quoted fields, "" escapes).
+ */
+function parseCsv(text) {
+  const records = [];
+  let record = [];
+  let field = '';
+  let quoted = false;
+  for (let i = 0; i < text.length; i += 1) {
+    const char = text[i];
+    if (quoted) {
+      if (char === '"' && text[i + 1] === '"') {
+        field += '"';
+        i += 1;
+      } else if (char === '"') {
+        quoted = false;
+      } else {
+        field += char;
+      }
+    } else if (char === '"') {
+      quoted = true;
+    } else if (char === ',') {
+      record.push(field);
+      field = '';
+    } else if (char === '\n' || char === '\r') {
+      if (char === '\r' && text[i + 1] === '\n') i += 1;
+      record.push(field);
+      records.push(record);
+      record = [];
+      field = '';
+    } else {
+      field += char;
+    }
+  }
+  if (field || record.length) {
+    record.push(field);
+    records.push(record);
+  }
+  const [header, ...rows] = records.filter((r) => r.length > 1);
+  return rows.map((r) => Object.fromEntries(header.map((name, i) => [name, r[i] || ''])));
+}
+
+function readRows(source) {
+  const text = fs.readFileSync(source, 'utf8');
+  if (source.endsWith('.csv')) return parseCsv(text);
+  const json = JSON.parse(text);
+  return Array.isArray(json) ? json : json.data;
+}
+
+// Small deterministic PRNG so every run builds the same corpus
+function createRandom(seed) {
+  let state = seed;
+  return () => {
+    state = (state * 1103515245 + 12345) % 2147483648;
+    return state / 2147483648;
+  };
+}
+
+/**
+ * Grow the seed rows into a corpus `scale` times larger. Titles and
+ * descriptions are reshuffled seed words, and a share of words get a
+ * numeric suffix so the vocabulary grows with the corpus as a real
+ * site's would.
+ */
+function syntheticCorpus(seedRows, scale) {
+  if (scale === 1) return seedRows;
+  const random = createRandom(scale);
+  const vocabulary = [...new Set(seedRows
+    .flatMap((row) => `${row.title} ${row.description}`.split(/\s+/))
+    .filter((word) => word.length > 2))];
+  const pick = () => {
+    const word = vocabulary[Math.floor(random() * vocabulary.length)];
+    return random() < 0.1 ? `${word}${Math.floor(random() * scale)}` : word;
+  };
+  const words = (count) => Array.from({ length: count }, pick).join(' ');
+
+  const rows = [];
+  for (let copy = 0; copy < scale; copy += 1) {
+    seedRows.forEach((row) => {
+      rows.push(copy === 0 ? row : {
+        ...row,
+        path: `/archive/${copy}${row.path}`,
+        title: random() < 0.5 ? row.title : words(6),
+        description: words(30),
+      });
+    });
+  }
+  return rows;
+}
+
+// The search block's original per-keystroke scan, kept here as the baseline
+function filterData(searchTerms, data) {
+  const foundInHeader = [];
+  const foundInMeta = [];
+  data.forEach((result) => {
+    let minIdx = -1;
+    searchTerms.forEach((term) => {
+      const idx = (result.header || result.title).toLowerCase().indexOf(term);
+      if (idx < 0) return;
+      if (minIdx < idx) minIdx = idx;
+    });
+    if (minIdx >= 0) {
+      foundInHeader.push({ minIdx, result });
+      return;
+    }
+    const metaContents = `${result.title} ${result.description} ${result.path.split('/').pop()}`.toLowerCase();
+    searchTerms.forEach((term) => {
+      const idx = metaContents.indexOf(term);
+      if (idx < 0) return;
+      if (minIdx < idx) minIdx = idx;
+    });
+    if (minIdx >= 0) foundInMeta.push({ minIdx, result });
+  });
+  const compare = (a, b) => a.minIdx - b.minIdx;
+  return [...foundInHeader.sort(compare), ...foundInMeta.sort(compare)].map((item) => item.result);
+}
+
+// Every keystroke from the third character on, as the block searches
+function keystrokes(query) {
+  const strokes = [];
+  for (let i = 3; i <= query.length; i += 1) {
+    const value = query.slice(0, i);
+    strokes.push(value.toLowerCase().split(/\s+/).filter((term) => !!term));
+  }
+  return strokes;
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.floor(sorted.length / 2)];
+}
+
+function serialiseIndex(index) {
+  const files = new Map();
+  const manifest = { ...index.manifest };
+  manifest.shards = index.shards.map((shard, i) => {
+    files.set(`shard-${i}.json`, JSON.stringify(shard));
+    return { ...index.manifest.shards[i], file: `shard-${i}.json` };
+  });
+  manifest.docChunks = index.docChunks.map((chunk, i) => {
+    files.set(`docs-${i}.json`, JSON.stringify(chunk));
+    return { file: `docs-${i}.json` };
+  });
+  files.set('manifest.json', JSON.stringify(manifest));
+  return files;
+}
+
+async function benchScale(seedRows, scale) {
+  const rows = syntheticCorpus(seedRows, scale);
+  const queryIndexJson = JSON.stringify({ data: rows });
+  const strokes = CONFIG.QUERIES.flatMap(keystrokes);
+
+  // Linear scan: parse once per keystroke, as the block did before
+  const scanTimes = [];
+  for (let round = 0; round < CONFIG.ROUNDS; round += 1) {
+    strokes.forEach((terms) => {
+      const start = performance.now();
+      filterData(terms, JSON.parse(queryIndexJson).data);
+      scanTimes.push(performance.now() - start);
+    });
+  }
+  // Linear scan with the rows already parsed (query-index data layer)
+  const parsed = JSON.parse(queryIndexJson).data;
+  const scanParsedTimes = [];
+  for (let round = 0; round < CONFIG.ROUNDS; round += 1) {
+    strokes.forEach((terms) => {
+      const start = performance.now();
+      filterData(terms, parsed);
+      scanParsedTimes.push(performance.now() - start);
+    });
+  }
+
+  const buildStart = performance.now();
+  const files = serialiseIndex(buildSearchIndex(rows));
+  const buildMs = performance.now() - buildStart;
+  const indexBytes = [...files.values()].reduce((sum, body) => sum + body.length, 0);
+
+  // Sharded: a fresh engine per query replays a cold page, so fetched
+  // bytes are what one visitor would download for that query
+  const coldBytes = [];
+  const shardedTimes = [];
+  /* eslint-disable no-await-in-loop -- keystrokes are timed one after another */
+  for (let round = 0; round < CONFIG.ROUNDS; round += 1) {
+    for (const query of CONFIG.QUERIES) {
+      let fetched = 0;
+      const engine = createSearchIndex(`${CONFIG.BASE_URL}manifest.json`, async (url) => {
+        const body = files.get(url.slice(CONFIG.BASE_URL.length));
+        fetched += body.length;
+        return JSON.parse(body);
+      });
+      for (const terms of keystrokes(query)) {
+        const start = performance.now();
+        await engine.search(terms);
+        shardedTimes.push(performance.now() - start);
+      }
+      if (round === 0) coldBytes.push(fetched);
+    }
+  }
+  /* eslint-enable no-await-in-loop */
+
+  return {
+    scale,
+    docs: rows.length,
+    queryIndexKb: queryIndexJson.length / 1024,
+    scanMs: median(scanTimes),
+    scanParsedMs: median(scanParsedTimes),
+    buildMs,
+    indexKb: indexBytes / 1024,
+    shards: files.size,
+    fetchedKb: median(coldBytes) / 1024,
+    shardedMs: median(shardedTimes),
+  };
+}
+
+async function main() {
+  const { source, scales } = parseArgs(process.argv.slice(2));
+  const seedRows = readRows(source);
+  console.log(`🔎 Search benchmark, ${seedRows.length} seed rows from ${source}`);
+  console.log(`Queries: ${CONFIG.QUERIES.join(', ')} (typed from the third character, median per keystroke)\n`);
+
+  const results = [];
+  for (const scale of scales) {
+    // eslint-disable-next-line no-await-in-loop
+    results.push(await benchScale(seedRows, scale));
+  }
+
+  console.table(results.map((r) => ({
+    scale: `${r.scale}x`,
+    docs: r.docs,
+    'query-index KB': r.queryIndexKb.toFixed(0),
+    'scan+parse ms': r.scanMs.toFixed(2),
+    'scan ms': r.scanParsedMs.toFixed(2),
+    'index build ms': r.buildMs.toFixed(0),
+    'index KB (total)': r.indexKb.toFixed(0),
+    files: r.shards,
+    'KB fetched / query': r.fetchedKb.toFixed(0),
+    'sharded ms': r.shardedMs.toFixed(3),
+  })));
+}
+
+// Run main function
+main();
@@ -0,0 +1,135 @@
+/**
+ * Build the sharded search index for the search block
+ * Reads a query-index.json (URL or local file) and writes manifest.json,
+ * token shards and document chunks to the output folder. Shard and chunk
+ * file names carry a content hash, so manifest.json is the only file whose
+ * content changes under the same name, and a cached old shard is never
+ * read against a new manifest.
+ *
+ * manifest.json records when the source last changed (its Last-Modified
+ * header, or the newest row lastModified for a local file). The search
+ * block compares it with the live query index and scans the query index
+ * instead while this index is out of date, so rebuild after publishing.
+ *
+ * Usage:
+ *   node scripts/build-search-index.js [--source <url|file>] [--out <dir>]
+ *
+ * @file build-search-index.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags generator, search
+ * @mx:partOf mx-os
+ */
+import fs from 'fs';
+import path from 'path';
+import { createHash } from 'crypto';
+import { buildSearchIndex } from './search-index.js';
+
+const CONFIG = {
+  SOURCE: 'https://allabout.network/query-index.json',
+  OUTPUT_DIR: 'search-index',
+  GENERATED_FILE: /^(shard|docs)-\d+-[0-9a-f]{8}\.json$/,
+};
+
+function parseArgs(argv) {
+  const options = { source: CONFIG.SOURCE, out: CONFIG.OUTPUT_DIR };
+  for (let i = 0; i < argv.length; i += 1) {
+    if (argv[i] === '--source') {
+      i += 1;
+      options.source = argv[i];
+    } else if (argv[i] === '--out') {
+      i += 1;
+      options.out = argv[i];
+    }
+  }
+  return options;
+}
+
+/**
+ * Read the query-index rows, and when the source last changed if it says
+ * (Last-Modified header of a URL source).
+ * @returns {Promise<{rows: Array<object>, lastModified: number|null}>}
+ */
+async function readRows(source) {
+  let json;
+  let lastModified = null;
+  if (/^https?:\/\//.test(source)) {
+    const response = await fetch(source);
+    if (!response.ok) throw new Error(`${source} returned ${response.status}`);
+    lastModified = Date.parse(response.headers.get('Last-Modified')) || null;
+    json = await response.json();
+  } else {
+    json = JSON.parse(fs.readFileSync(source, 'utf8'));
+  }
+  const rows = Array.isArray(json) ? json : json.data;
+  if (!Array.isArray(rows)) throw new Error(`${source} has no data array`);
+  return { rows, lastModified };
+}
+
+function hashedName(prefix, index, body) {
+  const hash = createHash('sha1').update(body).digest('hex').slice(0, 8);
+  return `${prefix}-${index}-${hash}.json`;
+}
+
+/**
+ * Write a built index to a folder, removing shard and chunk files left
+ * over from earlier builds.
+ * @param {object} index - from buildSearchIndex
+ * @param {string} outDir
+ * @returns {number} total bytes written
+ */
+function writeSearchIndex(index, outDir) {
+  fs.mkdirSync(outDir, { recursive: true });
+  const written = new Set();
+  let bytes = 0;
+
+  function write(name, body) {
+    fs.writeFileSync(path.join(outDir, name), body, 'utf8');
+    written.add(name);
+    bytes += Buffer.byteLength(body);
+  }
+
+  const manifest = { ...index.manifest, generated: new Date().toISOString() };
+  manifest.shards = index.shards.map((shard, i) => {
+    const body = JSON.stringify(shard);
+    const file = hashedName('shard', i, body);
+    write(file, body);
+    return { ...index.manifest.shards[i], file };
+  });
+  manifest.docChunks = index.docChunks.map((chunk, i) => {
+    const body = JSON.stringify(chunk);
+    const file = hashedName('docs', i, body);
+    write(file, body);
+    return { file };
+  });
+  write('manifest.json', `${JSON.stringify(manifest, null, 2)}\n`);
+
+  fs.readdirSync(outDir)
+    .filter((file) => CONFIG.GENERATED_FILE.test(file) && !written.has(file))
+    .forEach((file) => fs.unlinkSync(path.join(outDir, file)));
+
+  return bytes;
+}
+
+async function main() {
+  const { source, out } = parseArgs(process.argv.slice(2));
+  console.log(`🔎 Building search index from ${source}...\n`);
+
+  try {
+    const { rows, lastModified } = await readRows(source);
+    const index = buildSearchIndex(rows, lastModified ? { sourceLastModified: lastModified } : {});
+    const bytes = writeSearchIndex(index, out);
+    console.log(`✅ ${rows.length} documents, ${index.shards.length} shards, ${index.docChunks.length} document chunks`);
+    console.log(`${(bytes / 1024).toFixed(1)} KB written to ${out}/`);
+  } catch (error) {
+    console.error('❌ Error building search index:', error.message);
+    process.exit(1);
+  }
+}
+
+// Run main function
+main();
@@ -0,0 +1,357 @@
+/**
+ * Shared query-index data layer
+ * Loads a query-index.json once per page for every block that needs it,
+ * keeps the parsed rows in IndexedDB for the next page load, and offers
+ * prefix, series and lastModified lookups built once over the rows.
+ *
+ * Loading works stale-while-revalidate:
+ *   - rows stored less than FRESH_MS ago are used without a request
+ *   - rows stored less than MAX_STALE_MS ago are used straight away and
+ *     refreshed in the background; the refresh serves later callers on
+ *     this page and the next page load
+ *   - anything older, or no stored copy, waits for the network
+ * When the network fails, any stored copy is used regardless of age.
+ *
+ * Rows are shared between blocks. Treat them as read-only and copy a row
+ * before adding fields to it.
+ *
+ * @file query-index.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, performance
+ * @mx:partOf mx-os
+ */
+
+const QUERY_INDEX_CONFIG = {
+  DEFAULT_SOURCE: '/query-index.json',
+  DB_NAME: 'mx-query-index',
+  DB_VERSION: 1,
+  STORE_NAME: 'indexes',
+  FRESH_MS: 5 * 60 * 1000,
+  MAX_STALE_MS: 24 * 60 * 60 * 1000,
+  FETCH_TIMEOUT_MS: 8000,
+};
+
+// Loaded or in-flight indexes for this page, keyed by absolute URL
+const loadedIndexes = new Map();
+
+let databasePromise = null;
+
+/**
+ * Resolve a source path to the absolute URL used as the cache key,
+ * so '/query-index.json' and a block link to the same file share a load.
+ */
+function resolveSource(source) {
+  const url = new URL(source || QUERY_INDEX_CONFIG.DEFAULT_SOURCE, window.location.href);
+  url.hash = '';
+  return url.href;
+}
+
+/**
+ * Split a title and path into series name, part number and directory.
+ * "Building Blocks - Part 2" at /blogs/ddt/blocks-2 is part 2 of
+ * "Building Blocks" in /blogs/ddt.
+ * @param {object} row - query-index row
+ * @returns {{key: string, name: string, part: number|null, basePath: string}}
+ */
+export function getSeriesInfo(row) {
+  const title = typeof row.title === 'string' ? row.title : '';
+  const path = typeof row.path === 'string' ? row.path : '';
+  const match = title.match(/^(.*?)\s*-?\s*Part\s*(\d+)$/i);
+  const name = match ? match[1].trim() : title;
+  const basePath = path.split('/').slice(0, -1).join('/');
+  return {
+    key: `${basePath}/${name}`,
+    name,
+    part: match ? parseInt(match[2], 10) : null,
+    basePath,
+  };
+}
+
+/**
+ * Directory prefixes of a path, each ending in '/':
+ * /blogs/ddt/post -> ['/', '/blogs/', '/blogs/ddt/']
+ */
+function directoryPrefixes(path) {
+  const prefixes = [];
+  let end = path.indexOf('/');
+  while (end !== -1) {
+    prefixes.push(path.slice(0, end + 1));
+    end = path.indexOf('/', end + 1);
+  }
+  return prefixes;
+}
+
+function addToIndex(index, key, row) {
+  const rows = index.get(key);
+  if (rows) {
+    rows.push(row);
+  } else {
+    index.set(key, [row]);
+  }
+}
+
+function asList(value) {
+  if (value === undefined || value === null) return [];
+  return Array.isArray(value) ? value : [value];
+}
+
+/**
+ * Build the lookups over a set of rows. Each lookup is built on first use
+ * and kept for the life of the index, so a page pays for it at most once.
+ * @param {Array<object>} rows - query-index rows
+ * @returns {object} index with rows, lookups and query()
+ */
+export function buildQueryIndex(rows) {
+  let prefixIndex = null;
+  let seriesIndex = null;
+  let seriesByRow = null;
+  let newestFirst = null;
+
+  function buildSeries() {
+    seriesIndex = new Map();
+    seriesByRow = new Map();
+    rows.forEach((row) => {
+      const info = getSeriesInfo(row);
+      seriesByRow.set(row, info);
+      addToIndex(seriesIndex, info.key, row);
+    });
+  }
+
+  /**
+   * Rows whose path starts with prefix, in index order. The array is
+   * shared with later callers, so copy it before sorting or editing.
+   * Directory prefixes ending in '/' are a map lookup; anything else
+   * falls back to a scan.
+   */
+  function byPrefix(prefix) {
+    if (!prefix.endsWith('/')) {
+      return rows.filter((row) => typeof row.path === 'string' && row.path.startsWith(prefix));
+    }
+    if (!prefixIndex) {
+      prefixIndex = new Map();
+      rows.forEach((row) => {
+        if (typeof row.path !== 'string') return;
+        directoryPrefixes(row.path).forEach((dir) => addToIndex(prefixIndex, dir, row));
+      });
+    }
+    return prefixIndex.get(prefix) || [];
+  }
+
+  /**
+   * Series information for a row of this index.
+   */
+  function seriesOf(row) {
+    if (!seriesByRow) buildSeries();
+    return seriesByRow.get(row) || getSeriesInfo(row);
+  }
+
+  /**
+   * Rows in a series, keyed as getSeriesInfo(row).key, in index order.
+   * The array is shared, as for byPrefix.
+   */
+  function bySeries(key) {
+    if (!seriesIndex) buildSeries();
+    return seriesIndex.get(key) || [];
+  }
+
+  /**
+   * Rows sorted newest first by lastModified. The array is shared,
+   * as for byPrefix.
+   */
+  function byLastModified() {
+    if (!newestFirst) {
+      newestFirst = [...rows].sort(
+        (a, b) => (Number(b.lastModified) || 0) - (Number(a.lastModified) || 0),
+      );
+    }
+    return newestFirst;
+  }
+
+  /**
+   * Select rows. Every option is optional; results are a new array.
+   * @param {object} [options]
+   * @param {string} [options.prefix] - path starts with this
+   * @param {string|Array<string>} [options.pathIncludes] - path contains any of these
+   * @param {string|Array<string>} [options.exclude] - leave out these paths
+   * @param {string} [options.series] - series key from getSeriesInfo
+   * @param {string} [options.sort] - 'lastModified' (newest first) or 'title'
+   * @param {number} [options.limit] - maximum rows to return
+   * @returns {Array<object>}
+   */
+  function query(options = {}) {
+    const {
+      prefix, pathIncludes, exclude, series, sort, limit,
+    } = options;
+
+    let source = rows;
+    let checkPrefix = false;
+    if (series !== undefined) {
+      source = bySeries(series);
+      checkPrefix = prefix !== undefined;
+    } else if (prefix !== undefined) {
+      source = byPrefix(prefix);
+    }
+    const presorted = sort === 'lastModified' && source === rows;
+    if (presorted) source = byLastModified();
+
+    const includes = asList(pathIncludes);
+    const excluded = new Set(asList(exclude));
+    let results = source.filter((row) => {
+      const path = typeof row.path === 'string' ? row.path : '';
+      if (checkPrefix && !path.startsWith(prefix)) return false;
+      if (includes.length > 0 && !includes.some((term) => path.includes(term))) return false;
+      return !excluded.has(row.path);
+    });
+
+    if (sort === 'lastModified' && !presorted) {
+      results.sort((a, b) => (Number(b.lastModified) || 0) - (Number(a.lastModified) || 0));
+    } else if (sort === 'title') {
+      results.sort((a, b) => String(a.title || '').localeCompare(String(b.title || '')));
+    }
+    if (limit !== undefined) results = results.slice(0, limit);
+    return results;
+  }
+
+  return {
+    rows,
+    byPrefix,
+    bySeries,
+    seriesOf,
+    byLastModified,
+    query,
+  };
+}
+
+/**
+ * Open the IndexedDB store, or resolve null where IndexedDB is missing
+ * or refused (private browsing, blocked storage).
+ */
+function openDatabase() {
+  if (!databasePromise) {
+    databasePromise = new Promise((resolve) => {
+      if (!window.indexedDB) {
+        resolve(null);
+        return;
+      }
+      try {
+        const request = window.indexedDB.open(QUERY_INDEX_CONFIG.DB_NAME, QUERY_INDEX_CONFIG.DB_VERSION);
+        request.onupgradeneeded = () => {
+          request.result.createObjectStore(QUERY_INDEX_CONFIG.STORE_NAME, { keyPath: 'url' });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+        request.onblocked = () => resolve(null);
+      } catch (error) {
+        resolve(null);
+      }
+    });
+  }
+  return databasePromise;
+}
+
+async function readStoredIndex(url) {
+  const db = await openDatabase();
+  if (!db) return null;
+  return new Promise((resolve) => {
+    try {
+      const request = db.transaction(QUERY_INDEX_CONFIG.STORE_NAME, 'readonly')
+        .objectStore(QUERY_INDEX_CONFIG.STORE_NAME)
+        .get(url);
+      request.onsuccess = () => resolve(request.result || null);
+      request.onerror = () => resolve(null);
+    } catch (error) {
+      resolve(null);
+    }
+  });
+}
+
+async function writeStoredIndex(url, rows) {
+  const db = await openDatabase();
+  if (!db) return;
+  try {
+    db.transaction(QUERY_INDEX_CONFIG.STORE_NAME, 'readwrite')
+      .objectStore(QUERY_INDEX_CONFIG.STORE_NAME)
+      .put({ url, rows, storedAt: Date.now() });
+  } catch (error) {
+    // Quota or a closed connection - the next load simply fetches again
+  }
+}
+
+async function fetchRows(url) {
+  const response = await fetch(url, {
+    headers: { Accept: 'application/json' },
+    signal: AbortSignal.timeout ? AbortSignal.timeout(QUERY_INDEX_CONFIG.FETCH_TIMEOUT_MS) : undefined,
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to load ${url}: ${response.status}`);
+  }
+  const json = await response.json();
+  const rows = json && json.data;
+  if (!Array.isArray(rows)) {
+    throw new Error(`Invalid query index at ${url}: expected a data array`);
+  }
+  writeStoredIndex(url, rows);
+  return rows;
+}
+
+function revalidate(url) {
+  fetchRows(url)
+    .then((rows) => loadedIndexes.set(url, Promise.resolve(buildQueryIndex(rows))))
+    .catch((error) => {
+      // eslint-disable-next-line no-console
+      console.warn('query-index: background refresh failed', error);
+    });
+}
+
+async function loadIndex(url) {
+  const stored = await readStoredIndex(url);
+  const age = stored ? Date.now() - stored.storedAt : Infinity;
+
+  if (stored && age < QUERY_INDEX_CONFIG.MAX_STALE_MS) {
+    if (age >= QUERY_INDEX_CONFIG.FRESH_MS) revalidate(url);
+    return buildQueryIndex(stored.rows);
+  }
+
+  try {
+    return buildQueryIndex(await fetchRows(url));
+  } catch (error) {
+    if (stored) return buildQueryIndex(stored.rows);
+    throw error;
+  }
+}
+
+/**
+ * Load a query index. Every caller on the page asking for the same URL
+ * shares one request and one parse. A failed load is forgotten so the
+ * next caller can try again.
+ * @param {string} [source] - path or URL, defaults to /query-index.json
+ * @returns {Promise<object>} index from buildQueryIndex
+ */
+export function loadQueryIndex(source = QUERY_INDEX_CONFIG.DEFAULT_SOURCE) {
+  const url = resolveSource(source);
+  let entry = loadedIndexes.get(url);
+  if (!entry) {
+    entry = loadIndex(url);
+    loadedIndexes.set(url, entry);
+    entry.catch(() => {
+      if (loadedIndexes.get(url) === entry) loadedIndexes.delete(url);
+    });
+  }
+  return entry;
+}
+
+/**
+ * Load an index and run one query against it.
+ * @param {string} [source] - path or URL, defaults to /query-index.json
+ * @param {object} [options] - see query() in buildQueryIndex
+ * @returns {Promise<Array<object>>}
+ */
+export async function queryIndex(source, options) {
+  const index = await loadQueryIndex(source);
+  return index.query(options);
+}
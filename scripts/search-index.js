@@ -0,0 +1,442 @@
+/**
+ * Sharded inverted search index
+ * Shared by the build script (scripts/build-search-index.js), the search
+ * block's worker and the benchmark, so all three tokenise the same way.
+ *
+ * The index is a sorted token dictionary cut into contiguous range shards
+ * of roughly SHARD_TARGET_BYTES. A query term is a token prefix, so it
+ * only needs the shards whose range can hold tokens starting with it.
+ * Each token maps to a postings string: pairs of numbers [docGap, position]
+ * written as base-32 varints (encodePostings), so a posting usually costs
+ * three characters. docGap is the document id minus the previous one in
+ * the list (the first is the id itself), position = offset * 2 + field
+ * and offset is the first character the token starts at in that field:
+ *   - field 0: header (or title)
+ *   - field 1: the rest of "title description last-path-segment"
+ * Document rows hold only what a result shows: path, title, a description
+ * snippet of up to SNIPPET_LENGTH characters and the image path without
+ * its query string. They live in chunks of DOC_CHUNK_SIZE and are loaded
+ * only for the page of results being shown.
+ *
+ * The manifest records when its source query index last changed
+ * (sourceLastModified), so a page can tell that posts were published
+ * after the index was built and scan the query index instead.
+ *
+ * Ranking follows the original linear scan: rows with a hit in the
+ * header come before rows with a hit elsewhere, and within each group
+ * rows whose furthest matched term sits nearer the start come first.
+ *
+ * @file search-index.js
+ * @version 1.0
+ * @author Tom Cranstoun
+ *
+ * @mx:category mx-tools
+ * @mx:status active
+ * @mx:contentType script
+ * @mx:tags tool, search, performance
+ * @mx:partOf mx-os
+ */
+
+export const SEARCH_INDEX_CONFIG = {
+  FORMAT_VERSION: 2,
+  SHARD_TARGET_BYTES: 8 * 1024,
+  DOC_CHUNK_SIZE: 8,
+  PAGE_SIZE: 10,
+  SNIPPET_LENGTH: 120,
+};
+
+// Varint digits: the first 32 end a number, the last 32 continue it
+const VARINT_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVabcdefghijklmnopqrstuvwxyz-_WXYZ';
+const VARINT_VALUES = new Map([...VARINT_DIGITS].map((digit, value) => [digit, value]));
+
+const HEADER_FIELD = 0;
+const META_FIELD = 1;
+const TOKEN_PATTERN = /[\p{L}\p{N}]+/gu;
+
+/**
+ * Split text into lowercase tokens with their character offsets.
+ * @param {string} text
+ * @returns {Array<{token: string, offset: number}>}
+ */
+export function tokenize(text) {
+  const tokens = [];
+  if (!text) return tokens;
+  const lower = String(text).toLowerCase();
+  for (const match of lower.matchAll(TOKEN_PATTERN)) {
+    tokens.push({ token: match[0], offset: match.index });
+  }
+  return tokens;
+}
+
+/**
+ * Turn the typed search terms into token prefixes, dropping duplicates.
+ * @param {Array<string>} terms - lowercase search terms
+ * @returns {Array<string>}
+ */
+export function queryPrefixes(terms) {
+  const prefixes = new Set();
+  terms.forEach((term) => tokenize(term).forEach(({ token }) => prefixes.add(token)));
+  return [...prefixes];
+}
+
+function lastPathSegment(path) {
+  return typeof path === 'string' ? path.split('/').pop() : '';
+}
+
+/**
+ * Shorten a description to at most length characters, cut at a word.
+ * @param {string} text
+ * @param {number} length
+ * @returns {string}
+ */
+export function snippet(text, length = SEARCH_INDEX_CONFIG.SNIPPET_LENGTH) {
+  const value = String(text || '').trim();
+  if (value.length <= length) return value;
+  const cut = value.lastIndexOf(' ', length - 1);
+  return `${value.slice(0, cut > 0 ? cut : length - 1).trimEnd()}…`;
+}
+
+/**
+ * Image path without query string or fragment; the block builds its own
+ * rendition parameters.
+ */
+function imagePath(image) {
+  return typeof image === 'string' ? image.split(/[?#]/)[0] : '';
+}
+
+/**
+ * When a set of query-index rows last changed, in milliseconds: the newest
+ * row lastModified, which query indexes store in seconds.
+ * @param {Array<object>} rows - query-index rows
+ * @returns {number} 0 when no row has a lastModified
+ */
+export function rowsLastModified(rows) {
+  return rows.reduce((newest, row) => {
+    const value = Number(row.lastModified) || 0;
+    return Math.max(newest, value < 1e12 ? value * 1000 : value);
+  }, 0);
+}
+
+/**
+ * Record the first offset of each token in a field for one document.
+ */
+function addPostings(dictionary, docId, field, text, skipBefore = 0) {
+  const seen = new Set();
+  tokenize(text).forEach(({ token, offset }) => {
+    if (offset < skipBefore || seen.has(token)) return;
+    seen.add(token);
+    let postings = dictionary.get(token);
+    if (!postings) {
+      postings = [];
+      dictionary.set(token, postings);
+    }
+    postings.push(docId, offset * 2 + field);
+  });
+}
+
+/**
+ * Write non-negative integers as base-32 varints, most significant
+ * group first.
+ * @param {Array<number>} numbers
+ * @returns {string}
+ */
+export function encodePostings(numbers) {
+  let text = '';
+  numbers.forEach((number) => {
+    let digits = VARINT_DIGITS[number % 32];
+    for (let rest = Math.floor(number / 32); rest > 0; rest = Math.floor(rest / 32)) {
+      digits = VARINT_DIGITS[32 + (rest % 32)] + digits;
+    }
+    text += digits;
+  });
+  return text;
+}
+
+/**
+ * Read numbers written by encodePostings.
+ * @param {string} text
+ * @returns {Array<number>}
+ */
+export function decodePostings(text) {
+  const numbers = [];
+  let value = 0;
+  for (let i = 0; i < text.length; i += 1) {
+    const digit = VARINT_VALUES.get(text[i]);
+    value = value * 32 + (digit % 32);
+    if (digit < 32) {
+      numbers.push(value);
+      value = 0;
+    }
+  }
+  return numbers;
+}
+
+/**
+ * Postings string with absolute document ids replaced by gaps from the
+ * previous posting.
+ */
+function gapEncode(postings) {
+  const gaps = postings.slice();
+  for (let p = gaps.length - 2; p > 0; p -= 2) gaps[p] -= gaps[p - 2];
+  return encodePostings(gaps);
+}
+
+/**
+ * Build the sharded index from query-index rows.
+ * @param {Array<object>} rows - query-index rows
+ * @param {object} [options]
+ * @param {number} [options.shardTargetBytes]
+ * @param {number} [options.docChunkSize]
+ * @param {number} [options.sourceLastModified] - when the source last changed,
+ *   in milliseconds; defaults to the newest row lastModified
+ * @returns {{manifest: object, shards: Array<object>, docChunks: Array<Array>}}
+ *   manifest.shards and manifest.docChunks hold no file names yet; the
+ *   writer adds a `file` to each entry.
+ */
+export function buildSearchIndex(rows, options = {}) {
+  const {
+    shardTargetBytes = SEARCH_INDEX_CONFIG.SHARD_TARGET_BYTES,
+    docChunkSize = SEARCH_INDEX_CONFIG.DOC_CHUNK_SIZE,
+    sourceLastModified = rowsLastModified(rows),
+  } = options;
+
+  const dictionary = new Map();
+  rows.forEach((row, docId) => {
+    const title = row.title || '';
+    const header = row.header || title;
+    addPostings(dictionary, docId, HEADER_FIELD, header);
+    // The linear scan matched "title description segment"; when the header
+    // is the title, a title match is already a header hit, so skip it here
+    const meta = `${title} ${row.description || ''} ${lastPathSegment(row.path)}`;
+    addPostings(dictionary, docId, META_FIELD, meta, header === title ? title.length : 0);
+  });
+
+  const tokens = [...dictionary.keys()].sort();
+  const shards = [];
+  let current = null;
+  tokens.forEach((token) => {
+    const postings = gapEncode(dictionary.get(token));
+    // Rough JSON size: two quoted strings and their commas
+    const bytes = token.length + postings.length + 6;
+    if (!current || (current.bytes + bytes > shardTargetBytes && current.tokens.length > 0)) {
+      current = { tokens: [], postings: [], bytes: 0 };
+      shards.push(current);
+    }
+    current.tokens.push(token);
+    current.postings.push(postings);
+    current.bytes += bytes;
+  });
+
+  const docChunks = [];
+  for (let start = 0; start < rows.length; start += docChunkSize) {
+    docChunks.push(rows.slice(start, start + docChunkSize).map((row) => [
+      row.path || '',
+      row.title || '',
+      snippet(row.description),
+      imagePath(row.image),
+    ]));
+  }
+
+  return {
+    manifest: {
+      version: SEARCH_INDEX_CONFIG.FORMAT_VERSION,
+      docCount: rows.length,
+      sourceLastModified,
+      docChunkSize,
+      shards: shards.map((shard) => ({ first: shard.tokens[0] })),
+      docChunks: docChunks.map(() => ({})),
+    },
+    shards: shards.map(({ tokens: shardTokens, postings }) => ({ tokens: shardTokens, postings })),
+    docChunks,
+  };
+}
+
+/**
+ * Indexes of the shards that can hold tokens starting with prefix.
+ * Shards are contiguous ranges sorted by their first token.
+ * @param {Array<{first: string}>} shards - manifest.shards
+ * @param {string} prefix
+ * @returns {Array<number>}
+ */
+export function shardsForPrefix(shards, prefix) {
+  let low = 0;
+  let high = shards.length - 1;
+  let start = 0;
+  while (low <= high) {
+    const mid = Math.floor((low + high) / 2);
+    if (shards[mid].first <= prefix) {
+      start = mid;
+      low = mid + 1;
+    } else {
+      high = mid - 1;
+    }
+  }
+  const matches = [start];
+  for (let i = start + 1; i < shards.length; i += 1) {
+    if (!shards[i].first.startsWith(prefix)) break;
+    matches.push(i);
+  }
+  return matches;
+}
+
+function lowerBound(sorted, value) {
+  let low = 0;
+  let high = sorted.length;
+  while (low < high) {
+    const mid = Math.floor((low + high) / 2);
+    if (sorted[mid] < value) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
+
+/**
+ * Earliest offset per document and field for tokens starting with prefix.
+ * @returns {Map<number, Array<number>>} doc -> [headerOffset, metaOffset]
+ */
+function collectPrefixHits(shards, prefix) {
+  const hits = new Map();
+  shards.forEach((shard) => {
+    for (let i = lowerBound(shard.tokens, prefix); i < shard.tokens.length; i += 1) {
+      if (!shard.tokens[i].startsWith(prefix)) break;
+      const postings = decodePostings(shard.postings[i]);
+      let doc = 0;
+      for (let p = 0; p < postings.length; p += 2) {
+        doc += postings[p];
+        const field = postings[p + 1] % 2;
+        const offset = (postings[p + 1] - field) / 2;
+        let best = hits.get(doc);
+        if (!best) {
+          best = [-1, -1];
+          hits.set(doc, best);
+        }
+        if (best[field] < 0 || offset < best[field]) best[field] = offset;
+      }
+    }
+  });
+  return hits;
+}
+
+/**
+ * Rank documents for a set of prefixes, as the linear scan did:
+ * header hits first, then meta hits, each ordered by the largest matched
+ * offset, then by document order.
+ * @param {Array<Map>} hitsPerPrefix - from collectPrefixHits
+ * @returns {Array<number>} document ids
+ */
+function rankHits(hitsPerPrefix) {
+  const scores = new Map();
+  hitsPerPrefix.forEach((hits) => {
+    hits.forEach(([header, meta], doc) => {
+      let score = scores.get(doc);
+      if (!score) {
+        score = [-1, -1];
+        scores.set(doc, score);
+      }
+      if (header > score[HEADER_FIELD]) score[HEADER_FIELD] = header;
+      if (meta > score[META_FIELD]) score[META_FIELD] = meta;
+    });
+  });
+
+  const inHeader = [];
+  const inMeta = [];
+  scores.forEach(([header, meta], doc) => {
+    if (header >= 0) inHeader.push([header, doc]);
+    else if (meta >= 0) inMeta.push([meta, doc]);
+  });
+  const byOffset = (a, b) => a[0] - b[0] || a[1] - b[1];
+  return [...inHeader.sort(byOffset), ...inMeta.sort(byOffset)].map(([, doc]) => doc);
+}
+
+/**
+ * Create a query engine over a built index. Shards and document chunks
+ * are fetched through loadJson the first time a query needs them and
+ * kept for later queries.
+ * @param {string|URL} manifestUrl - URL of manifest.json; file names resolve against it
+ * @param {function(string): Promise<object>} loadJson - fetches and parses a URL
+ * @returns {{search: function, stats: function}}
+ */
+export function createSearchIndex(manifestUrl, loadJson) {
+  const baseUrl = new URL('.', manifestUrl);
+  const manifestPromise = loadJson(String(manifestUrl)).then((manifest) => {
+    if (!manifest || manifest.version !== SEARCH_INDEX_CONFIG.FORMAT_VERSION) {
+      throw new Error(`Unsupported search index at ${manifestUrl}`);
+    }
+    return manifest;
+  });
+  const shards = new Map();
+  const docChunks = new Map();
+  const loaded = { shards: 0, docChunks: 0 };
+
+  function loadOnce(cache, index, file, counter) {
+    if (!cache.has(index)) {
+      const promise = loadJson(new URL(file, baseUrl).href);
+      cache.set(index, promise);
+      promise.then(() => { loaded[counter] += 1; }, () => cache.delete(index));
+    }
+    return cache.get(index);
+  }
+
+  async function loadDocs(manifest, docIds) {
+    const chunkIds = [...new Set(docIds.map((doc) => Math.floor(doc / manifest.docChunkSize)))];
+    const chunks = await Promise.all(chunkIds.map(
+      (chunk) => loadOnce(docChunks, chunk, manifest.docChunks[chunk].file, 'docChunks'),
+    ));
+    const byChunk = new Map(chunkIds.map((chunk, i) => [chunk, chunks[i]]));
+    return docIds.map((doc) => {
+      const [path, title, description, image] = byChunk
+        .get(Math.floor(doc / manifest.docChunkSize))[doc % manifest.docChunkSize];
+      return {
+        path, title, description, image,
+      };
+    });
+  }
+
+  /**
+   * Find rows for the typed search terms.
+   * @param {Array<string>} terms - lowercase search terms
+   * @param {object} [options]
+   * @param {number} [options.offset] - ranked rows to skip
+   * @param {number} [options.limit] - rows to return
+   * @param {function(): boolean} [options.isStale] - checked before loading
+   *   document rows; when it returns true the search stops with no results
+   * @returns {Promise<{results: Array<object>, total: number,
+   *   sourceLastModified: number, stale?: boolean}>} sourceLastModified comes
+   *   from the manifest (0 when unknown), so callers can check the index is
+   *   current without loading the manifest again
+   */
+  async function search(terms, options = {}) {
+    const {
+      offset = 0,
+      limit = SEARCH_INDEX_CONFIG.PAGE_SIZE,
+      isStale = () => false,
+    } = options;
+    const manifest = await manifestPromise;
+    const prefixes = queryPrefixes(terms);
+    const needed = prefixes.map((prefix) => shardsForPrefix(manifest.shards, prefix));
+    const shardIds = [...new Set(needed.flat())];
+    const loadedShards = await Promise.all(shardIds.map(
+      (id) => loadOnce(shards, id, manifest.shards[id].file, 'shards'),
+    ));
+    const shardById = new Map(shardIds.map((id, i) => [id, loadedShards[i]]));
+
+    const ranked = rankHits(prefixes.map(
+      (prefix, i) => collectPrefixHits(needed[i].map((id) => shardById.get(id)), prefix),
+    ));
+    // A newer keystroke has arrived; its results are the ones worth fetching
+    const sourceLastModified = manifest.sourceLastModified || 0;
+    if (isStale()) {
+      return {
+        results: [], total: ranked.length, sourceLastModified, stale: true,
+      };
+    }
+    const results = await loadDocs(manifest, ranked.slice(offset, offset + limit));
+    return { results, total: ranked.length, sourceLastModified };
+  }
+
+  function stats() {
+    return { ...loaded };
+  }
+
+  return { search, stats };
+}
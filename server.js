@@ -11,18 +11,49 @@
  * @mx:partOf mx-os
  */
 /*eslint-disable no-console*/
-import { createServer } from 'http';
-import { readFile, access } from 'fs/promises';
-import { join, extname, dirname } from 'path';
+import { createServer, Agent as HttpAgent, request as httpRequest } from 'http';
+import { Agent as HttpsAgent, request as httpsRequest } from 'https';
+import { createHash } from 'crypto';
+import {
+  createReadStream, createWriteStream, watch,
+} from 'fs';
+import {
+  readFile, stat, mkdir, rename, unlink, writeFile,
+} from 'fs/promises';
+import {
+  join, extname, dirname, resolve,
+} from 'path';
 import { fileURLToPath } from 'url';
 
 const __filename = fileURLToPath(import.meta.url);
-const__dirname = dirname(__filename);
+const __dirname = dirname(__filename);
 
 // this file is a debugging artefact and it should be treated as readonly
 
 const PORT = process.env.PORT || 3000;
-const PROXY_HOST = 'https://allabout.network';
+const PROXY_HOST = process.env.PROXY_HOST || 'https://allabout.network';
+
+// Proxy cache and local file cache settings (environment variables or flags)
+const CACHE_CONFIG = {
+  // On-disk cache of proxied responses, keyed by URL; PROXY_CACHE=off disables it
+  proxyCacheDir: process.env.PROXY_CACHE === 'off'
+    ? null
+    : resolve(__dirname, process.env.PROXY_CACHE_DIR || '.proxy-cache'),
+  // Serve proxied URLs from the disk cache only, never touching the network
+  offline: process.env.PROXY_OFFLINE === '1' || process.argv.includes('--offline'),
+  // In-memory LRU for local files, in megabytes; 0 disables it
+  localCacheBytes: Number(process.env.LOCAL_FILE_CACHE_MB || 0) * 1024 * 1024,
+  // Redirects followed upstream before giving up
+  maxRedirects: 5,
+  // Only these upstream headers are stored and passed on
+  keptHeaders: ['content-type', 'content-encoding', 'etag', 'last-modified', 'cache-control'],
+};
+
+// Upstream connections are reused between requests
+const upstreamAgents = {
+  'https:': new HttpsAgent({ keepAlive: true, maxSockets: 16 }),
+  'http:': new HttpAgent({ keepAlive: true, maxSockets: 16 }),
+};
 
 // MIME type mapping
 const mimeTypes = {
@@ -42,105 +73,339 @@ const mimeTypes = {
   '.eot': 'application/vnd.ms-fontobject',
 };
 
-// Check if file exists locally
-async function fileExists(filePath) {
+const corsHeaders = {
+  'Cache-Control': 'no-cache',
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+  'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+};
+
+// ---------------------------------------------------------------------------
+// Local files, with an optional in-memory LRU invalidated by fs.watch
+// ---------------------------------------------------------------------------
+
+// Map keeps insertion order: the first entry is the least recently used
+const localCache = new Map();
+let localCacheBytes = 0;
+
+function forgetLocalFile(filePath) {
+  const entry = localCache.get(filePath);
+  if (!entry) return;
+  localCache.delete(filePath);
+  localCacheBytes -= entry.content.length;
+}
+
+function rememberLocalFile(filePath, content) {
+  if (content.length > CACHE_CONFIG.localCacheBytes) return;
+  forgetLocalFile(filePath);
+  localCache.set(filePath, { content });
+  localCacheBytes += content.length;
+  while (localCacheBytes > CACHE_CONFIG.localCacheBytes) {
+    forgetLocalFile(localCache.keys().next().value);
+  }
+}
+
+function watchLocalFiles() {
   try {
-    await access(filePath);
+    const watcher = watch(__dirname, { recursive: true }, (eventType, filename) => {
+      if (!filename) {
+        // The platform did not say which file changed - start again
+        localCache.clear();
+        localCacheBytes = 0;
+        return;
+      }
+      forgetLocalFile(join(__dirname, filename.toString()));
+    });
+    watcher.on('error', (error) => {
+      console.error('⚠️ File watcher failed, local file cache disabled:', error.message);
+      CACHE_CONFIG.localCacheBytes = 0;
+      localCache.clear();
+      localCacheBytes = 0;
+    });
     return true;
-  } catch {
+  } catch (error) {
+    console.error('⚠️ fs.watch unavailable, local file cache disabled:', error.message);
+    CACHE_CONFIG.localCacheBytes = 0;
     return false;
   }
 }
 
-// Serve local file
+// Serve a local file; resolves false when there is no such file
 async function serveLocalFile(filePath, res) {
+  const contentType = mimeTypes[extname(filePath)] || 'application/octet-stream';
+  const headers = {
+    'Content-Type': contentType,
+    'Cache-Control': 'no-cache',
+  };
+
+  const cached = localCache.get(filePath);
+  if (cached) {
+    // Move to the most recently used end
+    localCache.delete(filePath);
+    localCache.set(filePath, cached);
+    res.writeHead(200, { ...headers, 'Content-Length': cached.content.length });
+    res.end(cached.content);
+    return true;
+  }
+
+  let stats;
   try {
-    const content = await readFile(filePath);
-    const ext = extname(filePath);
-    const contentType = mimeTypes[ext] || 'application/octet-stream';
+    stats = await stat(filePath);
+  } catch {
+    return false;
+  }
+  if (!stats.isFile()) return false;
 
-    res.writeHead(200, {
-      'Content-Type': contentType,
-      'Cache-Control': 'no-cache',
-    });
-    res.end(content);
+  try {
+    if (CACHE_CONFIG.localCacheBytes > 0 && stats.size <= CACHE_CONFIG.localCacheBytes) {
+      const content = await readFile(filePath);
+      rememberLocalFile(filePath, content);
+      res.writeHead(200, { ...headers, 'Content-Length': content.length });
+      res.end(content);
+      return true;
+    }
+    res.writeHead(200, { ...headers, 'Content-Length': stats.size });
+    await streamFile(filePath, res);
     return true;
   } catch (error) {
     console.error(`Error serving local file ${filePath}:`, error.message);
-    return false;
+    if (!res.headersSent) return false;
+    res.destroy();
+    return true;
   }
 }
 
-// Proxy request to config's proxy host
-async function proxyRequest(url, res) {
+function streamFile(filePath, res) {
+  return new Promise((resolveStream, rejectStream) => {
+    const stream = createReadStream(filePath);
+    stream.on('error', rejectStream);
+    res.on('close', resolveStream);
+    stream.pipe(res);
+  });
+}
+
+// ---------------------------------------------------------------------------
+// Proxy disk cache
+// ---------------------------------------------------------------------------
+
+let tempCounter = 0;
+
+function cachePaths(url) {
+  const key = createHash('sha1').update(url).digest('hex');
+  return {
+    body: join(CACHE_CONFIG.proxyCacheDir, `${key}.body`),
+    meta: join(CACHE_CONFIG.proxyCacheDir, `${key}.json`),
+  };
+}
+
+async function readCacheEntry(url) {
+  if (!CACHE_CONFIG.proxyCacheDir) return null;
+  const paths = cachePaths(url);
   try {
-    const proxyUrl = `${PROXY_HOST}${url}`;
-    // eslint-disable-next-line no-console
-    console.log(`Proxying request to: ${proxyUrl}`);
+    const meta = JSON.parse(await readFile(paths.meta, 'utf8'));
+    await stat(paths.body);
+    return { ...meta, bodyPath: paths.body, metaPath: paths.meta };
+  } catch {
+    return null;
+  }
+}
+
+function pickHeaders(headers) {
+  const kept = {};
+  CACHE_CONFIG.keptHeaders.forEach((name) => {
+    if (headers[name]) kept[name] = headers[name];
+  });
+  return kept;
+}
+
+function isStorable(headers) {
+  return !/no-store|private/i.test(headers['cache-control'] || '');
+}
+
+/**
+ * Seconds the upstream allows a response to be reused without asking again.
+ * Anything without max-age, or marked no-cache, is revalidated every time.
+ */
+function freshSeconds(headers) {
+  const cacheControl = headers['cache-control'] || '';
+  if (/no-cache/i.test(cacheControl)) return 0;
+  const maxAge = cacheControl.match(/(?:^|,)\s*(?:s-maxage|max-age)=(\d+)/i);
+  return maxAge ? Number(maxAge[1]) : 0;
+}
 
-    const response = await fetch(proxyUrl, {
+function isFresh(entry) {
+  return (Date.now() - entry.storedAt) / 1000 < freshSeconds(entry.headers);
+}
+
+function sendHeaders(res, headers, size) {
+  res.writeHead(200, {
+    ...corsHeaders,
+    'Content-Type': headers['content-type'] || 'application/octet-stream',
+    ...(headers['content-encoding'] ? { 'Content-Encoding': headers['content-encoding'] } : {}),
+    ...(size !== undefined ? { 'Content-Length': size } : {}),
+  });
+}
+
+async function serveCacheEntry(entry, res) {
+  const { size } = await stat(entry.bodyPath);
+  sendHeaders(res, entry.headers, size);
+  await streamFile(entry.bodyPath, res);
+}
+
+// ---------------------------------------------------------------------------
+// Upstream requests
+// ---------------------------------------------------------------------------
+
+/**
+ * GET a URL upstream over the keep-alive agent, following redirects.
+ * Resolves with the response stream; the body is left compressed, and its
+ * Content-Encoding is passed on to the browser.
+ */
+function requestUpstream(targetUrl, headers, redirects = 0) {
+  return new Promise((resolveRequest, rejectRequest) => {
+    const target = new URL(targetUrl);
+    const send = target.protocol === 'https:' ? httpsRequest : httpRequest;
+    const upstream = send(target, {
       method: 'GET',
+      agent: upstreamAgents[target.protocol],
       headers: {
         'User-Agent': 'Mozilla/5.0 (compatible; EDS-Emulation-Layer/1.0)',
         Accept: '*/*',
         'Accept-Encoding': 'gzip, deflate, br',
-        Connection: 'keep-alive',
+        ...headers,
       },
+    }, (response) => {
+      const { statusCode, headers: responseHeaders } = response;
+      if (statusCode >= 300 && statusCode < 400 && statusCode !== 304 && responseHeaders.location) {
+        response.resume();
+        if (redirects >= CACHE_CONFIG.maxRedirects) {
+          rejectRequest(new Error(`Too many redirects for ${targetUrl}`));
+          return;
+        }
+        const next = new URL(responseHeaders.location, target).href;
+        requestUpstream(next, headers, redirects + 1).then(resolveRequest, rejectRequest);
+        return;
+      }
+      resolveRequest(response);
     });
+    upstream.on('error', rejectRequest);
+    upstream.end();
+  });
+}
 
-    // eslint-disable-next-line no-console
-    console.log(`Proxy response status: ${response.status} ${response.statusText}`);
-    // eslint-disable-next-line no-console
-    console.log('Proxy response headers:', Object.fromEntries(response.headers.entries()));
+/**
+ * Stream an upstream 200 to the browser and, when storable, into the disk
+ * cache at the same time. The cache entry only replaces the old one once
+ * the whole body has been written.
+ */
+function streamAndStore(url, response, res) {
+  const headers = pickHeaders(response.headers);
+  const length = response.headers['content-length'];
+  sendHeaders(res, headers, length !== undefined ? Number(length) : undefined);
 
-    if (!response.ok) {
-      console.error(`Proxy request failed: ${response.status} ${response.statusText}`);
-      console.error(`Failed URL: ${proxyUrl}`);
-      throw new Error(`Proxy request failed: ${response.status} ${response.statusText}`);
-    }
+  if (!CACHE_CONFIG.proxyCacheDir || !isStorable(response.headers)) {
+    response.pipe(res);
+    return new Promise((resolveStream) => {
+      response.on('end', resolveStream);
+      response.on('error', () => {
+        res.destroy();
+        resolveStream();
+      });
+    });
+  }
 
-    const contentType = response.headers.get('content-type') || 'application/octet-stream';
-    // eslint-disable-next-line no-console
-    console.log(`Proxy content type: ${contentType}`);
-
-    // Handle different content types appropriately
-    let content;
-    const isTextContent = contentType.includes('text/')
-      || contentType.includes('application/json')
-      || contentType.includes('application/javascript');
-
-    if (isTextContent) {
-      content = await response.text();
-      // eslint-disable-next-line no-console
-      console.log(`Proxy content length (text): ${content.length} characters`);
-    } else {
-      content = await response.arrayBuffer();
-      // eslint-disable-next-line no-console
-      console.log(`Proxy content length (binary): ${content.byteLength} bytes`);
-    }
+  const paths = cachePaths(url);
+  tempCounter += 1;
+  const tempPath = `${paths.body}.${process.pid}.${tempCounter}.tmp`;
+  const file = createWriteStream(tempPath);
+  let failed = false;
 
-    res.writeHead(200, {
-      'Content-Type': contentType,
-      'Cache-Control': 'no-cache',
-      'Access-Control-Allow-Origin': '*',
-      'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-      'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+  return new Promise((resolveStream) => {
+    const discard = () => {
+      failed = true;
+      file.destroy();
+      unlink(tempPath).catch(() => {});
+      resolveStream();
+    };
+    response.on('error', (error) => {
+      console.error(`❌ Upstream stream failed for ${url}:`, error.message);
+      res.destroy();
+      discard();
+    });
+    file.on('error', discard);
+    file.on('finish', async () => {
+      if (failed) return;
+      try {
+        await rename(tempPath, paths.body);
+        await writeFile(paths.meta, JSON.stringify({ url, headers, storedAt: Date.now() }));
+      } catch (error) {
+        console.error(`⚠️ Could not store ${url} in the proxy cache:`, error.message);
+      }
+      resolveStream();
     });
+    response.pipe(res);
+    response.pipe(file);
+  });
+}
 
-    if (typeof content === 'string') {
-      res.end(content);
-    } else {
-      res.end(Buffer.from(content));
+// Proxy request to config's proxy host; resolves false when it cannot be served
+async function proxyRequest(url, res) {
+  const proxyUrl = `${PROXY_HOST}${url}`;
+  const entry = await readCacheEntry(url);
+
+  if (CACHE_CONFIG.offline) {
+    if (!entry) {
+      console.log(`📴 Offline, not in proxy cache: ${url}`);
+      return false;
     }
+    console.log(`📴 Offline, from proxy cache: ${url}`);
+    await serveCacheEntry(entry, res);
+    return true;
+  }
 
-    // eslint-disable-next-line no-console
-    console.log(`✅ Successfully proxied: ${url}`);
+  if (entry && isFresh(entry)) {
+    console.log(`💾 Proxy cache (fresh): ${url}`);
+    await serveCacheEntry(entry, res);
     return true;
+  }
+
+  const conditional = {};
+  if (entry?.headers.etag) conditional['If-None-Match'] = entry.headers.etag;
+  if (entry?.headers['last-modified']) conditional['If-Modified-Since'] = entry.headers['last-modified'];
+
+  let response;
+  try {
+    response = await requestUpstream(proxyUrl, conditional);
   } catch (error) {
+    if (entry) {
+      console.log(`⚠️ Upstream unreachable (${error.message}), serving cached copy: ${url}`);
+      await serveCacheEntry(entry, res);
+      return true;
+    }
     console.error(`❌ Error proxying request for ${url}:`, error.message);
-    console.error('Full error:', error);
     return false;
   }
+
+  if (response.statusCode === 304 && entry) {
+    response.resume();
+    console.log(`💾 Proxy cache (revalidated): ${url}`);
+    // Upstream may send fresh validators or caching rules with the 304
+    const headers = { ...entry.headers, ...pickHeaders(response.headers) };
+    writeFile(entry.metaPath, JSON.stringify({ url, headers, storedAt: Date.now() })).catch(() => {});
+    await serveCacheEntry({ ...entry, headers }, res);
+    return true;
+  }
+
+  if (response.statusCode !== 200) {
+    response.resume();
+    console.error(`Proxy request failed: ${response.statusCode} ${response.statusMessage}`);
+    console.error(`Failed URL: ${proxyUrl}`);
+    return false;
+  }
+
+  console.log(`🔗 Proxying: ${url} (${response.headers['content-type'] || 'unknown type'})`);
+  await streamAndStore(url, response, res);
+  return true;
 }
 
 // Main request handler
@@ -148,9 +413,6 @@ async function handleRequest(req, res) {
   const url = req.url === '/' ? '/server.html' : req.url;
   const filePath = join(__dirname, url.startsWith('/') ? url.slice(1) : url);
 
-  // eslint-disable-next-line no-console
-  console.log(`Request: ${req.method} ${url}`);
-
   // Handle Chrome DevTools specific requests gracefully
   if (url.includes('/.well-known/appspecific/')
       || url.includes('/chrome-devtools/')
@@ -164,17 +426,23 @@ async function handleRequest(req, res) {
   }
 
   // Try to serve local file first
-  if (await fileExists(filePath)) {
-    // eslint-disable-next-line no-console
-    console.log(`Serving local file: ${filePath}`);
-    const served = await serveLocalFile(filePath, res);
-    if (served) return;
+  if (await serveLocalFile(filePath, res)) {
+    console.log(`📄 Serving local: ${url}`);
+    return;
   }
 
   // If local file doesn't exist or failed to serve, try proxy
-  // eslint-disable-next-line no-console
-  console.log(`Local file not found, attempting proxy for: ${url}`);
-  const proxied = await proxyRequest(url, res);
+  let proxied;
+  try {
+    proxied = await proxyRequest(url, res);
+  } catch (error) {
+    console.error(`❌ Error proxying request for ${url}:`, error.message);
+    if (res.headersSent) {
+      res.destroy();
+      return;
+    }
+    proxied = false;
+  }
 
   if (!proxied) {
     // If both local and proxy fail, return 404
@@ -186,7 +454,7 @@ async function handleRequest(req, res) {
         <body>
           <h1>404 Not Found</h1>
           <p>The requested resource <code>${url}</code> was not found locally
-          or on the proxy server.</p>
+          or ${CACHE_CONFIG.offline ? 'in the proxy cache (offline mode)' : 'on the proxy server'}.</p>
           <p>Attempted proxy URL: <code>${PROXY_HOST}${url}</code></p>
         </body>
       </html>
@@ -194,28 +462,36 @@ async function handleRequest(req, res) {
   }
 }
 
+if (CACHE_CONFIG.proxyCacheDir) {
+  await mkdir(CACHE_CONFIG.proxyCacheDir, { recursive: true });
+}
+if (CACHE_CONFIG.localCacheBytes > 0) {
+  watchLocalFiles();
+}
+
 // Create and start server
 const server = createServer(handleRequest);
+server.keepAliveTimeout = 65000;
 
 server.listen(PORT, () => {
-  // eslint-disable-next-line no-console
   console.log(`🚀 Server running at http://localhost:${PORT}`);
-  // eslint-disable-next-line no-console
   console.log(`📁 Serving files from: ${__dirname}`);
-  // eslint-disable-next-line no-console
   console.log(`🔗 Proxying missing files to: ${PROXY_HOST}`);
-  // eslint-disable-next-line no-console
+  if (CACHE_CONFIG.proxyCacheDir) {
+    console.log(`💾 Proxy cache: ${CACHE_CONFIG.proxyCacheDir}${CACHE_CONFIG.offline ? ' (offline mode: cache only)' : ''}`);
+  }
+  if (CACHE_CONFIG.localCacheBytes > 0) {
+    console.log(`🧠 Local file cache: ${CACHE_CONFIG.localCacheBytes / 1024 / 1024} MB, invalidated on file change`);
+  }
   console.log(`📄 Main page: http://localhost:${PORT}/server.html`);
-  // eslint-disable-next-line no-console
   console.log('🔧 DevTools requests will be handled gracefully');
 });
 
 // Graceful shutdown
 process.on('SIGINT', () => {
-  // eslint-disable-next-line no-console
   console.log('\n🛑 Shutting down server...');
+  Object.values(upstreamAgents).forEach((agent) => agent.destroy());
   server.close(() => {
-    // eslint-disable-next-line no-console
     console.log('✅ Server closed');
     process.exit(0);
   });